@@ -0,0 +1,120 @@
+"""
+Native async versions of the list and detail views of cards, expansions and
+types, routed under `/async/`.
+
+Under ASGI they run in the event loop: rows are read with the async ORM
+(`acount`, `aget` and async iteration), and the related expansions and types
+come from a snapshot of the reference data cache fetched with `aget` and pinned
+while serializing, so serialization never touches the database. A slow client
+then holds a coroutine instead of a worker thread. They're read-only and don't
+support the filters, cursor pagination, conditional GET or response cache of
+the DRF views in `api.views`.
+"""
+from django.core.paginator import EmptyPage
+from django.http import HttpResponse
+from django.views import View
+from api.models import Card, Expansion, PokemonType
+from api.pagination import AsyncPagination
+from api.reference_cache import reference_cache
+from api.renderers import FastJSONRenderer
+from api.serializers import CardSerializer, ExpansionSerializer, PokemonTypeSerializer
+
+
+class AsyncReadView(View):
+    """
+    Base of the async views: serializes and renders like the DRF views.
+    """
+    http_method_names = ["get", "head", "options"]
+    queryset = None
+    serializer_class = None
+    renderer_class = FastJSONRenderer
+
+    def get_queryset(self):
+        return self.queryset.all()
+
+    def get_required_reference_data(self, instances):
+        """
+        Returns the `(model, pk)` reference data instances the serialization of
+        the given instances reads from the reference data cache.
+        """
+        return ()
+
+    async def serialize(self, request, instances, many):
+        required = self.get_required_reference_data(instances if many else [instances])
+        data = await reference_cache.aget(required)
+        with reference_cache.pinned(data):
+            return self.serializer_class(instances, many=many, context={"request": request}).data
+
+    def render(self, data, status=200):
+        renderer = self.renderer_class()
+        return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+
+class AsyncListView(AsyncReadView):
+    pagination_class = AsyncPagination
+
+    async def get(self, request, *args, **kwargs):
+        paginator = self.pagination_class()
+        try:
+            instances = await paginator.paginate_queryset(self.get_queryset(), request)
+        except EmptyPage:
+            return self.render({"detail": "Invalid page."}, status=404)
+        return self.render(paginator.get_paginated_data(await self.serialize(request, instances, many=True)))
+
+
+class AsyncDetailView(AsyncReadView):
+    async def get(self, request, pk, *args, **kwargs):
+        try:
+            instance = await self.get_queryset().aget(pk=pk)
+        except self.queryset.model.DoesNotExist:
+            return self.render({"detail": "Not found."}, status=404)
+        return self.render(await self.serialize(request, instance, many=False))
+
+
+class CardReadMixin:
+    queryset = Card.objects.all()
+    serializer_class = CardSerializer
+
+    def get_required_reference_data(self, instances):
+        return [
+            required
+            for card in instances
+            for required in ((Expansion, card.expansion_id), (PokemonType, card.type1_id), (PokemonType, card.type2_id))
+        ]
+
+
+class ExpansionReadMixin:
+    queryset = Expansion.objects.all()
+    serializer_class = ExpansionSerializer
+
+
+class PokemonTypeReadMixin:
+    queryset = PokemonType.objects.all()
+    serializer_class = PokemonTypeSerializer
+
+    def get_required_reference_data(self, instances):
+        return [(PokemonType, pokemon_type.pk) for pokemon_type in instances]
+
+
+class CardList(CardReadMixin, AsyncListView):
+    pass
+
+
+class CardDetail(CardReadMixin, AsyncDetailView):
+    pass
+
+
+class ExpansionList(ExpansionReadMixin, AsyncListView):
+    pass
+
+
+class ExpansionDetail(ExpansionReadMixin, AsyncDetailView):
+    pass
+
+
+class PokemonTypeList(PokemonTypeReadMixin, AsyncListView):
+    pass
+
+
+class PokemonTypeDetail(PokemonTypeReadMixin, AsyncDetailView):
+    pass
@@ -0,0 +1,164 @@
+"""
+Microbenchmarks of the serializers, pagination and list view querysets.
+
+Every measurement is repeated and its median kept, so results are comparable
+between runs on the same machine. They're gathered in a dictionary that the
+`benchmark_api` command writes as JSON, to diff the numbers of two commits.
+"""
+import platform
+import sqlite3
+import statistics
+import subprocess
+import time
+import django
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from api import views
+from api.models import Card, Expansion, PokemonType
+from api.pagination import COUNT_STRATEGIES
+from api.query_plans import PLAN_CASES, request_factory_settings
+from api.serializers import CardSerializer, ExpansionSerializer, PokemonTypeSerializer
+
+
+SERIALIZER_CASES = [
+    (CardSerializer, views.CardList),
+    (ExpansionSerializer, views.ExpansionList),
+    (PokemonTypeSerializer, views.PokemonTypeList),
+]
+
+# The plan cases with conditional headers only differ in how validators are computed.
+BENCHMARK_CASES = [case for case in PLAN_CASES if not case.headers]
+
+
+def median_time(function, repeat):
+    """
+    Runs the function `repeat` times and returns the median of its durations, in milliseconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000
+
+
+def get_environment():
+    """
+    Describes the code and platform the benchmarks run on.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "sqlite": sqlite3.sqlite_version,
+    }
+
+
+def make_view(case):
+    """
+    Returns an instance of the view of the case, initialized with its request,
+    as it is before the list is built.
+    """
+    path = reverse(case.url_name, kwargs=case.kwargs)
+    view = case.view_class(format_kwarg=None)
+    view.setup(APIRequestFactory().get(path, case.params), **case.kwargs)
+    view.request = view.initialize_request(view.request, **case.kwargs)
+    view.initial(view.request, **case.kwargs)
+    return view
+
+
+def benchmark_serializer(serializer_class, view_class, repeat, page_size=100):
+    """
+    Times the serialization of a page of instances fetched with the queryset of
+    the view, and returns the median time per instance in microseconds.
+    """
+    queryset = view_class.queryset.order_by("pk")
+    instances = list(queryset[:page_size])
+    context = {"request": Request(APIRequestFactory().get("/"))}
+    # Warms up the reference data cache and the serializer fields.
+    serializer_class(instances, many=True, context=context).data
+    elapsed = median_time(lambda: serializer_class(instances, many=True, context=context).data, repeat)
+    return {
+        "instances": len(instances),
+        "per_item_us": elapsed * 1000 / max(len(instances), 1),
+    }
+
+
+def benchmark_view(case, repeat):
+    """
+    Times a first page request to the list view of the case, and the count and
+    filtered page queries it runs, and counts its queries.
+    """
+    path = reverse(case.url_name, kwargs=case.kwargs)
+    view_function = case.view_class.as_view()
+    factory = APIRequestFactory()
+
+    def request():
+        view_function(factory.get(path, case.params), **case.kwargs).render()
+
+    request()
+    with CaptureQueriesContext(connection) as queries:
+        request()
+
+    view = make_view(case)
+    queryset = view.filter_queryset(view.get_queryset())
+    page_size = view.paginator.get_page_size(view.request)
+    return {
+        "request_ms": median_time(request, repeat),
+        "queries": len(queries),
+        "count": queryset.count(),
+        # The "cached" strategy is timed once its count is cached.
+        "count_ms": {
+            name: median_time(lambda: strategy(queryset), repeat) for name, strategy in COUNT_STRATEGIES.items()
+        },
+        "filter_ms": median_time(lambda: list(queryset[:page_size]), repeat),
+    }
+
+
+def run_benchmarks(repeat=20, cases=None):
+    """
+    Runs every benchmark on the current database and returns their results.
+    """
+    results = {"serializers": {}, "views": {}}
+    with request_factory_settings():
+        for serializer_class, view_class in SERIALIZER_CASES:
+            results["serializers"][serializer_class.__name__] = benchmark_serializer(
+                serializer_class, view_class, repeat
+            )
+        for case in cases or BENCHMARK_CASES:
+            results["views"][str(case)] = benchmark_view(case, repeat)
+    results["rows"] = {
+        model.__name__: model.objects.count() for model in (Card, Expansion, PokemonType)
+    }
+    return results
+
+
+def flatten(results, prefix=""):
+    """
+    Returns the numeric values of the nested results, keyed by their dotted path.
+    """
+    values = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = value
+    return values
+
+
+def compare_results(old, new):
+    """
+    Returns `(path, old, new)` tuples for the numeric values both results have.
+    """
+    old_values, new_values = flatten(old), flatten(new)
+    return [(path, old_values[path], value) for path, value in new_values.items() if path in old_values]
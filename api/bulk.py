@@ -0,0 +1,195 @@
+"""
+Bulk create, update and delete of cards, used by `api.views.CardBulk`.
+
+A request is a list of operations, each one validated on its own with
+`CardBulkItemSerializer` and then against the database with set-based queries:
+one for the cards being updated or deleted and the names being taken, and one
+for the expansions and types being referenced. When every operation is valid,
+they are written in a single transaction (deletes, then updates, then creates)
+with `bulk_update` and `bulk_create`.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
+from api.models import Card, Expansion, PokemonType
+from api.serializers import CardBulkItemSerializer
+from api.signals import invalidate
+
+ACTIONS = ("create", "update", "delete")
+
+RELATED_MODELS = {
+    "expansion": Expansion,
+    "type1": PokemonType,
+    "type2": PokemonType,
+}
+
+
+class CardBulkOperations:
+    """
+    The operations of a bulk request. Call `is_valid` and then `save`; `results`
+    has the outcome of every operation, in the order they were given.
+    """
+    def __init__(self, operations):
+        self.operations = operations
+        self.results = []
+        self.values = {}
+        self.integrity_error = None
+
+    def is_valid(self):
+        """
+        Validates every operation and returns whether all of them are valid.
+        """
+        self.results = [{"index": index, "status": "valid"} for index in range(len(self.operations))]
+        for index, operation in enumerate(self.operations):
+            self.validate_operation(index, operation)
+        self.validate_against_database()
+        return not any(result["status"] == "invalid" for result in self.results)
+
+    def add_error(self, index, field, message):
+        result = self.results[index]
+        result["status"] = "invalid"
+        result.setdefault("errors", {}).setdefault(field, []).append(message)
+
+    def validate_operation(self, index, operation):
+        """
+        Checks the shape of an operation and the fields of its card.
+        """
+        if not isinstance(operation, dict):
+            self.add_error(index, "non_field_errors", "Operation must be an object.")
+            return
+        action = operation.get("action")
+        self.results[index]["action"] = action
+        if action not in ACTIONS:
+            self.add_error(index, "action", f"Action must be one of: {', '.join(ACTIONS)}.")
+            return
+        if action != "create":
+            pk = operation.get("id")
+            if isinstance(pk, bool) or not isinstance(pk, int):
+                self.add_error(index, "id", "A valid integer is required.")
+            else:
+                self.results[index]["id"] = pk
+        if action == "delete":
+            return
+        serializer = CardBulkItemSerializer(data=operation.get("data"), partial=action == "update")
+        if serializer.is_valid():
+            self.values[index] = serializer.validated_data
+        else:
+            for field, messages in serializer.errors.items():
+                for message in messages:
+                    self.add_error(index, field, str(message))
+
+    def validate_against_database(self):
+        """
+        Checks that updated and deleted cards exist, that each card is changed
+        once, that no name is taken twice, and that related objects exist.
+        """
+        pks = {}
+        for index, result in enumerate(self.results):
+            pk = result.get("id")
+            if pk is None:
+                continue
+            if pk in pks:
+                self.add_error(index, "id", "This card appears more than once in the request.")
+            else:
+                pks[pk] = index
+
+        names = {}
+        for index, values in self.values.items():
+            if "name" not in values:
+                continue
+            name = values["name"].lower()
+            if name in names:
+                self.add_error(index, "name", "This name appears more than once in the request.")
+            else:
+                names[name] = index
+
+        current_names = {}
+        name_holders = {}
+        if pks or names:
+            rows = (
+                Card.objects.annotate(name_lower=Lower("name"))
+                .filter(Q(pk__in=list(pks)) | Q(name_lower__in=list(names)))
+                .values_list("pk", "name_lower")
+            )
+            for pk, name in rows:
+                current_names[pk] = name
+                name_holders[name] = pk
+
+        for pk, index in pks.items():
+            if pk not in current_names:
+                self.add_error(index, "id", "Card not found.")
+
+        # Names released in this request by deleting or renaming their card.
+        released_names = set()
+        for pk, index in pks.items():
+            action = self.results[index]["action"]
+            new_name = self.values.get(index, {}).get("name")
+            if pk in current_names and (action == "delete" or (new_name and new_name.lower() != current_names[pk])):
+                released_names.add(current_names[pk])
+        for name, index in names.items():
+            holder = name_holders.get(name)
+            if holder is not None and holder != self.results[index].get("id") and name not in released_names:
+                self.add_error(index, "name", "Card with this name already exists.")
+
+        self.validate_related_objects()
+
+    def validate_related_objects(self):
+        """
+        Checks that every referenced expansion and type exists, with one query.
+        """
+        referenced = {}
+        for index, values in self.values.items():
+            for field, model in RELATED_MODELS.items():
+                if values.get(field) is not None:
+                    referenced.setdefault(model, set()).add(values[field])
+        if not referenced:
+            return
+        queries = [
+            model.objects.filter(pk__in=list(related_pks)).order_by()
+            .annotate(model_name=Value(model.__name__)).values_list("model_name", "pk")
+            for model, related_pks in referenced.items()
+        ]
+        existing = set(queries[0].union(*queries[1:], all=True))
+        for index, values in self.values.items():
+            for field, model in RELATED_MODELS.items():
+                if values.get(field) is not None and (model.__name__, values[field]) not in existing:
+                    self.add_error(index, field, f'Invalid pk "{values[field]}" - object does not exist.')
+
+    def save(self):
+        """
+        Applies every operation in a single transaction. Returns False, without
+        writing anything, if the database rejects the changes.
+        """
+        deletes = []
+        updates = {}
+        creates = []
+        for index, result in enumerate(self.results):
+            action = result["action"]
+            values = {
+                (f"{field}_id" if field in RELATED_MODELS else field): value
+                for field, value in self.values.get(index, {}).items()
+            }
+            if action == "delete":
+                deletes.append(result["id"])
+            elif action == "update":
+                if values:
+                    values.update(Card.modification_values())
+                    updates.setdefault(tuple(values), []).append(Card(pk=result["id"], **values))
+            else:
+                creates.append((index, Card(**values)))
+        try:
+            with transaction.atomic():
+                if deletes:
+                    Card.objects.filter(pk__in=deletes).delete()
+                for fields, cards in updates.items():
+                    Card.objects.bulk_update(cards, fields)
+                Card.objects.bulk_create([card for index, card in creates])
+        except IntegrityError as exc:
+            self.integrity_error = str(exc)
+            return False
+        invalidate(Card)
+        for index, card in creates:
+            self.results[index]["id"] = card.pk
+        for result in self.results:
+            result["status"] = f"{result['action']}d"
+        return True
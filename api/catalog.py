@@ -0,0 +1,261 @@
+"""
+Deterministic generator of large synthetic catalogs, used by the
+`generate_catalog` command to reproduce production-scale behavior locally.
+
+Cards are spread over generated expansions of varying sizes and numbered from 1
+in each of them. Their rarity, types, HP and price follow the distributions of
+a `CatalogDistributions`, drawn from a random generator seeded with the given
+seed, so the same arguments always generate the same catalog. Card names are
+made up of a generated species name and the expansion id and card number, so
+they're unique (as `unique_card_name` requires) across runs.
+"""
+import math
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
+from itertools import accumulate, islice
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageDraw
+from api.images import generate_derivatives
+from api.models import Card, Expansion, PokemonType
+from api.query_plans import finish_bulk_load
+from api.signals import invalidate
+
+
+TYPE_COLORS = {
+    "Normal": "#a8a77a",
+    "Fighting": "#c22e28",
+    "Flying": "#a98ff3",
+    "Poison": "#a33ea1",
+    "Ground": "#e2bf65",
+    "Rock": "#b6a136",
+    "Bug": "#a6b91a",
+    "Ghost": "#735797",
+    "Steel": "#b7b7ce",
+    "Fire": "#ee8130",
+    "Water": "#6390f0",
+    "Grass": "#7ac74c",
+    "Electric": "#f7d02c",
+    "Psychic": "#f95587",
+    "Ice": "#96d9d6",
+    "Dragon": "#6f35fc",
+    "Dark": "#705746",
+    "Fairy": "#d685ad",
+}
+
+SERIES_NAMES = [
+    "Original", "Neo", "e-Card", "EX", "Diamond & Pearl", "Platinum", "HeartGold & SoulSilver",
+    "Black & White", "XY", "Sun & Moon", "Sword & Shield", "Scarlet & Violet",
+]
+EXPANSION_ADJECTIVES = [
+    "Ancient", "Burning", "Crimson", "Dark", "Evolving", "Fusion", "Hidden", "Legendary", "Lost", "Mystic",
+    "Obsidian", "Paradox", "Rising", "Roaring", "Shining", "Silver", "Stellar", "Temporal", "Unbroken", "Vivid",
+]
+EXPANSION_NOUNS = [
+    "Arena", "Bonds", "Crown", "Destiny", "Dragons", "Flames", "Forces", "Fortunes", "Guardians", "Legends",
+    "Origins", "Power", "Rift", "Skies", "Storm", "Tempest", "Thunder", "Tides", "Voltage", "Zenith",
+]
+SYLLABLES = [
+    "bul", "ba", "char", "man", "der", "squir", "tle", "pi", "ka", "chu", "rai", "eev", "vee", "gar", "dos",
+    "mew", "ly", "pon", "ta", "geo", "dude", "ono", "dra", "go", "nite", "snor", "lax", "zu", "bat", "mag",
+    "ne", "mite", "vul", "pix", "jig", "puff", "oddi", "sh", "abra", "kad", "ra", "tor", "kin", "gen", "gar",
+]
+FIRST_RELEASE_DATE = date(1999, 1, 9)
+LAST_RELEASE_DATE = date(2023, 12, 31)
+# Largest price a card can have (`price` has 8 digits, 2 of them decimals).
+MAX_PRICE = 999999.99
+
+
+class CatalogDistributions:
+    """
+    The distributions of the generated cards:
+
+    - `rarity`: weight of each rarity.
+    - `type_skew`: exponent of the Zipf distribution of the types (0 makes
+      every type equally likely, higher values favor the first types).
+    - `dual_type_ratio`: fraction of cards with a second type.
+    - `first_edition_ratio`: fraction of first edition cards, which cost 3 times more.
+    - `price_medians` and `price_sigma`: prices are log-normally distributed
+      around the median of the card's rarity.
+    - `hp_mean` and `hp_stddev`: HP are normally distributed, rounded to a
+      multiple of 10 (like `CardSerializer.validate_hp` requires), from 30 to 340.
+    - `expansion_size_sigma`: expansion sizes are log-normally distributed.
+    """
+    def __init__(self, rarity=None, type_skew=1.0, dual_type_ratio=0.3, first_edition_ratio=0.1,
+                 price_medians=None, price_sigma=1.0, hp_mean=90, hp_stddev=40, expansion_size_sigma=0.5):
+        self.rarity = rarity or {"common": 60, "uncommon": 30, "rare": 10}
+        self.type_skew = type_skew
+        self.dual_type_ratio = dual_type_ratio
+        self.first_edition_ratio = first_edition_ratio
+        self.price_medians = price_medians or {"common": 0.25, "uncommon": 1.0, "rare": 8.0}
+        self.price_sigma = price_sigma
+        self.hp_mean = hp_mean
+        self.hp_stddev = hp_stddev
+        self.expansion_size_sigma = expansion_size_sigma
+
+    def validate(self):
+        """
+        Raises ValueError if a distribution is invalid.
+        """
+        for name, values in (("rarity", self.rarity), ("price_medians", self.price_medians)):
+            unknown = set(values) - set(Card.RarityEnum.values)
+            if unknown:
+                raise ValueError(f"Unknown rarities in {name}: {', '.join(sorted(unknown))}.")
+        if any(weight < 0 for weight in self.rarity.values()) or not any(self.rarity.values()):
+            raise ValueError("Rarity weights can't be negative, and at least one must be positive.")
+        if any(self.price_medians.get(rarity, 0) <= 0 for rarity in self.rarity):
+            raise ValueError("Every rarity needs a positive price median.")
+        for name in ("dual_type_ratio", "first_edition_ratio"):
+            if not 0 <= getattr(self, name) <= 1:
+                raise ValueError(f"{name} must be between 0 and 1.")
+        for name in ("type_skew", "price_sigma", "hp_stddev", "expansion_size_sigma"):
+            if getattr(self, name) < 0:
+                raise ValueError(f"{name} can't be negative.")
+
+
+def species_names(rng, count):
+    """
+    Returns `count` distinct made up species names.
+    """
+    names = set()
+    while len(names) < count:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize())
+    return sorted(names)
+
+
+def expansion_sizes(rng, cards, expansions, sigma):
+    """
+    Splits the cards into `expansions` log-normally distributed sizes.
+    """
+    weights = [rng.lognormvariate(0, sigma) for _ in range(expansions)]
+    total = sum(weights)
+    sizes = [math.floor(weight / total * cards) for weight in weights]
+    # Hands out the cards lost rounding down, largest expansions first.
+    for index in sorted(range(expansions), key=lambda index: -weights[index])[:cards - sum(sizes)]:
+        sizes[index] += 1
+    return sizes
+
+
+def create_types():
+    """
+    Returns the existing types, creating the standard ones that are missing.
+    """
+    existing = {pokemon_type.name.lower() for pokemon_type in PokemonType.objects.all()}
+    missing = [name for name in TYPE_COLORS if name.lower() not in existing]
+    if missing:
+        PokemonType.objects.bulk_create(PokemonType(name=name) for name in missing)
+        invalidate(PokemonType)
+    return list(PokemonType.objects.order_by("pk"))
+
+
+def create_expansions(rng, sizes):
+    """
+    Creates one expansion per size, in release order, with names and series
+    that don't exist yet.
+    """
+    taken = {(name.lower(), series.lower()) for name, series in Expansion.objects.values_list("name", "series")}
+    # Release dates are spread over the years of the series.
+    interval = (LAST_RELEASE_DATE - FIRST_RELEASE_DATE) / len(sizes)
+    expansions = []
+    for index, size in enumerate(sizes):
+        series = SERIES_NAMES[index * len(SERIES_NAMES) // len(sizes)]
+        base_name = f"{rng.choice(EXPANSION_ADJECTIVES)} {rng.choice(EXPANSION_NOUNS)}"
+        name, suffix = base_name, 1
+        while (name.lower(), series.lower()) in taken:
+            suffix += 1
+            name = f"{base_name} {suffix}"
+        taken.add((name.lower(), series.lower()))
+        release_date = FIRST_RELEASE_DATE + interval * index + timedelta(days=rng.randrange(interval.days or 1))
+        expansions.append(Expansion(
+            name=name, series=series, cards=size, release_date=release_date, promotional_set=rng.random() < 0.05,
+        ))
+    expansions = Expansion.objects.bulk_create(expansions)
+    invalidate(Expansion)
+    return expansions
+
+
+def create_placeholder_images(types):
+    """
+    Stores a placeholder image for each type (in its color, with its name) and
+    returns the image name and derived fields of each type's cards, keyed by type id.
+    The derivatives are generated once per image, instead of once per card.
+    """
+    images = {}
+    for pokemon_type in types:
+        name = f"img/generated/{pokemon_type.name.lower()}.jpg"
+        if not default_storage.exists(name):
+            image = Image.new("RGB", (480, 670), TYPE_COLORS.get(pokemon_type.name, "#888888"))
+            ImageDraw.Draw(image).text((24, 24), pokemon_type.name, fill="white")
+            buffer = BytesIO()
+            image.save(buffer, "JPEG", quality=85)
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        card = Card(image=name)
+        images[pokemon_type.pk] = {"image": name, **generate_derivatives(card.image)}
+    return images
+
+
+def generate_catalog(cards, expansions=150, seed=0, distributions=None, batch_size=10000, images=False,
+                     progress=None):
+    """
+    Generates `cards` cards spread over `expansions` new expansions, and the
+    standard types if they're missing. Cards are inserted with `bulk_create`
+    in batches of `batch_size` (each one in its own transaction), and
+    `progress(inserted, elapsed)` is called after each batch. Returns the
+    number of cards inserted per second.
+    """
+    distributions = distributions or CatalogDistributions()
+    distributions.validate()
+    rng = random.Random(seed)
+    types = create_types()
+    sizes = expansion_sizes(rng, cards, expansions, distributions.expansion_size_sigma)
+    created_expansions = create_expansions(rng, sizes)
+    species = species_names(rng, 1000)
+    placeholder_images = create_placeholder_images(types) if images else {}
+
+    rarities = list(distributions.rarity)
+    rarity_weights = list(accumulate(distributions.rarity.values()))
+    type_ids = [pokemon_type.pk for pokemon_type in types]
+    type_weights = list(accumulate(1 / (rank + 1) ** distributions.type_skew for rank in range(len(types))))
+
+    def generate_cards():
+        for expansion, size in zip(created_expansions, sizes):
+            for number in range(1, size + 1):
+                rarity = rng.choices(rarities, cum_weights=rarity_weights)[0]
+                type1 = rng.choices(type_ids, cum_weights=type_weights)[0]
+                type2 = None
+                if rng.random() < distributions.dual_type_ratio:
+                    type2 = rng.choices(type_ids, cum_weights=type_weights)[0]
+                    type2 = None if type2 == type1 else type2
+                first_edition = rng.random() < distributions.first_edition_ratio
+                price = rng.lognormvariate(math.log(distributions.price_medians[rarity]), distributions.price_sigma)
+                price = min(price * (3 if first_edition else 1), MAX_PRICE)
+                hp = round(rng.gauss(distributions.hp_mean, distributions.hp_stddev) / 10) * 10
+                yield Card(
+                    name=f"{rng.choice(species)} {expansion.pk}-{number}",
+                    first_edition=first_edition,
+                    rarity=rarity,
+                    expansion_id=expansion.pk,
+                    type1_id=type1,
+                    type2_id=type2,
+                    hp=min(max(hp, 30), 340),
+                    card_number=number,
+                    price=Decimal(f"{price:.2f}"),
+                    **placeholder_images.get(type1, {}),
+                )
+
+    started = time.perf_counter()
+    inserted = 0
+    generated = generate_cards()
+    while True:
+        batch = list(islice(generated, batch_size))
+        if not batch:
+            break
+        Card.objects.bulk_create(batch)
+        inserted += len(batch)
+        if progress:
+            progress(inserted, time.perf_counter() - started)
+    finish_bulk_load(Card)
+    return inserted / max(time.perf_counter() - started, 1e-9)
@@ -0,0 +1,232 @@
+"""
+Conditional GET support (ETag and Last-Modified) for the list and detail views.
+
+List validators of conditional requests are computed from the `max(modified)`
+and the count of the filtered queryset (or, when the request doesn't count its
+results, the version counter of the model), and detail validators from the
+`version` and `modified` of the instance. Lists requested without conditional
+headers only get an ETag made of the version counters, which doesn't query the
+database, and that conditional requests are first compared with. Both include
+the request path, query parameters and Accept header, and the version counters
+(see `api.invalidation`) of the models nested in the representation, e.g. the
+expansions and types of a card.
+
+Every validator is remembered in the `API_VALIDATOR_CACHE` cache with the
+version counters of the view's models at the time it was computed. While those
+counters don't change, a request whose `If-None-Match` (or `If-Modified-Since`)
+matches the remembered validator is answered with `304 Not Modified` without
+querying the database.
+
+The version counters only reflect the writes of every process when
+`API_VERSION_CACHE` is shared by them. Otherwise (e.g. with the local memory
+cache), nothing is remembered and no version ETag is used: the validators are
+computed from the database on every request, and the time of the last change of
+the nested data is part of ETags. Lists that aren't counted exactly (with
+`count=false`, cursors, or a count mode other than "exact") then get no
+validators, since only their version counter would detect deleted rows.
+"""
+import hashlib
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+from api.invalidation import get_versions, version_cache_is_shared
+from api.reference_cache import reference_cache
+
+
+def _validator_cache():
+    return caches[getattr(settings, "API_VALIDATOR_CACHE", "default")]
+
+
+def build_etag(*parts):
+    """
+    Returns a weak ETag (representations of the same data may differ in bytes,
+    e.g. in the order of the keys) identifying the given parts.
+    """
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def is_conditional(request):
+    return "HTTP_IF_NONE_MATCH" in request.META or "HTTP_IF_MODIFIED_SINCE" in request.META
+
+
+class ConditionalGetMixin:
+    """
+    Base of `ConditionalListMixin` and `ConditionalRetrieveMixin`.
+    `nested_models` are the models whose data is nested in the representation.
+    """
+    nested_models = ()
+
+    def get_validator_models(self):
+        """
+        Returns the view's model followed by the nested models.
+        """
+        return (self.get_queryset().model, *self.nested_models)
+
+    def get_validator_key(self, request):
+        return "api:validators:" + hashlib.sha1(
+            f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}".encode()
+        ).hexdigest()
+
+    def get_known_validators(self, request):
+        """
+        Returns the ETag and Last-Modified time remembered for the request, if
+        none of the view's models changed since they were computed, or None
+        otherwise. Doesn't query the database.
+        """
+        known = _validator_cache().get(self.get_validator_key(request))
+        if known is None:
+            return None
+        etag, last_modified, versions = known
+        if versions != get_versions(*self.get_validator_models()):
+            return None
+        if last_modified is None and is_conditional(request) and not self.etag_matches(request, etag):
+            # Only the version ETag is known, and the request has to be compared with the computed validators.
+            return None
+        return etag, last_modified
+
+    def etag_matches(self, request, etag):
+        return get_conditional_response(request, etag=etag) is not None
+
+    def conditional_response(self, request, etag, last_modified):
+        """
+        Returns the response to the conditional headers of the request (usually
+        a `304 Not Modified`), or None if the full response must be sent.
+        """
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is not None:
+            self.set_validator_headers(response, etag, last_modified)
+        return response
+
+    def set_validator_headers(self, response, etag, last_modified):
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+
+    def nested_data_modified(self):
+        """
+        Returns the time of the last modification of the nested expansions and
+        types, from the reference data cache.
+        """
+        if not self.nested_models:
+            return None
+        return reference_cache.get().last_modified
+
+    def respond_conditionally(self, request, compute_validators, respond, version_etag=None):
+        """
+        Answers the request with a 304 if its validators match, or with
+        `respond()` otherwise, adding the validators to the response.
+        `compute_validators` returns the ETag and the Last-Modified time.
+
+        If `version_etag` is given, it returns an ETag made of the version
+        counters only, which is used (without a Last-Modified time) instead of
+        computing the validators, unless the request is conditional and doesn't
+        match it. Requests without conditional headers then don't query the
+        database for their validators.
+        """
+        shared = version_cache_is_shared()
+        known = self.get_known_validators(request) if shared else None
+        if known is not None:
+            etag, last_modified = known
+        else:
+            # Read before computing the validators, so a concurrent change makes
+            # them be computed again on the next request.
+            versions = get_versions(*self.get_validator_models())
+            etag, last_modified = (version_etag(versions), None) if version_etag and shared else (None, None)
+            if etag is None or (is_conditional(request) and not self.etag_matches(request, etag)):
+                etag, last_modified = compute_validators(versions)
+                nested_modified = self.nested_data_modified()
+                if nested_modified and not shared:
+                    # The nested version counters in the ETag only count this process's writes.
+                    etag = build_etag(etag, nested_modified)
+                if nested_modified and (last_modified is None or nested_modified > last_modified):
+                    last_modified = nested_modified
+            if shared:
+                timeout = getattr(settings, "API_VALIDATOR_CACHE_TIMEOUT", 300)
+                _validator_cache().set(self.get_validator_key(request), (etag, last_modified, versions), timeout)
+        if is_conditional(request):
+            response = self.conditional_response(request, etag, last_modified)
+            if response is not None:
+                return response
+        response = respond()
+        self.set_validator_headers(response, etag, last_modified)
+        return response
+
+
+class ConditionalListMixin(ConditionalGetMixin):
+    """
+    Adds conditional GET support to a list view.
+    """
+    def list(self, request, *args, **kwargs):
+        def respond():
+            return super(ConditionalListMixin, self).list(request, *args, **kwargs)
+
+        if not version_cache_is_shared() and not self.counts_exactly(request):
+            return respond()
+
+        def compute_validators(versions):
+            queryset = self.filter_queryset(self.get_queryset())
+            last_modified = queryset.order_by().aggregate(last_modified=Max("modified"))["last_modified"]
+            # The count (which the paginator reuses) detects rows deleted from or
+            # moved out of the results. Without an exact count, any change of
+            # the model does.
+            counted = None
+            if self.paginator is not None and hasattr(self.paginator, "count_queryset"):
+                counted = self.paginator.count_queryset(queryset, request)
+            if counted is not None and not counted[1]:
+                change_marker = ("count", counted[0])
+            else:
+                change_marker = ("version", versions[0])
+            etag = build_etag(
+                request.get_full_path(), request.META.get("HTTP_ACCEPT", ""),
+                last_modified, change_marker, versions[1:],
+            )
+            return etag, last_modified
+
+        def version_etag(versions):
+            return build_etag(
+                request.get_full_path(), request.META.get("HTTP_ACCEPT", ""), ("version", versions[0]), versions[1:],
+            )
+
+        return self.respond_conditionally(request, compute_validators, respond, version_etag)
+
+    def counts_exactly(self, request):
+        """
+        Checks whether the request counts its results with a `COUNT(*)` query,
+        which are the only counts that see the writes of other processes without
+        a shared version cache (cached counts are keyed by the version counters).
+        """
+        paginator = self.paginator
+        return (
+            getattr(settings, "API_COUNT_MODE", "exact") == "exact"
+            and paginator is not None
+            and hasattr(paginator, "count_queryset")
+            and not paginator.uses_cursor(request)
+            and paginator.wants_count(request)
+        )
+
+
+class ConditionalRetrieveMixin(ConditionalGetMixin):
+    """
+    Adds conditional GET support to a detail view.
+    """
+    def retrieve(self, request, *args, **kwargs):
+        instance = None
+
+        def compute_validators(versions):
+            nonlocal instance
+            instance = self.get_object()
+            etag = build_etag(
+                request.get_full_path(), request.META.get("HTTP_ACCEPT", ""),
+                instance.pk, instance.version, versions[1:],
+            )
+            return etag, instance.modified
+
+        def respond():
+            return Response(self.get_serializer(instance).data)
+
+        return self.respond_conditionally(request, compute_validators, respond)
@@ -0,0 +1,178 @@
+"""
+Streaming export of whole tables as NDJSON or CSV, used by the export views in
+`api.views`.
+
+Rows are read as flat tuples with `values_list(...).iterator(chunk_size=...)`,
+with related objects joined in the same query, and written to the response in
+chunks of `API_EXPORT_CHUNK_SIZE` rows, so memory stays flat whatever the size
+of the catalog. Responses are gzipped when the client accepts it.
+
+Under ASGI, Django (4.1) iterates streaming responses in the event loop, where
+queries can't run, so the export is first written by the view (which runs in a
+thread) to a temporary file, kept in memory up to `SPOOL_MAX_SIZE` bytes, and
+the file is streamed instead.
+"""
+import csv
+import io
+import json
+import tempfile
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework import generics
+from rest_framework.renderers import BaseRenderer
+
+
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+class ExportRenderer(BaseRenderer):
+    """
+    Selects an export format through content negotiation (the `Accept` header,
+    the `format` query parameter or a format suffix). Export views stream their
+    rows themselves, so the renderer only renders errors.
+    """
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder).encode(self.charset)
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+def ndjson_chunks(columns, rows):
+    """
+    Yields the rows as JSON objects, one per line, in chunks of lines.
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    chunk = []
+    for row in rows:
+        chunk.append(encoder.encode(dict(zip(columns, row))))
+        if len(chunk) >= _chunk_size():
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def csv_chunks(columns, rows):
+    """
+    Yields a header line and the rows as CSV, in chunks of lines.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    lines = 0
+    for row in rows:
+        writer.writerow(["|".join(value) if isinstance(value, list) else value for value in row])
+        lines += 1
+        if lines >= _chunk_size():
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            lines = 0
+    yield buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    "ndjson": ndjson_chunks,
+    "csv": csv_chunks,
+}
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Checks whether an `Accept-Encoding` header accepts gzip, honoring quality
+    values: `gzip;q=0` refuses it, and `*` stands for codings not listed.
+    """
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    quality = qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0.0)))
+    return quality > 0
+
+
+def spool(content):
+    """
+    Writes the chunks to a temporary file (see the module docstring) and returns it, rewound.
+    """
+    file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    for chunk in content:
+        file.write(chunk)
+    file.seek(0)
+    return file
+
+
+def _chunk_size():
+    return getattr(settings, "API_EXPORT_CHUNK_SIZE", 2000)
+
+
+class ExportView(generics.GenericAPIView):
+    """
+    Streams the filtered queryset of the view in the negotiated format.
+    `export_columns` maps each output column to the field (or related field
+    lookup) it's read from; `get_export_columns` and `get_export_rows` can be
+    overridden to add columns that can't be read that way.
+    """
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    export_name = None
+    export_columns = {}
+
+    def get_export_columns(self):
+        return list(self.export_columns)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Exports are gzipped depending on Accept-Encoding, and errors vary like them for caches.
+        response = super().finalize_response(request, response, *args, **kwargs)
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
+
+    def get_export_rows(self, queryset):
+        return queryset.values_list(*self.export_columns.values()).iterator(chunk_size=_chunk_size())
+
+    @extend_schema(responses={
+        (200, NDJSONRenderer.media_type): OpenApiTypes.STR,
+        (200, CSVRenderer.media_type): OpenApiTypes.STR,
+    })
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        export_format = request.accepted_renderer.format
+        content = (
+            chunk.encode("utf-8")
+            for chunk in EXPORT_FORMATS[export_format](self.get_export_columns(), self.get_export_rows(queryset))
+        )
+        gzipped = accepts_gzip(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if gzipped:
+            content = compress_sequence(content)
+        content_type = f"{request.accepted_renderer.media_type}; charset=utf-8"
+        if isinstance(request._request, ASGIRequest):
+            response = FileResponse(spool(content), content_type=content_type)
+        else:
+            response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{self.export_name}.{export_format}"'
+        if gzipped:
+            response["Content-Encoding"] = "gzip"
+        return response
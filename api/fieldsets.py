@@ -0,0 +1,108 @@
+"""
+Sparse fieldsets (`?fields=id,name,price`) and opt-in expansion of related
+objects (`?expand=expansion,type1`).
+
+Without either parameter, responses keep their full representation. With any
+of them, only the selected fields are serialized (all of them if `fields` isn't
+given), related objects are represented by their id unless they are expanded,
+and the queryset only loads the selected columns.
+"""
+from rest_framework.exceptions import ValidationError
+
+
+class Fieldset:
+    """
+    The fields selected by a request, and the related fields it expands.
+    """
+    fields_query_param = "fields"
+    expand_query_param = "expand"
+
+    def __init__(self, fields, expand):
+        self.fields = fields
+        self.expand = expand
+
+    @classmethod
+    def from_request(cls, request, serializer_class):
+        """
+        Returns the fieldset of the request, or None if it doesn't select fields
+        or expand related objects. Raises a ValidationError for unknown fields.
+        """
+        params = request.query_params
+        if cls.fields_query_param not in params and cls.expand_query_param not in params:
+            return None
+        all_fields = list(serializer_class().fields)
+        expand = cls.parse(params.get(cls.expand_query_param, ""))
+        if not expand <= set(serializer_class.expandable_fields):
+            raise ValidationError("Invalid expand value")
+        fields = cls.parse(params.get(cls.fields_query_param, "")) or set(all_fields)
+        if not fields <= set(all_fields):
+            raise ValidationError("Invalid fields value")
+        # Expanding a field selects it.
+        fields |= expand
+        return cls([field for field in all_fields if field in fields], expand)
+
+    @staticmethod
+    def parse(value):
+        return {field.strip() for field in value.split(",") if field.strip()}
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Serializer mixin dropping the fields not selected by the `fieldset` in the
+    serializer context. `expandable_fields` maps each related field that can be
+    expanded to the serializer of its objects; `expanded_fields` returns the ones
+    to nest in the representation.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fieldset = self.context.get("fieldset")
+        if fieldset is not None:
+            for field in set(self.fields) - set(fieldset.fields):
+                self.fields.pop(field)
+
+    def expanded_fields(self):
+        fieldset = self.context.get("fieldset")
+        if fieldset is None:
+            return self.expandable_fields
+        return {field: serializer for field, serializer in self.expandable_fields.items() if field in fieldset.expand}
+
+
+class SparseFieldsetViewMixin:
+    """
+    View mixin applying the fieldset of GET requests to the serializer and, with
+    `only()`, to the queryset. The `modified` and `version` columns are always
+    loaded, since the conditional GET validators read them. The `nested_models`
+    of the view (see `api.conditional`) are narrowed to the expanded ones.
+    """
+    always_loaded_fields = ("modified", "version")
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            expandable_fields = self.get_serializer_class().expandable_fields
+            expanded_models = {expandable_fields[field].Meta.model for field in fieldset.expand}
+            self.nested_models = tuple(model for model in self.nested_models if model in expanded_models)
+
+    def get_fieldset(self):
+        if self.request is None or self.request.method not in ("GET", "HEAD"):
+            return None
+        if not hasattr(self, "_fieldset"):
+            self._fieldset = Fieldset.from_request(self.request, self.get_serializer_class())
+        return self._fieldset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fieldset"] = self.get_fieldset()
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return queryset
+        concrete_fields = {field.name for field in queryset.model._meta.concrete_fields}
+        columns = [field for field in [*fieldset.fields, *self.always_loaded_fields] if field in concrete_fields]
+        return queryset.only(*columns)
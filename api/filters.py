@@ -0,0 +1,157 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.sql.constants import LOUTER
+from rest_framework.filters import SearchFilter
+from api.fts import FTS_INDEXES, fts_table
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Drop-in replacement for DRF's `SearchFilter` that searches the view's
+    `search_fields` through the SQLite FTS5 indexes defined in `api.fts`,
+    instead of `LIKE '%term%'` scans.
+
+    Every search term has to match (as a word prefix, ignoring case and
+    diacritics) any of the indexed fields. Fields with choices (e.g. the card
+    rarity) are matched exactly instead, and any other field is searched like
+    `SearchFilter` does. Results are ordered by relevance, unless every term
+    is shorter than `min_rank_length`: such short prefixes match most rows, so
+    they're left in the queryset's order instead of ranking and sorting them all.
+    Databases other than SQLite, and models without an FTS5 index, are searched
+    like `SearchFilter` does.
+    """
+    min_rank_length = 3
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        db_table = queryset.model._meta.db_table
+        if (
+            not search_fields
+            or not search_terms
+            or db_table not in FTS_INDEXES
+            or connections[queryset.db].vendor != "sqlite"
+        ):
+            return super().filter_queryset(request, queryset, view)
+
+        indexed_columns = [field for field in search_fields if field in FTS_INDEXES[db_table]]
+        choice_values = {field: self.get_choice_values(queryset.model, field) for field in search_fields}
+        choice_fields = {field: values for field, values in choice_values.items() if values}
+        other_fields = [
+            field for field in search_fields
+            if field not in indexed_columns and field not in choice_fields
+        ]
+        table = fts_table(db_table)
+        matched_rows = f"SELECT rowid FROM {table} WHERE {table} MATCH %s"
+
+        match_expressions = []
+        conditions = []
+        for term in search_terms:
+            condition = Q()
+            match_expression = self.match_expression(term, indexed_columns)
+            if match_expression:
+                if len(term) >= self.min_rank_length:
+                    match_expressions.append(match_expression)
+                condition |= Q(pk__in=RawSQL(matched_rows, [match_expression]))
+            for field in choice_fields:
+                if term.lower() in choice_fields[field]:
+                    condition |= Q(**{field: term.lower()})
+            for field in other_fields:
+                condition |= Q(**{self.construct_search(field): term})
+            if not condition:
+                # The term has no searchable characters, so nothing matches it.
+                return queryset.none()
+            conditions.append(condition)
+        queryset = queryset.filter(*conditions)
+
+        if match_expressions:
+            # The index is queried once for the ranks of every matched row,
+            # instead of once per row. bm25() is negative, and lower is more
+            # relevant. Rows matched only through other fields are ranked last.
+            queryset = queryset.all()
+            rank_join = RankJoin(table, queryset.query.get_initial_alias(), " OR ".join(match_expressions))
+            rank_alias = queryset.query.join(rank_join)
+            rank = RawSQL(f"COALESCE({rank_alias}.rank, 0)", [])
+            queryset = queryset.alias(search_rank=rank).order_by("search_rank", "pk")
+        return queryset
+
+    def get_choice_values(self, model, field_name):
+        """
+        Returns the values the model field can take if it has choices (e.g. it's
+        an enum), or an empty set otherwise.
+        """
+        try:
+            choices = model._meta.get_field(field_name).choices or []
+        except FieldDoesNotExist:
+            return set()
+        return {str(value) for value, label in choices}
+
+    def match_expression(self, term, columns):
+        """
+        Builds an FTS5 query matching the term as a prefix in any of the columns,
+        or returns None if the term has no searchable characters.
+        """
+        if not columns or not any(character.isalnum() for character in term):
+            return None
+        phrase = term.replace('"', '""')
+        return f'{{{" ".join(columns)}}} : "{phrase}"*'
+
+
+class RankJoin:
+    """
+    `LEFT OUTER JOIN` of the bm25() rank of the rows matching an FTS5 query, on
+    their ids. It goes in `Query.alias_map` like Django's own `Join`, with the
+    attributes and methods listed there.
+    """
+    nullable = True
+    filtered_relation = None
+
+    def __init__(self, table, parent_alias, match_expression, table_alias=None, join_type=LOUTER):
+        self.fts_table = table
+        self.table_name = f"{table}_rank"
+        self.parent_alias = parent_alias
+        self.match_expression = match_expression
+        self.table_alias = table_alias
+        self.join_type = join_type
+
+    def as_sql(self, compiler, connection):
+        qn = compiler.quote_name_unless_alias
+        table = self.fts_table
+        sql = (
+            f"{self.join_type} (SELECT rowid AS id, bm25({table}) AS rank FROM {table} WHERE {table} MATCH %s) "
+            f"{self.table_alias} ON ({self.table_alias}.id = {qn(self.parent_alias)}.id)"
+        )
+        return sql, [self.match_expression]
+
+    def relabeled_clone(self, change_map):
+        return self.__class__(
+            self.fts_table,
+            change_map.get(self.parent_alias, self.parent_alias),
+            self.match_expression,
+            change_map.get(self.table_alias, self.table_alias),
+            self.join_type,
+        )
+
+    @property
+    def identity(self):
+        return self.__class__, self.table_name, self.parent_alias, self.match_expression
+
+    def __eq__(self, other):
+        if not isinstance(other, RankJoin):
+            return NotImplemented
+        return self.identity == other.identity
+
+    def __hash__(self):
+        return hash(self.identity)
+
+    def equals(self, other):
+        return self.identity == other.identity
+
+    def demote(self):
+        # The rank is optional, so the join stays an outer join.
+        return self
+
+    def promote(self):
+        return self
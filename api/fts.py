@@ -0,0 +1,68 @@
+"""
+SQLite FTS5 indexes used by `api.filters.FullTextSearchFilter`.
+
+Each index is an external content FTS5 table over a model table, kept in sync by
+triggers. The tables use the unicode61 tokenizer with diacritic folding, so
+"Pokemon" matches "Pokémon". Migrations that rebuild one of the indexed tables
+(which drops its triggers) must call `install_fts_indexes` again.
+"""
+
+# Indexed columns of each model table.
+FTS_INDEXES = {
+    "api_card": ("name",),
+    "api_expansion": ("name", "series"),
+}
+
+
+def fts_table(db_table):
+    """
+    Returns the name of the FTS5 table indexing `db_table`.
+    """
+    return f"{db_table}_fts"
+
+
+def _install_statements(db_table, columns):
+    table = fts_table(db_table)
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({column_list}, content='{db_table}', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"DROP TRIGGER IF EXISTS {table}_ai",
+        f"DROP TRIGGER IF EXISTS {table}_ad",
+        f"DROP TRIGGER IF EXISTS {table}_au",
+        f"CREATE TRIGGER {table}_ai AFTER INSERT ON {db_table} BEGIN "
+        f"INSERT INTO {table}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER {table}_ad AFTER DELETE ON {db_table} BEGIN "
+        f"INSERT INTO {table}({table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER {table}_au AFTER UPDATE OF {column_list} ON {db_table} BEGIN "
+        f"INSERT INTO {table}({table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {table}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+        f"INSERT INTO {table}({table}) VALUES ('rebuild')",
+    ]
+
+
+def install_fts_indexes(apps, schema_editor):
+    """
+    Creates (or repairs) the FTS5 tables and their triggers, and rebuilds the
+    indexes from the current rows. Does nothing on databases other than SQLite.
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for db_table, columns in FTS_INDEXES.items():
+        for statement in _install_statements(db_table, columns):
+            schema_editor.execute(statement)
+
+
+def uninstall_fts_indexes(apps, schema_editor):
+    """
+    Drops the FTS5 tables and their triggers.
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for db_table in FTS_INDEXES:
+        table = fts_table(db_table)
+        for suffix in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
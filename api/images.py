@@ -0,0 +1,160 @@
+"""
+Derivatives of the card images: resized variants in several formats, the
+dimensions of the original and a tiny placeholder, generated with Pillow when a
+card's image changes (see `Card.save`) and stored on the card, so serializing a
+card never opens an image file.
+
+Variants are set in `CARD_IMAGE_VARIANTS` (name to maximum width and height) and
+generated in each of the `CARD_IMAGE_FORMATS`. JPEG sources are decoded in draft
+mode at the smallest scale that still covers the largest variant, so memory
+doesn't grow with the size of the scans. Cards written in bulk don't go through
+`save`: their derivatives are generated by the `generate_image_variants` command.
+"""
+import base64
+import hashlib
+import io
+import os
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from PIL import Image, UnidentifiedImageError, features
+
+
+DEFAULT_VARIANTS = {
+    "thumbnail": (64, 90),
+    "small": (245, 342),
+    "medium": (480, 670),
+}
+
+DEFAULT_FORMATS = ("webp", "jpeg")
+
+# Pillow format name, file extension and save options of each format.
+FORMATS = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 85, "optimize": True, "progressive": True}),
+    "png": ("PNG", "png", {"optimize": True}),
+}
+
+PLACEHOLDER_SIZE = (16, 16)
+
+
+def get_variants():
+    return getattr(settings, "CARD_IMAGE_VARIANTS", DEFAULT_VARIANTS)
+
+
+def get_formats():
+    formats = getattr(settings, "CARD_IMAGE_FORMATS", DEFAULT_FORMATS)
+    return [image_format for image_format in formats if image_format != "webp" or features.check("webp")]
+
+
+def variant_name(source_name, variant, content, extension):
+    """
+    Returns the storage name of a variant of the given image, e.g.
+    `img/variants/pikachu_thumbnail_0a1b2c3d.webp` for `img/pikachu.jpg`. The
+    name includes a hash of the content, so it changes with it and the variants
+    can be cached forever (see `api.media`).
+    """
+    directory, filename = os.path.split(source_name)
+    stem = os.path.splitext(filename)[0]
+    digest = hashlib.sha256(content).hexdigest()[:8]
+    return os.path.join(directory, "variants", f"{stem}_{variant}_{digest}.{extension}")
+
+
+def open_scaled(file, max_size):
+    """
+    Opens the image and decodes it at a size of at least `max_size`, which JPEG
+    images do in draft mode (scaling by 1/2, 1/4 or 1/8 while decoding).
+    Returns the image and the size of the original.
+    """
+    image = Image.open(file)
+    original_size = image.size
+    image.draft("RGB", max_size)
+    image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+    return image, original_size
+
+
+def encode(image, image_format):
+    pil_format, _, options = FORMATS[image_format]
+    if pil_format == "JPEG" and image.mode == "RGBA":
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def placeholder(image):
+    """
+    Returns a data URI of the image scaled down to a few pixels, to show (blurred)
+    while the real image loads.
+    """
+    image = image.copy()
+    image.thumbnail(PLACEHOLDER_SIZE, Image.Resampling.BILINEAR)
+    image_format = "webp" if "webp" in get_formats() else "jpeg"
+    content = encode(image, image_format)
+    return f"data:image/{image_format};base64,{base64.b64encode(content).decode('ascii')}"
+
+
+def generate_derivatives(image_file):
+    """
+    Generates the variants of the image of the given `FieldFile`, saving them in
+    its storage, and returns the values of the card's derived fields. Variants
+    are never larger than the original.
+    Raises OSError if the image can't be read.
+    """
+    storage = image_file.storage
+    variants = get_variants()
+    max_size = tuple(max(size[i] for size in variants.values()) for i in (0, 1))
+    try:
+        with storage.open(image_file.name, "rb") as file:
+            image, original_size = open_scaled(file, max_size)
+    except (UnidentifiedImageError, Image.DecompressionBombError, SuspiciousFileOperation) as exc:
+        raise OSError(f"{image_file.name} can't be read: {exc}")
+
+    generated = {}
+    # From the largest variant to the smallest, each one resized from the previous.
+    for name, size in sorted(variants.items(), key=lambda item: item[1], reverse=True):
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        generated[name] = {"width": image.width, "height": image.height}
+        for image_format in get_formats():
+            content = encode(image, image_format)
+            path = variant_name(image_file.name, name, content, FORMATS[image_format][1])
+            # Same name, same content.
+            if not storage.exists(path):
+                path = storage.save(path, ContentFile(content))
+            generated[name][image_format] = path
+    return {
+        "image_width": original_size[0],
+        "image_height": original_size[1],
+        "image_placeholder": placeholder(image),
+        "image_variants": {"source": image_file.name, **{name: generated[name] for name in variants}},
+    }
+
+
+def empty_derivatives():
+    return {"image_width": None, "image_height": None, "image_placeholder": "", "image_variants": {}}
+
+
+DERIVED_FIELDS = tuple(empty_derivatives())
+
+
+def update_derivatives(card):
+    """
+    Sets the derived fields of the card from its image, unless they were already
+    generated from it. Returns False if the image couldn't be read, in which case
+    the derived fields are left empty.
+    """
+    if card.image and card.image_variants.get("source") == card.image.name:
+        return True
+    values, generated = empty_derivatives(), True
+    if card.image:
+        try:
+            values = generate_derivatives(card.image)
+        except OSError:
+            generated = False
+    for field, value in values.items():
+        setattr(card, field, value)
+    return generated
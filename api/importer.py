@@ -0,0 +1,303 @@
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from api.models import Card, Expansion, PokemonType
+from api.signals import invalidate
+
+# Card fields that can be imported, besides `name`.
+IMPORTED_FIELDS = ("first_edition", "rarity", "expansion", "type1", "type2", "hp", "card_number", "price", "image")
+
+TRUE_VALUES = {"true", "1", "yes", "y", "t"}
+FALSE_VALUES = {"false", "0", "no", "n", "f"}
+
+
+def read_rows(path, file_format=None):
+    """
+    Streams the rows of a CSV (with a header line) or JSON Lines file, as
+    `(line_number, row)` tuples. The format is guessed from the file extension
+    unless given.
+    """
+    file_format = file_format or ("jsonl" if str(path).endswith((".jsonl", ".ndjson", ".json")) else "csv")
+    with open(path, newline="", encoding="utf-8") as file:
+        if file_format == "csv":
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as exc:
+                    row = {"__error__": f"Invalid JSON: {exc}"}
+                yield line_number, row
+
+
+class RejectedRow:
+    """
+    A row that couldn't be imported, and why.
+    """
+    def __init__(self, line, row, errors):
+        self.line = line
+        self.row = row
+        self.errors = errors
+
+
+class ImportStats:
+    """
+    Running totals of an import.
+    """
+    def __init__(self):
+        self.processed = 0
+        self.created = 0
+        self.updated = 0
+        self.rejected = 0
+        self.started = time.monotonic()
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed else 0.0
+
+    def __str__(self):
+        return f"{self.processed} rows: {self.created} created, {self.updated} updated, {self.rejected} rejected " \
+               f"({self.rows_per_second:.0f} rows/s)"
+
+
+class CardImporter:
+    """
+    Imports cards from an iterable of `(line_number, row)` tuples, where each row
+    is a dict with a `name` and any of the `IMPORTED_FIELDS`. Expansions and types
+    are given by name (or primary key), and resolved through maps loaded once.
+
+    Rows are validated and written in batches: each batch runs one query to find
+    which names already exist, and a `bulk_create` (plus a `bulk_update` per set
+    of columns when upserting) inside a transaction. Invalid rows, and rows whose
+    name already exists unless `upsert` is set, are passed to `on_reject` instead
+    of stopping the import. `on_progress` gets the `ImportStats` after each batch.
+    """
+    def __init__(self, batch_size=1000, upsert=False, on_reject=None, on_progress=None):
+        self.batch_size = batch_size
+        self.upsert = upsert
+        self.on_reject = on_reject
+        self.on_progress = on_progress
+        self.stats = ImportStats()
+        self.expansions_by_name = {}
+        self.expansions_by_name_series = {}
+        for pk, name, series in Expansion.objects.values_list("pk", "name", "series"):
+            key = name.lower()
+            # Names are only unique within a series.
+            self.expansions_by_name[key] = None if key in self.expansions_by_name else pk
+            self.expansions_by_name_series[(key, series.lower())] = pk
+        self.expansion_pks = set(self.expansions_by_name_series.values())
+        self.types_by_name = {name.lower(): pk for pk, name in PokemonType.objects.values_list("pk", "name")}
+        self.type_pks = set(self.types_by_name.values())
+
+    def run(self, rows):
+        """
+        Imports every row and returns the `ImportStats`.
+        """
+        batch = []
+        for line, row in rows:
+            batch.append((line, row))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        return self.stats
+
+    def import_batch(self, batch):
+        """
+        Validates and writes a batch of rows.
+        """
+        cleaned = {}
+        for line, row in batch:
+            values, errors = self.clean(row)
+            if not errors and values["name"].lower() in cleaned:
+                errors = ["This name appears more than once in the batch."]
+            if errors:
+                self.reject(line, row, errors)
+            else:
+                cleaned[values["name"].lower()] = (line, row, values)
+
+        existing = dict(
+            Card.objects.annotate(name_lower=Lower("name"))
+            .filter(name_lower__in=list(cleaned))
+            .values_list("name_lower", "pk")
+        )
+        to_create = []
+        to_update = []
+        for name_lower, (line, row, values) in cleaned.items():
+            if name_lower not in existing:
+                to_create.append((line, row, Card(**values)))
+            elif self.upsert:
+                values.update(Card.modification_values())
+                to_update.append((line, row, Card(pk=existing[name_lower], **values), values.keys()))
+            else:
+                self.reject(line, row, ["Card with this name already exists."])
+
+        try:
+            with transaction.atomic():
+                Card.objects.bulk_create([card for line, row, card in to_create])
+                updates_by_fields = {}
+                for line, row, card, fields in to_update:
+                    updates_by_fields.setdefault(tuple(fields), []).append(card)
+                for fields, cards in updates_by_fields.items():
+                    Card.objects.bulk_update(cards, fields)
+            self.stats.created += len(to_create)
+            self.stats.updated += len(to_update)
+        except IntegrityError:
+            # Some names were taken concurrently: find which rows fail one by one.
+            self.write_one_by_one(to_create, to_update)
+        self.stats.processed += len(batch)
+        invalidate(Card)
+        if self.on_progress:
+            self.on_progress(self.stats)
+
+    def write_one_by_one(self, to_create, to_update):
+        for line, row, card in to_create:
+            try:
+                with transaction.atomic():
+                    card.save(force_insert=True)
+                self.stats.created += 1
+            except IntegrityError as exc:
+                self.reject(line, row, [str(exc)])
+        for line, row, card, fields in to_update:
+            try:
+                with transaction.atomic():
+                    card.save(update_fields=fields)
+                self.stats.updated += 1
+            except IntegrityError as exc:
+                self.reject(line, row, [str(exc)])
+
+    def reject(self, line, row, errors):
+        self.stats.rejected += 1
+        if self.on_reject:
+            self.on_reject(RejectedRow(line, row, errors))
+
+    def clean(self, row):
+        """
+        Validates a row with the same rules as `CardSerializer`, and returns the
+        keyword arguments of its Card (for the fields present in the row) and a
+        list of errors.
+        """
+        if not isinstance(row, dict):
+            return {}, ["Row must be an object."]
+        if "__error__" in row:
+            return {}, [row["__error__"]]
+        values = {}
+        errors = []
+        row = {key: (value.strip() if isinstance(value, str) else value) for key, value in row.items()}
+        row = {key: (None if value == "" else value) for key, value in row.items()}
+
+        name = row.get("name")
+        if name is None:
+            errors.append("Name is required.")
+        else:
+            name = str(name)
+            try:
+                float(name)
+                errors.append("Name must not be a number.")
+            except ValueError:
+                pass
+            if len(name) > 100:
+                errors.append("Name must have at most 100 characters.")
+            values["name"] = name
+
+        for field in IMPORTED_FIELDS:
+            if field not in row:
+                continue
+            value = row[field]
+            if value is not None:
+                try:
+                    value = getattr(self, f"clean_{field}")(value, row)
+                except ValueError as exc:
+                    errors.append(str(exc))
+                    continue
+            if field in ("expansion", "type1", "type2"):
+                values[f"{field}_id"] = value
+            else:
+                values[field] = value
+        return values, errors
+
+    def clean_first_edition(self, value, row):
+        if isinstance(value, bool):
+            return value
+        if str(value).lower() in TRUE_VALUES:
+            return True
+        if str(value).lower() in FALSE_VALUES:
+            return False
+        raise ValueError(f"{value} is not a valid boolean.")
+
+    def clean_rarity(self, value, row):
+        if str(value).lower() not in Card.RarityEnum.values:
+            raise ValueError(f"{value} is not a valid rarity.")
+        return str(value).lower()
+
+    def clean_expansion(self, value, row):
+        if isinstance(value, int) or str(value).isdigit():
+            if int(value) in self.expansion_pks:
+                return int(value)
+            raise ValueError(f"Expansion {value} does not exist.")
+        key = str(value).lower()
+        series = row.get("expansion_series")
+        if series is not None:
+            pk = self.expansions_by_name_series.get((key, str(series).lower()))
+        elif key in self.expansions_by_name and self.expansions_by_name[key] is None:
+            raise ValueError(f"There are several expansions named {value}, an expansion_series is needed.")
+        else:
+            pk = self.expansions_by_name.get(key)
+        if pk is None:
+            raise ValueError(f"Expansion {value} does not exist.")
+        return pk
+
+    def clean_type(self, value):
+        if isinstance(value, int) or str(value).isdigit():
+            if int(value) in self.type_pks:
+                return int(value)
+        elif str(value).lower() in self.types_by_name:
+            return self.types_by_name[str(value).lower()]
+        raise ValueError(f"Pokemon type {value} does not exist.")
+
+    def clean_type1(self, value, row):
+        return self.clean_type(value)
+
+    def clean_type2(self, value, row):
+        return self.clean_type(value)
+
+    def clean_hp(self, value, row):
+        hp = self.clean_positive_integer(value, "HP")
+        if hp % 10 != 0:
+            raise ValueError("HP must be a multiple of 10.")
+        return hp
+
+    def clean_card_number(self, value, row):
+        return self.clean_positive_integer(value, "Card number")
+
+    def clean_positive_integer(self, value, label):
+        try:
+            if isinstance(value, float) and not value.is_integer():
+                raise ValueError
+            number = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{label} must be an integer.")
+        if number < 0:
+            raise ValueError(f"{label} must be a positive integer.")
+        return number
+
+    def clean_price(self, value, row):
+        try:
+            price = Decimal(str(value))
+        except InvalidOperation:
+            raise ValueError(f"{value} is not a valid price.")
+        if not price.is_finite() or abs(price) >= 10 ** 6 or price != price.quantize(Decimal("0.01")):
+            raise ValueError(f"{value} is not a valid price (up to 999999.99, with 2 decimal places).")
+        return price
+
+    def clean_image(self, value, row):
+        return str(value)
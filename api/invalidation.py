@@ -0,0 +1,63 @@
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def _version_cache():
+    """
+    Returns the cache used to publish version counters. It should be a backend
+    shared by every worker (e.g. Redis or Memcached) in multi-worker deployments.
+    """
+    return caches[getattr(settings, "API_VERSION_CACHE", "default")]
+
+
+def version_cache_is_shared():
+    """
+    Checks whether the version cache is shared by every process, unlike the
+    local memory and dummy backends, which only this process (or none) sees.
+    """
+    return not isinstance(_version_cache(), (LocMemCache, DummyCache))
+
+
+def _version_key(model):
+    return f"api:version:{model._meta.label_lower}"
+
+
+LAST_WRITE_KEY = "api:version:last_write"
+
+
+def get_versions(*models):
+    """
+    Returns a tuple with the current version counter of each of the given models.
+    Models that were never modified have version 0.
+    """
+    keys = [_version_key(model) for model in models]
+    values = _version_cache().get_many(keys)
+    return tuple(values.get(key, 0) for key in keys)
+
+
+def bump_versions(*models):
+    """
+    Increments the version counter of each of the given models, so any copy
+    of their data cached by this or another worker can be detected as stale,
+    and records the time of the write (see `api.routing`).
+    """
+    cache = _version_cache()
+    for model in models:
+        key = _version_key(model)
+        if not cache.add(key, 1, timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                # The key expired or was evicted between `add` and `incr`.
+                cache.set(key, 1, timeout=None)
+    cache.set(LAST_WRITE_KEY, time.time(), timeout=None)
+
+
+def get_last_write_time():
+    """
+    Returns the time of the last version bump of any model, or None if there was none.
+    """
+    return _version_cache().get(LAST_WRITE_KEY)
@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from api.benchmarks import compare_results, get_environment, run_benchmarks
+from api.query_plans import seeded_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the serializers, and the requests, count and filter queries of every list view, on temporary "
+        "databases seeded with deterministic catalogs of each size, and writes the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", type=int, nargs="+", default=[1000, 100000, 1000000], help="Numbers of cards to seed."
+        )
+        parser.add_argument("--repeat", type=int, default=20, help="Number of times each measurement is repeated.")
+        parser.add_argument("--output", help="File to write the results to, as JSON.")
+        parser.add_argument("--compare", help="Results of a previous run (e.g. of another commit) to compare with.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The default database isn't a SQLite one.")
+        if options["repeat"] < 1 or min(options["sizes"]) < 1:
+            raise CommandError("The sizes and the number of repetitions must be positive numbers.")
+        previous = None
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                previous = json.load(file)
+
+        results = {"environment": get_environment(), "repeat": options["repeat"], "datasets": {}}
+        for size in options["sizes"]:
+            results["datasets"][str(size)] = dataset = self.run(size, options["repeat"])
+            self.report(size, dataset)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+                file.write("\n")
+            self.stdout.write(f"Results written to {options['output']}.")
+        if previous is not None:
+            self.compare(previous, results)
+
+    def run(self, size, repeat):
+        # A database file (instead of SQLite's in-memory test database) gets the same PRAGMAs as in production.
+        with tempfile.TemporaryDirectory() as directory:
+            with seeded_database(size, os.path.join(directory, "benchmark.sqlite3")) as seed_seconds:
+                dataset = run_benchmarks(repeat)
+        dataset["seed_seconds"] = seed_seconds
+        return dataset
+
+    def report(self, size, dataset):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{size} cards (seeded in {dataset['seed_seconds']:.1f} s)"))
+        for name, result in dataset["serializers"].items():
+            self.stdout.write(f"  {name:<32}{result['per_item_us']:>9.1f} us/item")
+        for name, result in dataset["views"].items():
+            self.stdout.write(
+                f"  {name:<32}{result['request_ms']:>9.2f} ms/page{result['queries']:>4} queries"
+                f"{result['count_ms']['exact']:>9.2f} ms count{result['filter_ms']:>9.2f} ms filter"
+            )
+
+    def compare(self, previous, results):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Compared with {previous.get('environment', {}).get('commit') or 'the previous results'}"
+        ))
+        for size, dataset in results["datasets"].items():
+            if size not in previous.get("datasets", {}):
+                continue
+            for path, old, new in compare_results(previous["datasets"][size], dataset):
+                if path.startswith("rows.") or path == "seed_seconds" or old == new:
+                    continue
+                ratio = new / old if old else float("inf")
+                style = self.style.ERROR if ratio > 1.1 else self.style.SUCCESS if ratio < 0.9 else str
+                self.stdout.write(style(f"  {size:>8} {path:<64}{old:>10.2f}{new:>10.2f}{ratio:>8.2f}x"))
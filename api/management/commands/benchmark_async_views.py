@@ -0,0 +1,109 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from api.query_plans import request_factory_settings, seeded_database
+
+
+class ThreadCounter:
+    """
+    Keeps the highest number of threads alive seen while requests are served.
+    """
+    def __init__(self):
+        self.peak = threading.active_count()
+
+    def sample(self):
+        self.peak = max(self.peak, threading.active_count())
+
+
+def run_wsgi(url, requests, concurrency, counter):
+    """
+    Sends the requests through the WSGI handler from `concurrency` threads, one
+    per concurrent connection, like a threaded WSGI server does.
+    """
+    local = threading.local()
+
+    def send(_):
+        if not hasattr(local, "client"):
+            local.client = Client()
+        started = time.perf_counter()
+        response = local.client.get(url)
+        counter.sample()
+        assert response.status_code == 200, response.status_code
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(send, range(requests)))
+
+
+def run_asgi(url, requests, concurrency, counter):
+    """
+    Sends the requests through the async request handler, `concurrency` of them
+    at a time, from a single event loop, like an ASGI server does.
+    """
+    async def main():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def send():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(url)
+                counter.sample()
+                assert response.status_code == 200, response.status_code
+                return time.perf_counter() - started
+
+        return await asyncio.gather(*(send() for _ in range(requests)))
+
+    return asyncio.run(main())
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the throughput and latency of the card list under concurrent requests: the DRF view through "
+        "the WSGI handler (one thread per connection) and through the async handler, and the native async view "
+        "(api.async_views), using a temporary database. Requests are sent in-process, without an HTTP server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cards", type=int, default=5000, help="Number of cards in the catalog.")
+        parser.add_argument("--requests", type=int, default=500, help="Number of requests per run.")
+        parser.add_argument("--concurrency", type=int, default=50, help="Number of requests in flight.")
+        parser.add_argument("--page-size", type=int, default=20, help="Cards per page.")
+
+    def handle(self, *args, **options):
+        if options["requests"] < 2 or options["concurrency"] < 1:
+            raise CommandError("At least 2 requests and a positive concurrency are needed.")
+        query = f"?page_size={options['page_size']}"
+        runs = [
+            ("WSGI, DRF view", reverse("card-list") + query, run_wsgi),
+            ("ASGI, DRF view", reverse("card-list") + query, run_asgi),
+            ("ASGI, async view", reverse("async-card-list") + query, run_asgi),
+        ]
+        with seeded_database(options["cards"]):
+            try:
+                self.stdout.write(
+                    f"{options['cards']} cards, {options['requests']} requests per run, "
+                    f"{options['concurrency']} in flight, pages of {options['page_size']} cards"
+                )
+                with request_factory_settings():
+                    for name, url, run in runs:
+                        # Warms up the reference data cache and the connections.
+                        run(url, options["concurrency"], options["concurrency"], ThreadCounter())
+                        counter = ThreadCounter()
+                        started = time.perf_counter()
+                        latencies = run(url, options["requests"], options["concurrency"], counter)
+                        elapsed = time.perf_counter() - started
+                        quantiles = statistics.quantiles(latencies, n=100)
+                        self.stdout.write(
+                            f"{name:<18}{len(latencies) / elapsed:>9.1f} req/s"
+                            f"{quantiles[49] * 1000:>9.1f} ms p50{quantiles[98] * 1000:>9.1f} ms p99"
+                            f"{counter.peak:>6} threads"
+                        )
+            finally:
+                connections.close_all()
@@ -0,0 +1,61 @@
+import io
+import time
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from api import renderers, views
+from api.query_plans import request_factory_settings, seeded_database
+
+
+def throughput(function, payload_size, iterations):
+    """
+    Runs the function the given number of times and returns the bytes per second
+    it processed, `payload_size` being the bytes processed by each run. Rendering
+    is measured against the size of DRF's JSON output, whatever the layout.
+    """
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    elapsed = time.perf_counter() - started
+    return payload_size * iterations / elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the size and throughput of the JSON renderers (including the columnar layout) and "
+        "parsers on pages of 100 cards, using a temporary database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=500, help="Number of times each page is processed.")
+
+    def handle(self, *args, **options):
+        with seeded_database(100):
+            request = APIRequestFactory().get(reverse("card-list"), {"page_size": 100})
+            with request_factory_settings():
+                data = views.CardList.as_view()(request).data
+
+        iterations = options["iterations"]
+        content = JSONRenderer().render(data)
+        self.stdout.write(f"Page of {len(data['results'])} cards, {len(content)} bytes, {iterations} iterations")
+        if renderers.orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed: the fast classes fall back to DRF's."))
+
+        results = [
+            ("render", "JSONRenderer", lambda: JSONRenderer().render(data)),
+            ("render", "FastJSONRenderer", lambda: renderers.FastJSONRenderer().render(data)),
+            ("render", "ColumnarJSONRenderer", lambda: renderers.ColumnarJSONRenderer().render(data)),
+            ("parse", "JSONParser", lambda: JSONParser().parse(io.BytesIO(content))),
+            ("parse", "FastJSONParser", lambda: renderers.FastJSONParser().parse(io.BytesIO(content))),
+        ]
+        baseline = {}
+        for operation, name, function in results:
+            size = len(function()) if operation == "render" else len(content)
+            rate = throughput(function, len(content), iterations)
+            baseline.setdefault(operation, rate)
+            self.stdout.write(
+                f"{operation:<7}{name:<22}{size:>8} bytes{len(content) / rate * 1000:>8.3f} ms/page"
+                f"{rate / 2 ** 20:>9.1f} MiB/s{rate / baseline[operation]:>8.2f}x"
+            )
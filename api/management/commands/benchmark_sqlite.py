@@ -0,0 +1,119 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from api.query_plans import seeded_database
+from api.sqlite import apply_pragmas, get_pragmas
+
+# SQLite's own defaults, which the database had before SQLITE_PRAGMAS.
+BASELINE_PRAGMAS = {
+    "journal_mode": "delete",
+    "synchronous": "full",
+    "cache_size": -2000,
+    "mmap_size": 0,
+    "temp_store": "default",
+}
+
+READ_SQL = (
+    "SELECT id, name, rarity, hp, price, expansion_id, type1_id, type2_id, modified, version "
+    "FROM api_card WHERE id > ? ORDER BY id LIMIT 20"
+)
+WRITE_SQL = "UPDATE api_card SET price = ?, version = version + 1 WHERE id = ?"
+
+
+def run_worker(path, pragmas, cards, write_ratio, deadline, seed, results):
+    """
+    Reads pages of cards and updates single cards (each in its own transaction,
+    like the API does) until the deadline, counting operations and lock errors.
+    Connections wait up to 5 seconds for a lock, like Django's.
+    """
+    rng = random.Random(seed)
+    stats = {"reads": 0, "writes": 0, "locked": 0, "write_latencies": []}
+    db = sqlite3.connect(path, timeout=5, isolation_level=None)
+    try:
+        apply_pragmas(db.cursor(), pragmas)
+        while time.perf_counter() < deadline:
+            try:
+                if rng.random() < write_ratio:
+                    started = time.perf_counter()
+                    db.execute("BEGIN")
+                    db.execute(WRITE_SQL, (rng.randrange(100, 10000) / 100, rng.randrange(1, cards + 1)))
+                    db.execute("COMMIT")
+                    stats["write_latencies"].append(time.perf_counter() - started)
+                    stats["writes"] += 1
+                else:
+                    db.execute(READ_SQL, (rng.randrange(0, cards),)).fetchall()
+                    stats["reads"] += 1
+            except sqlite3.OperationalError as exc:
+                if "locked" not in str(exc) and "busy" not in str(exc):
+                    raise
+                stats["locked"] += 1
+                if db.in_transaction:
+                    db.execute("ROLLBACK")
+    finally:
+        db.close()
+    results.append(stats)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the read and write throughput of concurrent workers on a temporary SQLite database file, "
+        "with SQLite's default settings and with SQLITE_PRAGMAS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cards", type=int, default=20000, help="Number of cards in the catalog.")
+        parser.add_argument("--workers", type=int, default=8, help="Number of concurrent workers.")
+        parser.add_argument("--write-ratio", type=float, default=0.2, help="Fraction of operations that write.")
+        parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The default database isn't a SQLite one.")
+        if options["workers"] < 1 or options["cards"] < 1:
+            raise CommandError("The number of workers and cards must be positive numbers.")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "benchmark.sqlite3")
+            with seeded_database(options["cards"], path):
+                connection.close()
+                self.stdout.write(
+                    f"{options['cards']} cards, {options['workers']} workers, "
+                    f"{options['write_ratio']:.0%} writes, {options['seconds']:g} s per run"
+                )
+                for name, pragmas in (("SQLite defaults", BASELINE_PRAGMAS), ("SQLITE_PRAGMAS", get_pragmas())):
+                    self.run(name, path, pragmas, options)
+
+    def run(self, name, path, pragmas, options):
+        # The journal mode is stored in the database file, so it's set before the workers start.
+        setup = sqlite3.connect(path, isolation_level=None)
+        apply_pragmas(setup.cursor(), pragmas)
+        setup.close()
+
+        results = []
+        deadline = time.perf_counter() + options["seconds"]
+        threads = [
+            threading.Thread(
+                target=run_worker,
+                args=(path, pragmas, options["cards"], options["write_ratio"], deadline, seed, results),
+            )
+            for seed in range(options["workers"])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        reads = sum(stats["reads"] for stats in results)
+        writes = sum(stats["writes"] for stats in results)
+        locked = sum(stats["locked"] for stats in results)
+        latencies = [latency for stats in results for latency in stats["write_latencies"]]
+        p99 = statistics.quantiles(latencies, n=100)[98] * 1000 if len(latencies) > 1 else 0
+        self.stdout.write(
+            f"{name:<17}{reads / options['seconds']:>10.0f} reads/s{writes / options['seconds']:>9.0f} writes/s"
+            f"{p99:>9.1f} ms p99 write{locked:>7} locked"
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.query_plans import check_view_plans, seeded_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs EXPLAIN QUERY PLAN on the queries of every list view and fails if any of "
+        "them sorts in a temporary B-tree, scans a whole table despite being filtered, or "
+        "aggregates a whole table without an index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            metavar="CARDS",
+            help="Check against a temporary database seeded with this many cards, "
+                 "instead of the configured database.",
+        )
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            with seeded_database(options["seed"]):
+                results = check_view_plans()
+        else:
+            results = check_view_plans()
+
+        problem_count = 0
+        for result in results:
+            style = self.style.ERROR if result.problems else self.style.SUCCESS
+            self.stdout.write(style(f"{result.case} ({'FAIL' if result.problems else 'OK'})"))
+            self.stdout.write(f"  {result.sql}")
+            for line in result.plan:
+                self.stdout.write(f"    {line}")
+            for problem in result.problems:
+                self.stdout.write(self.style.ERROR(f"  ! {problem}"))
+            problem_count += len(result.problems)
+        if problem_count:
+            raise CommandError(f"{problem_count} query plan problem(s) found.")
@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.catalog import CatalogDistributions, generate_catalog
+
+
+def parse_weights(value):
+    """
+    Parses `name=number` pairs separated by commas, e.g. "common=60,uncommon=30,rare=10".
+    """
+    weights = {}
+    for pair in value.split(","):
+        name, _, number = pair.partition("=")
+        try:
+            weights[name.strip().lower()] = float(number)
+        except ValueError:
+            raise CommandError(f"Invalid value {pair!r}: expected name=number pairs separated by commas.")
+    return weights
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a deterministic synthetic catalog of cards, spread over new expansions, with configurable "
+        "distributions. The same arguments and seed always generate the same catalog."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cards", type=int, default=1000000, help="Number of cards to generate.")
+        parser.add_argument("--expansions", type=int, default=150, help="Number of expansions to generate.")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the random generator.")
+        parser.add_argument("--batch-size", type=int, default=10000, help="Cards inserted per transaction.")
+        parser.add_argument(
+            "--rarity", default="common=60,uncommon=30,rare=10", help="Weight of each rarity, e.g. common=60,rare=10."
+        )
+        parser.add_argument(
+            "--price-median", default="common=0.25,uncommon=1,rare=8", help="Median price of each rarity."
+        )
+        parser.add_argument("--price-sigma", type=float, default=1.0, help="Spread of the log-normal prices.")
+        parser.add_argument(
+            "--type-skew", type=float, default=1.0, help="Zipf exponent of the types (0 for uniform)."
+        )
+        parser.add_argument("--dual-type-ratio", type=float, default=0.3, help="Fraction of cards with two types.")
+        parser.add_argument("--first-edition-ratio", type=float, default=0.1, help="Fraction of first editions.")
+        parser.add_argument("--hp-mean", type=float, default=90, help="Mean HP.")
+        parser.add_argument("--hp-stddev", type=float, default=40, help="Standard deviation of the HP.")
+        parser.add_argument(
+            "--expansion-size-sigma", type=float, default=0.5, help="Spread of the log-normal expansion sizes."
+        )
+        parser.add_argument(
+            "--images", action="store_true", help="Give the cards a placeholder image of their first type."
+        )
+
+    def handle(self, *args, **options):
+        if options["cards"] < 1 or options["expansions"] < 1 or options["batch_size"] < 1:
+            raise CommandError("The number of cards and expansions, and the batch size, must be positive numbers.")
+        distributions = CatalogDistributions(
+            rarity=parse_weights(options["rarity"]),
+            type_skew=options["type_skew"],
+            dual_type_ratio=options["dual_type_ratio"],
+            first_edition_ratio=options["first_edition_ratio"],
+            price_medians=parse_weights(options["price_median"]),
+            price_sigma=options["price_sigma"],
+            hp_mean=options["hp_mean"],
+            hp_stddev=options["hp_stddev"],
+            expansion_size_sigma=options["expansion_size_sigma"],
+        )
+        try:
+            distributions.validate()
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        def progress(inserted, elapsed):
+            self.stdout.write(f"{inserted} cards inserted, {inserted / elapsed:.0f} cards/s", ending="\r")
+            self.stdout.flush()
+
+        rate = generate_catalog(
+            options["cards"],
+            expansions=options["expansions"],
+            seed=options["seed"],
+            distributions=distributions,
+            batch_size=options["batch_size"],
+            images=options["images"],
+            progress=progress if options["verbosity"] > 0 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {options['cards']} cards in {options['expansions']} expansions ({rate:.0f} cards/s)."
+        ))
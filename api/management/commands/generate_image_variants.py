@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from api.images import DERIVED_FIELDS, update_derivatives
+from api.models import Card
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates the image variants, dimensions and placeholders of the cards whose image changed without "
+        "going through Card.save (e.g. imported or written in bulk)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Generate them again for every card with an image.")
+
+    def handle(self, *args, **options):
+        generated = failed = 0
+        cards = Card.objects.exclude(image="").exclude(image=None).only("id", "image", "version", *DERIVED_FIELDS)
+        for card in cards.iterator(chunk_size=500):
+            if options["all"]:
+                card.image_variants = {}
+            elif card.image_variants.get("source") == card.image.name:
+                continue
+            if update_derivatives(card):
+                generated += 1
+            else:
+                failed += 1
+                self.stderr.write(f"Card {card.pk}: can't read {card.image.name}.")
+            card.save(update_fields=DERIVED_FIELDS)
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(f"Generated the image variants of {generated} cards, {failed} failed."))
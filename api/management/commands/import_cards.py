@@ -0,0 +1,55 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from api.importer import CardImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports cards from CSV (with a header line) or JSON Lines files, in batches. "
+        "Rows that can't be imported are reported instead of stopping the import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="CSV or JSON Lines files to import.")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Format of the files. Guessed from their extension by default.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows written per transaction.")
+        parser.add_argument("--upsert", action="store_true", help="Update the cards whose name already exists.")
+        parser.add_argument(
+            "--rejects",
+            help="JSON Lines file where rejected rows are written. They're printed to stderr by default.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("The batch size must be a positive number.")
+        rejects_file = open(options["rejects"], "w", encoding="utf-8") if options["rejects"] else None
+        try:
+            for path in options["paths"]:
+                def report_rejected(rejected, path=path):
+                    if rejects_file:
+                        rejects_file.write(json.dumps(
+                            {"file": path, "line": rejected.line, "errors": rejected.errors, "row": rejected.row},
+                            default=str,
+                        ) + "\n")
+                    else:
+                        self.stderr.write(f"{path}:{rejected.line}: {' '.join(rejected.errors)}")
+
+                importer = CardImporter(
+                    batch_size=options["batch_size"],
+                    upsert=options["upsert"],
+                    on_reject=report_rejected,
+                    on_progress=lambda stats, path=path: self.stdout.write(f"{path}: {stats}"),
+                )
+                try:
+                    stats = importer.run(read_rows(path, options["format"]))
+                except OSError as exc:
+                    raise CommandError(f"Can't read {path}: {exc}")
+                style = self.style.WARNING if stats.rejected else self.style.SUCCESS
+                self.stdout.write(style(f"{path}: done. {stats}"))
+        finally:
+            if rejects_file:
+                rejects_file.close()
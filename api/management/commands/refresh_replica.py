@@ -0,0 +1,45 @@
+import os
+import sqlite3
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from api.routing import get_replica_alias, get_replica_path, record_refresh
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies the primary SQLite database to the read-only replica that GET requests read from "
+        "(see api.routing). Run it periodically, or after imports."
+    )
+
+    def handle(self, *args, **options):
+        alias = get_replica_alias()
+        if alias is None:
+            if getattr(settings, "API_REPLICA_DATABASE", None) in settings.DATABASES:
+                raise CommandError(
+                    "The replica is off because API_VERSION_CACHE isn't shared by every process (see api.routing)."
+                )
+            raise CommandError("There is no replica database (see API_REPLICA_DATABASE).")
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor != "sqlite" or connections[alias].vendor != "sqlite":
+            raise CommandError("The primary and replica databases must be SQLite ones.")
+        if connection.in_atomic_block:
+            raise CommandError("The database can't be copied inside a transaction.")
+        path = get_replica_path(alias)
+        temporary_path = f"{path}.tmp"
+
+        # Every write committed before the copy starts is in the replica.
+        started = time.time()
+        connection.ensure_connection()
+        replica = sqlite3.connect(temporary_path)
+        try:
+            connection.connection.backup(replica)
+            # The replica is opened read-only, so it can't use a WAL file.
+            replica.execute("PRAGMA journal_mode = delete")
+        finally:
+            replica.close()
+        # Connections already open keep reading the previous copy until they're closed.
+        os.replace(temporary_path, path)
+        record_refresh(path, started)
+        self.stdout.write(f"Copied the database to {path} in {time.time() - started:.2f} s.")
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections
+from api.sqlite import compare_pragmas, convert_journal_mode
+
+
+class Command(BaseCommand):
+    help = "Shows the configured and actual PRAGMAs of the SQLite databases (see SQLITE_PRAGMAS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", help="Only show the given database. All of them by default.")
+        parser.add_argument(
+            "--check", action="store_true", help="Exit with an error if a PRAGMA doesn't have its configured value."
+        )
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Set the configured journal mode on existing databases, which connections leave unchanged.",
+        )
+
+    def handle(self, *args, **options):
+        aliases = [options["database"]] if options["database"] else list(connections)
+        mismatches = 0
+        for alias in aliases:
+            connection = connections[alias]
+            if connection.vendor != "sqlite":
+                self.stdout.write(f"{alias}: not a SQLite database.")
+                continue
+            self.stdout.write(f"{alias} ({connection.settings_dict['NAME']}):")
+            try:
+                if options["convert"]:
+                    convert_journal_mode(connection)
+                pragmas = compare_pragmas(connection)
+            except DatabaseError as exc:
+                # E.g. the replica before its first refresh.
+                self.stdout.write(self.style.WARNING(f"  can't be opened: {exc}"))
+                continue
+            for name, configured, actual in pragmas:
+                matches = configured == actual
+                mismatches += not matches
+                style = self.style.SUCCESS if matches else self.style.ERROR
+                self.stdout.write(style(f"  {name:<14}{actual!s:>12}  (configured: {configured})"))
+        if options["check"] and mismatches:
+            raise CommandError(f"{mismatches} PRAGMAs don't have their configured value.")
@@ -0,0 +1,162 @@
+"""
+Production view of the uploaded card images (`MEDIA_URL` + `img/`), routed in
+`pokemon/urls.py`.
+
+Responses have a strong ETag (a hash of the content, computed once per version
+of each file), a Last-Modified date and long-lived cache headers, and answer
+`If-None-Match`/`If-Modified-Since` with a 304. The bytes themselves are:
+
+* left to the front proxy when `MEDIA_OFFLOAD` is set: `"x-accel-redirect"`
+  (nginx, with the internal location in `MEDIA_ACCEL_REDIRECT_PREFIX`) or
+  `"x-sendfile"` (Apache, lighttpd), which then also handles `Range` requests;
+* otherwise sent with a `FileResponse`, which servers supporting
+  `wsgi.file_wrapper` send with `sendfile`. Single `Range` requests (and
+  `If-Range`) are answered with a 206.
+"""
+import functools
+import hashlib
+import mimetypes
+import os
+import re
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views import View
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+@functools.lru_cache(maxsize=4096)
+def content_hash(path, mtime_ns, size):
+    """
+    Returns the SHA-256 of the file. The modification time and size are part of
+    the cache key, so the hash is computed again when the file changes.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_range(header, size):
+    """
+    Returns the (start, end) bytes (inclusive) of a single range `Range` header,
+    None if the header should be ignored (it's invalid or has several ranges),
+    or raises ValueError if the range can't be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if start == "":
+        # Suffix range: the last `end` bytes.
+        if int(end) == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - int(end), 0), size - 1
+    start = int(start)
+    if end and int(end) < start:
+        return None
+    if start >= size:
+        raise ValueError("Unsatisfiable range")
+    return start, min(int(end), size - 1) if end else size - 1
+
+
+def ranged_content(path, start, end, block_size=FileResponse.block_size):
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(block_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class MediaView(View):
+    """
+    Serves the files under `MEDIA_ROOT/<directory>`.
+    """
+    http_method_names = ["get", "head"]
+    directory = "img"
+
+    def get_path(self, path):
+        try:
+            full_path = safe_join(os.path.join(settings.MEDIA_ROOT, self.directory), path)
+        except SuspiciousFileOperation:
+            raise Http404("File not found")
+        if not os.path.isfile(full_path):
+            raise Http404("File not found")
+        return full_path
+
+    def get(self, request, path):
+        full_path = self.get_path(path)
+        stat = os.stat(full_path)
+        etag = f'"{content_hash(full_path, stat.st_mtime_ns, stat.st_size)}"'
+        last_modified = int(stat.st_mtime)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            offload = getattr(settings, "MEDIA_OFFLOAD", None)
+            if offload:
+                response = self.offloaded_response(full_path, path, offload)
+            else:
+                response = self.file_response(request, full_path, stat.st_size, etag, last_modified)
+        if response.status_code == 416:
+            return response
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(
+            response, public=True, max_age=getattr(settings, "MEDIA_CACHE_MAX_AGE", 365 * 24 * 60 * 60),
+            immutable=True,
+        )
+        return response
+
+    def offloaded_response(self, full_path, path, offload):
+        """
+        Returns an empty response telling the front proxy which file to send.
+        """
+        response = HttpResponse(content_type=mimetypes.guess_type(full_path)[0] or "application/octet-stream")
+        if offload == "x-accel-redirect":
+            prefix = getattr(settings, "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+            response["X-Accel-Redirect"] = f"{prefix.rstrip('/')}/{self.directory}/{path}"
+        else:
+            response["X-Sendfile"] = full_path
+        return response
+
+    def file_response(self, request, full_path, size, etag, last_modified):
+        content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        byte_range = None
+        range_header = request.META.get("HTTP_RANGE")
+        if range_header and self.if_range_matches(request, etag, last_modified):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+        if byte_range is None:
+            response = FileResponse(open(full_path, "rb"), content_type=content_type)
+        else:
+            start, end = byte_range
+            content = ranged_content(full_path, start, end) if request.method == "GET" else ()
+            response = FileResponse(content, status=206, content_type=content_type)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = end - start + 1
+        response["Accept-Ranges"] = "bytes"
+        return response
+
+    def if_range_matches(self, request, etag, last_modified):
+        """
+        Returns whether the `If-Range` header (if any) matches the current
+        version of the file, so the range can be sent.
+        """
+        if_range = request.META.get("HTTP_IF_RANGE")
+        if not if_range:
+            return True
+        if if_range.startswith('"'):
+            return if_range == etag
+        return parse_http_date_safe(if_range) == last_modified
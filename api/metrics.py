@@ -0,0 +1,316 @@
+"""
+In-process Prometheus metrics, served in the text exposition format at
+`/metrics` (routed in `pokemon/urls.py`).
+
+`MetricsMiddleware` records, for each request, labeled by the name of its URL
+(e.g. "card-list" or "card-list-by-type"):
+
+- the number of requests, by view, method and status, and those in flight;
+- a histogram of their durations, and one of the sizes of their responses;
+- the number and time of their database queries, taken from the timings of
+  `api.timing` (so they're only recorded while `API_TIMING_ENABLED` is set).
+
+The response cache counts its lookups by result, and `/metrics` adds its hit ratio.
+
+Every worker process writes its values to its own memory-mapped file in
+`API_METRICS_DIR`, without locking other processes out, and `/metrics` adds up
+the files of every worker, whichever worker answers it. Counters and histograms
+of workers that exited are kept (so totals never go down), while gauges only add
+up the workers still running. Clear the directory when deploying.
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+from django.views import View
+from api.timing import get_current_timings
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, math.inf)
+
+# Type, help text and buckets (of histograms) of each metric.
+METRICS = {
+    "api_requests_total": ("counter", "Requests handled, by view, method and status.", None),
+    "api_requests_in_flight": ("gauge", "Requests being handled.", None),
+    "api_request_duration_seconds": ("histogram", "Time taken to handle requests, by view.", DURATION_BUCKETS),
+    "api_response_size_bytes": ("histogram", "Size of the response bodies, by view.", SIZE_BUCKETS),
+    "api_db_queries_total": ("counter", "Database queries run by requests, by view.", None),
+    "api_db_query_duration_seconds_total": ("counter", "Time spent in the database queries of requests, by view.", None),
+    "api_response_cache_lookups_total": ("counter", "Lookups in the response cache, by result.", None),
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_HEADER = struct.Struct("<Q")
+_KEY_LENGTH = struct.Struct("<I")
+_VALUE = struct.Struct("<d")
+
+
+class MetricsFile:
+    """
+    Values keyed by strings in a memory-mapped file, written by a single process.
+
+    The file starts with the number of bytes used, followed by entries made of
+    the length of the key, the UTF-8 key, padding to a multiple of 8 bytes and
+    the value (a double). Entries are written before the number of bytes used
+    is updated, so readers never see partial entries.
+    """
+    def __init__(self, path, initial_size=65536):
+        self.path = path
+        self._lock = threading.Lock()
+        self._positions = {}
+        self._file = open(path, "a+b")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _HEADER.size:
+            self._file.truncate(initial_size)
+            size = initial_size
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._used = _HEADER.unpack_from(self._map, 0)[0] or _HEADER.size
+        for key, position, _ in read_entries(self._map, self._used):
+            self._positions[key] = position
+
+    def inc(self, key, amount=1):
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                position = self._add(key)
+            _VALUE.pack_into(self._map, position, _VALUE.unpack_from(self._map, position)[0] + amount)
+
+    def _add(self, key):
+        encoded = key.encode()
+        value_position = self._used + _KEY_LENGTH.size + len(encoded)
+        value_position += -value_position % 8
+        end = value_position + _VALUE.size
+        if end > len(self._map):
+            self._grow(end)
+        _KEY_LENGTH.pack_into(self._map, self._used, len(encoded))
+        self._map[self._used + _KEY_LENGTH.size:self._used + _KEY_LENGTH.size + len(encoded)] = encoded
+        _VALUE.pack_into(self._map, value_position, 0.0)
+        self._used = end
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._positions[key] = value_position
+        return value_position
+
+    def _grow(self, needed):
+        size = len(self._map)
+        while size < needed:
+            size *= 2
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def read_entries(data, used=None):
+    """
+    Yields the `(key, value position, value)` of the entries of the contents of a metrics file.
+    """
+    if len(data) < _HEADER.size:
+        return
+    if used is None:
+        used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+    position = _HEADER.size
+    while position < used:
+        length = _KEY_LENGTH.unpack_from(data, position)[0]
+        key = bytes(data[position + _KEY_LENGTH.size:position + _KEY_LENGTH.size + length]).decode()
+        position += _KEY_LENGTH.size + length
+        position += -position % 8
+        yield key, position, _VALUE.unpack_from(data, position)[0]
+        position += _VALUE.size
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_metrics_dir():
+    """
+    Returns the directory of the metrics files.
+    """
+    return str(getattr(settings, "API_METRICS_DIR", None) or os.path.join(settings.BASE_DIR, "metrics"))
+
+
+def get_store():
+    """
+    Returns the metrics file of this process, opening it again after a fork or
+    a change of `API_METRICS_DIR`.
+    """
+    global _store
+    directory = get_metrics_dir()
+    path = os.path.join(directory, f"{os.getpid()}.metrics")
+    store = _store
+    if store is None or store.path != path:
+        with _store_lock:
+            if _store is None or _store.path != path:
+                if _store is not None:
+                    _store.close()
+                os.makedirs(directory, exist_ok=True)
+                _store = MetricsFile(path)
+            store = _store
+    return store
+
+
+def make_key(name, labels):
+    return json.dumps([name, labels])
+
+
+def inc(name, labels=(), amount=1):
+    """
+    Adds `amount` to the counter or gauge `name` with the `(name, value)` labels.
+    """
+    if getattr(settings, "API_METRICS_ENABLED", True):
+        get_store().inc(make_key(name, list(labels)), amount)
+
+
+def observe(name, value, labels=()):
+    """
+    Adds the value to the histogram `name` with the `(name, value)` labels.
+    Buckets are stored apart, and only made cumulative when they're collected.
+    """
+    if not getattr(settings, "API_METRICS_ENABLED", True):
+        return
+    labels = list(labels)
+    store = get_store()
+    buckets = METRICS[name][2]
+    bound = next(bound for bound in buckets if value <= bound)
+    store.inc(make_key(f"{name}_bucket", labels + [("le", bound)]))
+    store.inc(make_key(f"{name}_sum", labels), value)
+    store.inc(make_key(f"{name}_count", labels))
+
+
+def process_is_running(pid):
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # Signals can't probe processes on Windows.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """
+    Returns the values of every worker's file, added up by key.
+    """
+    directory = get_metrics_dir()
+    values = {}
+    if not os.path.isdir(directory):
+        return values
+    for filename in os.listdir(directory):
+        pid, extension = os.path.splitext(filename)
+        if extension != ".metrics" or not pid.isdigit():
+            continue
+        running = process_is_running(int(pid))
+        with open(os.path.join(directory, filename), "rb") as file:
+            data = file.read()
+        for key, _, value in read_entries(data):
+            name, labels = json.loads(key)
+            if not running and METRICS.get(name, ("counter",))[0] == "gauge":
+                continue
+            labels = tuple((label, value if label == "le" else str(value)) for label, value in labels)
+            values[name, labels] = values.get((name, labels), 0) + value
+    return values
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, (value if isinstance(value, str) else format_value(value))
+         .replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def render_metrics(values):
+    """
+    Returns the collected values in the Prometheus text exposition format.
+    """
+    lines = []
+    for name, (metric_type, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        if metric_type != "histogram":
+            for (key, labels), value in sorted(values.items()):
+                if key == name:
+                    lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+            continue
+        for (key, labels), count in sorted(values.items()):
+            if key != f"{name}_count":
+                continue
+            cumulative = 0
+            for bound in buckets:
+                cumulative += values.get((f"{name}_bucket", labels + (("le", bound),)), 0)
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', bound),))} {format_value(cumulative)}")
+            lines.append(f"{name}_sum{format_labels(labels)} {format_value(values.get((f'{name}_sum', labels), 0))}")
+            lines.append(f"{name}_count{format_labels(labels)} {format_value(count)}")
+
+    lookups = {
+        labels[0][1]: value for (key, labels), value in values.items() if key == "api_response_cache_lookups_total"
+    }
+    total = sum(lookups.values())
+    hits = lookups.get("l1_hits", 0) + lookups.get("l2_hits", 0)
+    lines.append("# HELP api_response_cache_hit_ratio Fraction of the response cache lookups that were hits.")
+    lines.append("# TYPE api_response_cache_hit_ratio gauge")
+    lines.append(f"api_response_cache_hit_ratio {format_value(hits / total if total else 0)}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """
+    Records the metrics of every request (see the module docstring). It must
+    come after `api.timing.ServerTimingMiddleware`, which times the queries.
+    """
+    def process_request(self, request):
+        if getattr(settings, "API_METRICS_ENABLED", True):
+            request.metrics_started = time.perf_counter()
+            inc("api_requests_in_flight")
+
+    def process_response(self, request, response):
+        started = getattr(request, "metrics_started", None)
+        if started is None:
+            return response
+        inc("api_requests_in_flight", amount=-1)
+        match = getattr(request, "resolver_match", None)
+        # Unmatched URLs share a label, so they can't add labels without bound.
+        view = (match.view_name if match else None) or "unmatched"
+        labels = [("view", view)]
+        inc("api_requests_total", labels + [("method", request.method), ("status", str(response.status_code))])
+        observe("api_request_duration_seconds", time.perf_counter() - started, labels)
+        if not response.streaming:
+            observe("api_response_size_bytes", len(response.content), labels)
+        timings = get_current_timings()
+        if timings is not None:
+            inc("api_db_queries_total", labels, timings.queries)
+            inc("api_db_query_duration_seconds_total", labels, timings.sql)
+        return response
+
+
+class MetricsView(View):
+    """
+    Serves the metrics of every worker in the Prometheus text format.
+    """
+    def get(self, request):
+        return HttpResponse(render_metrics(collect()), content_type=CONTENT_TYPE)
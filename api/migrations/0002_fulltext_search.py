@@ -0,0 +1,13 @@
+from django.db import migrations
+from api.fts import install_fts_indexes, uninstall_fts_indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(install_fts_indexes, uninstall_fts_indexes),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.1.7 on 2026-10-18 12:49
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_fulltext_search"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="card",
+            index=models.Index(fields=["rarity"], name="card_rarity_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="card",
+            index=models.Index(fields=["created"], name="card_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="card",
+            index=models.Index(fields=["expansion", "card_number"], name="card_expansion_number_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="card",
+            index=models.Index(fields=["price"], name="card_price_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="expansion",
+            index=models.Index(django.db.models.functions.text.Lower("series"), name="expansion_series_lower_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="expansion",
+            index=models.Index(fields=["release_date"], name="expansion_release_date_idx"),
+        ),
+    ]
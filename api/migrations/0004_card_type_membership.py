@@ -0,0 +1,28 @@
+# Generated by Django 4.1.7 on 2026-10-18 12:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+from api.type_membership import install_type_membership_triggers, uninstall_type_membership_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CardTypeMembership",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("card", models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name="type_memberships", to="api.card")),
+                ("pokemon_type", models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name="card_memberships", to="api.pokemontype")),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="cardtypemembership",
+            constraint=models.UniqueConstraint(fields=("pokemon_type", "card"), name="unique_card_type_membership"),
+        ),
+        migrations.RunPython(install_type_membership_triggers, uninstall_type_membership_triggers),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.1.7 on 2026-10-18 12:58
+
+from django.db import migrations, models
+import django.utils.timezone
+from api.fts import install_fts_indexes
+from api.type_membership import install_type_membership_triggers
+
+
+def install_triggers(apps, schema_editor):
+    # Adding the fields rebuilds the api_card and api_expansion tables, which drops their triggers.
+    install_fts_indexes(apps, schema_editor)
+    install_type_membership_triggers(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_card_type_membership"),
+    ]
+
+    operations = [
+        # Reinstalls the triggers after the fields are removed, when unapplied.
+        migrations.RunPython(migrations.RunPython.noop, install_triggers),
+        migrations.AddField(
+            model_name="card",
+            name="modified",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="card",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name="expansion",
+            name="modified",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="expansion",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name="pokemontype",
+            name="modified",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="pokemontype",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.RunPython(install_triggers, migrations.RunPython.noop),
+    ]
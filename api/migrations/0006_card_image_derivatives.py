@@ -0,0 +1,44 @@
+# Generated by Django 4.1.7 on 2026-10-18 12:58
+
+from django.db import migrations, models
+from api.fts import install_fts_indexes
+from api.type_membership import install_type_membership_triggers
+
+
+def install_triggers(apps, schema_editor):
+    # Adding the fields rebuilds the api_card table, which drops its triggers.
+    install_fts_indexes(apps, schema_editor)
+    install_type_membership_triggers(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_modified_and_version"),
+    ]
+
+    operations = [
+        # Reinstalls the triggers after the fields are removed, when unapplied.
+        migrations.RunPython(migrations.RunPython.noop, install_triggers),
+        migrations.AddField(
+            model_name="card",
+            name="image_height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="card",
+            name="image_placeholder",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.AddField(
+            model_name="card",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="card",
+            name="image_width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(install_triggers, migrations.RunPython.noop),
+    ]
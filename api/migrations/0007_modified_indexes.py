@@ -0,0 +1,25 @@
+# Generated by Django 4.1.7 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_card_image_derivatives"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="card",
+            index=models.Index(fields=["modified"], name="card_modified_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="expansion",
+            index=models.Index(fields=["modified"], name="expansion_modified_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="pokemontype",
+            index=models.Index(fields=["modified"], name="pokemontype_modified_idx"),
+        ),
+    ]
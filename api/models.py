@@ -1,9 +1,39 @@
 from django.db import models
+from django.utils import timezone
 from django_enum import EnumField
 from django.db.models.functions import Lower
+from api.images import DERIVED_FIELDS, update_derivatives
 
 
-class Expansion(models.Model):
+class VersionedModel(models.Model):
+	"""
+	Abstract model keeping the time of the last modification of each row and a
+	version number incremented on every save, used to build the HTTP validators
+	of the views (see `api.conditional`). Bulk updates don't call `save`, so they
+	must set both fields with `modification_values`.
+	"""
+	class Meta:
+		abstract = True
+
+	modified = models.DateTimeField(auto_now=True)
+	version = models.PositiveIntegerField(default=1, editable=False)
+
+	def save(self, *args, **kwargs):
+		if self.pk is not None and not self._state.adding:
+			self.version += 1
+			if kwargs.get("update_fields") is not None:
+				kwargs["update_fields"] = {*kwargs["update_fields"], "modified", "version"}
+		super().save(*args, **kwargs)
+
+	@staticmethod
+	def modification_values():
+		"""
+		Returns the values of `modified` and `version` for a bulk update.
+		"""
+		return {"modified": timezone.now(), "version": models.F("version") + 1}
+
+
+class Expansion(VersionedModel):
 	"""
 	Pokémon expansion
 	"""
@@ -13,6 +43,11 @@ class Expansion(models.Model):
 				Lower('name'), Lower('series'), name='unique_expansion_name_series'
 			)
 		]
+		indexes = [
+			models.Index(Lower('series'), name='expansion_series_lower_idx'),
+			models.Index(fields=['release_date'], name='expansion_release_date_idx'),
+			models.Index(fields=['modified'], name='expansion_modified_idx'),
+		]
 		ordering = ['id']
 
 	name = models.CharField(max_length=100, blank=False)
@@ -31,14 +66,31 @@ class Expansion(models.Model):
 									   f"PROMOTIONAL SET?: {self.promotional_set}."
 
 
-class PokemonType(models.Model):
+class PokemonTypeQuerySet(models.QuerySet):
+	"""
+	QuerySet for PokemonType with helpers to load related data in bulk.
+	"""
+	def with_matchups(self):
+		"""
+		Prefetches the `strong_vs`, `weak_vs`, `resistant_to` and `vulnerable_to`
+		relations, so serializing a page of types runs a fixed number of queries.
+		"""
+		return self.prefetch_related(*PokemonType.MATCHUP_FIELDS)
+
+
+class PokemonType(VersionedModel):
 	"""
 	Pokémon type
 	"""
+	MATCHUP_FIELDS = ("strong_vs", "weak_vs", "resistant_to", "vulnerable_to")
+
 	class Meta:
 		constraints = [
 			models.UniqueConstraint(Lower('name'), name='unique_type_name')
 		]
+		indexes = [
+			models.Index(fields=['modified'], name='pokemontype_modified_idx'),
+		]
 		ordering = ['id']
 
 	name = models.CharField(max_length=100, blank=False)
@@ -46,12 +98,16 @@ class PokemonType(models.Model):
 	weak_vs = models.ManyToManyField('self', blank=True, symmetrical=False, related_name="weak_versus")
 	resistant_to = models.ManyToManyField('self', blank=True, symmetrical=False, related_name="resists")
 	vulnerable_to = models.ManyToManyField('self', blank=True, symmetrical=False, related_name="vulnerable")
+
+	objects = PokemonTypeQuerySet.as_manager()
 	
 	def __str__(self):
-		strong_vs_names =  ", ".join(self.strong_vs.values_list('name', flat=True))
-		weak_vs_names =  ", ".join(self.weak_vs.values_list('name', flat=True))
-		resistant_to_names =  ", ".join(self.resistant_to.values_list('name', flat=True))
-		vulnerable_to_names = ", ".join(self.vulnerable_to.values_list('name', flat=True))
+		from api.reference_cache import reference_cache
+		matchups = reference_cache.matchup_names(self.pk)
+		strong_vs_names = ", ".join(matchups["strong_vs"])
+		weak_vs_names = ", ".join(matchups["weak_vs"])
+		resistant_to_names = ", ".join(matchups["resistant_to"])
+		vulnerable_to_names = ", ".join(matchups["vulnerable_to"])
 		return f"{self.name} (ID: {self.pk}). STRONG VS: {strong_vs_names}. WEAK VS: {weak_vs_names}. RESISTS: " \
 			   f"{resistant_to_names}. VULNERABLE TO: {vulnerable_to_names}."
 
@@ -63,7 +119,27 @@ class PokemonType(models.Model):
 									   f"VULNERABLE TO: {self.vulnerable_to.values_list('name', flat=True)} ). "
 
 
-class Card(models.Model):
+class CardQuerySet(models.QuerySet):
+	"""
+	QuerySet for Card with helpers to filter cards by type.
+	"""
+	def of_types(self, type_pks, match="any"):
+		"""
+		Restricts the cards to those having any (`match="any"`) or all
+		(`match="all"`) of the given types, either as type1 or type2.
+		Every type is looked up with an index seek on `CardTypeMembership`.
+		"""
+		if match == "all":
+			queryset = self
+			for type_pk in type_pks:
+				queryset = queryset.filter(
+					pk__in=CardTypeMembership.objects.filter(pokemon_type=type_pk).values("card")
+				)
+			return queryset
+		return self.filter(pk__in=CardTypeMembership.objects.filter(pokemon_type__in=type_pks).values("card"))
+
+
+class Card(VersionedModel):
 	"""
 	Pokémon card.
 	"""
@@ -79,6 +155,13 @@ class Card(models.Model):
 		constraints = [
 			models.UniqueConstraint(Lower('name'), name='unique_card_name')
 		]
+		indexes = [
+			models.Index(fields=['rarity'], name='card_rarity_idx'),
+			models.Index(fields=['created'], name='card_created_idx'),
+			models.Index(fields=['expansion', 'card_number'], name='card_expansion_number_idx'),
+			models.Index(fields=['price'], name='card_price_idx'),
+			models.Index(fields=['modified'], name='card_modified_idx'),
+		]
 		ordering = ['id']
 
 	name = models.CharField(max_length=100, blank=False)
@@ -91,8 +174,29 @@ class Card(models.Model):
 	card_number = models.PositiveIntegerField(blank=True, null=True)
 	price = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
 	image = models.ImageField(upload_to="img", blank=True, null=True)
+	# Derived from the image by `api.images` when it changes.
+	image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+	image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+	image_placeholder = models.TextField(blank=True, default="", editable=False)
+	image_variants = models.JSONField(blank=True, default=dict, editable=False)
 	created = models.DateField(auto_now_add=True)
 
+	objects = CardQuerySet.as_manager()
+
+	def save(self, *args, **kwargs):
+		"""
+		Generates the derivatives of the image if it changed. A new upload is
+		stored first, so its variants are named after the stored file.
+		"""
+		update_fields = kwargs.get("update_fields")
+		if update_fields is None or "image" in update_fields:
+			if self.image and not self.image._committed:
+				self.image.save(self.image.name, self.image.file, save=False)
+			update_derivatives(self)
+			if update_fields is not None:
+				kwargs["update_fields"] = {*update_fields, *DERIVED_FIELDS}
+		super().save(*args, **kwargs)
+
 	def __str__(self):
 		return f"NAME: {self.name}. HP: {self.hp}. TYPE 1: {self.type1}. TYPE 2: {self.type2}. RARITY: {self.rarity}," \
 			   f"EXPANSION: {self.expansion}. PRICE: {self.price}. CARD No.: {self.card_number}. CREATION DATE: " \
@@ -103,3 +207,22 @@ class Card(models.Model):
 									   f"TYPE2: {self.type2}. RARITY: {self.rarity}. EXPANSION: {self.expansion}. " \
 									   f"PRICE: {self.price}. CREATED: {self.created}. CARD_NUMBER: {self.card_number} " \
 									   f"FIRST_EDITION: {self.first_edition}. IMAGE: {self.image}."
+
+
+class CardTypeMembership(models.Model):
+	"""
+	Denormalized card-type membership: one row for each type of each card,
+	whether it's its type1 or its type2. It's maintained by database triggers on
+	the Card table (see `api.type_membership`), so it also follows bulk inserts
+	and updates, and it answers "cards of type X" with a single index seek.
+	"""
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=['pokemon_type', 'card'], name='unique_card_type_membership')
+		]
+
+	card = models.ForeignKey(Card, on_delete=models.DO_NOTHING, related_name="type_memberships")
+	pokemon_type = models.ForeignKey(PokemonType, on_delete=models.DO_NOTHING, related_name="card_memberships")
+
+	def __str__(self):
+		return f"CARD: {self.card_id}. TYPE: {self.pokemon_type_id}."
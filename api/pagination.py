@@ -0,0 +1,320 @@
+import hashlib
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db.models import Max
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from api.invalidation import get_versions
+
+
+def exact_count(queryset):
+    """
+    Counts the queryset with a `COUNT(*)` query.
+    Returns a `(count, is_estimate)` tuple, like every count strategy.
+    """
+    return queryset.count(), False
+
+
+def cached_count(queryset):
+    """
+    Counts the queryset once and caches the result, keyed by its SQL (so requests
+    with the same filters share the entry regardless of the query string layout)
+    and by the version counter of its model, which the signal handlers in
+    `api.signals` bump whenever a row is saved or deleted.
+    """
+    sql, params = queryset.query.sql_with_params()
+    versions = get_versions(queryset.model)
+    digest = hashlib.sha1(f"{sql}|{params!r}|{versions!r}".encode()).hexdigest()
+    key = f"api:count:{queryset.model._meta.label_lower}:{digest}"
+    cache = caches[getattr(settings, "API_COUNT_CACHE", "default")]
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, getattr(settings, "API_COUNT_CACHE_TIMEOUT", 300))
+    return count, False
+
+
+def estimated_count(queryset):
+    """
+    Estimates the size of unfiltered querysets over large tables from the highest
+    primary key, which is an index lookup instead of a full count. Small tables
+    are counted exactly, and filtered querysets use `cached_count`.
+    """
+    if queryset.query.has_filters():
+        return cached_count(queryset)
+    estimate = queryset.model._default_manager.aggregate(highest_pk=Max("pk"))["highest_pk"] or 0
+    if estimate < getattr(settings, "API_COUNT_ESTIMATE_THRESHOLD", 100000):
+        return exact_count(queryset)
+    return estimate, True
+
+
+COUNT_STRATEGIES = {
+    "exact": exact_count,
+    "cached": cached_count,
+    "estimated": estimated_count,
+}
+
+
+def count_queryset(queryset):
+    """
+    Counts the queryset with the strategy selected by the `API_COUNT_MODE` setting.
+    """
+    return COUNT_STRATEGIES[getattr(settings, "API_COUNT_MODE", "exact")](queryset)
+
+
+async def acount_queryset(queryset):
+    """
+    Async version of `count_queryset`. Exact counts use `acount`, and the other
+    strategies (which go through the cache) run in a thread.
+    """
+    if getattr(settings, "API_COUNT_MODE", "exact") == "exact":
+        return await queryset.acount(), False
+    return await sync_to_async(count_queryset)(queryset)
+
+
+class CountingPaginator(Paginator):
+    """
+    Django paginator that counts its objects with the strategy selected by the
+    `API_COUNT_MODE` setting, unless it's given a `(count, is_estimate)` tuple
+    already computed for the same objects.
+    """
+    count_is_estimate = False
+
+    def __init__(self, *args, known_count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.known_count = known_count
+
+    @cached_property
+    def count(self):
+        count, self.count_is_estimate = self.known_count or count_queryset(self.object_list)
+        return count
+
+
+class UncountedPage(Page):
+    """
+    A page that knows whether there is a next page without knowing the total count.
+    """
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class UncountedPaginator(Paginator):
+    """
+    Django paginator that never counts its objects. Each page fetches one extra
+    row to find out whether there is a next page.
+    """
+    count = None
+    count_is_estimate = False
+    num_pages = 0
+
+    def validate_number(self, number):
+        """
+        Validates the page number is a positive integer. The last page can't be known.
+        """
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise EmptyPage("That page number is not an integer")
+        if number < 1:
+            raise EmptyPage("That page number is less than 1")
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not objects and number > 1:
+            raise EmptyPage("That page contains no results")
+        has_next = len(objects) > self.per_page
+        # Only the pages up to the next one are known to exist.
+        self.num_pages = number + 1 if has_next else number
+        return UncountedPage(objects[:self.per_page], number, self, has_next)
+
+
+class CustomCursorPagination(CursorPagination):
+    """
+    Keyset pagination: every page seeks past the last `id` of the previous one
+    with an indexed `WHERE id > ...` clause instead of an OFFSET scan, and no
+    count query is run, so page 50,000 costs the same as page 1.
+    All the list views are ordered by `id`, which is unique, so it is the
+    whole seek key.
+    """
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = "id"
+
+
+class CustomPagination(PageNumberPagination):
+    """
+    Page number pagination, with an opt-in cursor mode for clients walking the
+    whole catalog. Cursor mode is enabled with `?pagination=cursor`, and stays
+    enabled in the `next` and `previous` links (which carry a `cursor` parameter).
+    The total count is computed with the strategy set in `API_COUNT_MODE`
+    ("exact", "cached" or "estimated"), and it's skipped altogether with `?count=false`.
+    Estimated counts are flagged with `"count_is_estimate": true` in the response.
+    """
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    django_paginator_class = CountingPaginator
+    count_query_param = "count"
+    pagination_mode_query_param = "pagination"
+    cursor_pagination_class = CustomCursorPagination
+    known_count = None
+
+    def wants_count(self, request):
+        """
+        Checks whether the client needs the total count (it does unless it sends `?count=false`).
+        """
+        return request.query_params.get(self.count_query_param, "").lower() not in ("false", "0", "no")
+
+    def uses_cursor(self, request):
+        """
+        Checks whether the request asks for cursor pagination.
+        """
+        return (
+            request.query_params.get(self.pagination_mode_query_param) == "cursor"
+            or self.cursor_pagination_class.cursor_query_param in request.query_params
+        )
+
+    def count_queryset(self, queryset, request):
+        """
+        Returns the `(count, is_estimate)` tuple of the filtered queryset of the
+        request, or None if the request doesn't count its results. The count is
+        reused when the same request is paginated.
+        """
+        if self.uses_cursor(request) or not self.wants_count(request):
+            return None
+        self.known_count = count_queryset(queryset)
+        return self.known_count
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.uses_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        if not self.wants_count(request):
+            self.django_paginator_class = UncountedPaginator
+        elif self.known_count is not None:
+            self.django_paginator_class = partial(CountingPaginator, known_count=self.known_count)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        response_data = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "count": self.page.paginator.count,
+            "results": data,
+        }
+        if self.page.paginator.count_is_estimate:
+            response_data["count_is_estimate"] = True
+        return Response(response_data)
+
+    def get_paginated_response_schema(self, schema):
+        paginated_schema = super().get_paginated_response_schema(schema)
+        paginated_schema["properties"]["count"]["nullable"] = True
+        paginated_schema["properties"]["count_is_estimate"] = {"type": "boolean", "example": True}
+        return paginated_schema
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        cursor_parameter = self.cursor_pagination_class().get_schema_operation_parameters(view)[0]
+        return parameters + [
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to `false` to skip counting the results.",
+                "schema": {"type": "boolean"},
+            },
+            {
+                "name": self.pagination_mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to `cursor` to paginate with opaque cursors instead of page numbers.",
+                "schema": {"type": "string", "enum": ["cursor"]},
+            },
+            cursor_parameter,
+        ]
+
+
+class AsyncPagination:
+    """
+    Page number pagination of the async views in `api.async_views`, with the
+    parameters, limits and response format of `CustomPagination` (except cursor
+    mode). Pages are fetched with one extra row to know whether there is a next
+    one, so `?count=false` skips the count query altogether.
+    """
+    page_query_param = "page"
+    page_size = CustomPagination.page_size
+    page_size_query_param = CustomPagination.page_size_query_param
+    max_page_size = CustomPagination.max_page_size
+    count_query_param = CustomPagination.count_query_param
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    async def paginate_queryset(self, queryset, request):
+        """
+        Returns the objects of the requested page. Raises EmptyPage if the page
+        number is invalid or the page doesn't exist.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        try:
+            self.number = int(request.GET.get(self.page_query_param, 1))
+        except ValueError:
+            raise EmptyPage("That page number is not an integer")
+        if self.number < 1:
+            raise EmptyPage("That page number is less than 1")
+        self.count, self.count_is_estimate = None, False
+        if request.GET.get(self.count_query_param, "").lower() not in ("false", "0", "no"):
+            self.count, self.count_is_estimate = await acount_queryset(queryset)
+        bottom = (self.number - 1) * page_size
+        objects = [instance async for instance in queryset[bottom:bottom + page_size + 1]]
+        if not objects and self.number > 1:
+            raise EmptyPage("That page contains no results")
+        self.has_next = len(objects) > page_size
+        return objects[:page_size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.number + 1)
+
+    def get_previous_link(self):
+        if self.number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.number - 1)
+
+    def get_paginated_data(self, data):
+        paginated_data = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "count": self.count,
+            "results": data,
+        }
+        if self.count_is_estimate:
+            paginated_data["count_is_estimate"] = True
+        return paginated_data
@@ -0,0 +1,203 @@
+"""
+On-demand CPU profiling of single requests, for staff users.
+
+When a staff user, logged in or authenticated by one of DRF's
+`DEFAULT_AUTHENTICATION_CLASSES` (e.g. HTTP Basic), adds the `API_PROFILE_PARAMETER` query parameter to
+any URL (e.g. `/cards/?profile`, `/cards/type/3/?profile=tottime` or an admin
+page), `ProfilingMiddleware` runs the rest of the request (the view and the
+rendering of its response) under cProfile, and answers with a plain text summary
+of its hotspots instead of the response. The value of the parameter picks how
+they're sorted: "cumulative" (the default), "tottime" or "calls".
+
+If `API_PROFILE_DIR` is set, the whole profile is also stored there, to be
+explored with `python -m pstats` or tools like snakeviz.
+
+Other users, and requests without the parameter, go through untouched: the
+middleware only checks whether the query string has the parameter.
+
+The middleware runs in both sync and async (ASGI) stacks. Under ASGI, the event
+loop (async views and middleware) and the thread of the request's sync code
+(DRF views, queries) are profiled apart, and their profiles merged; requests
+served at the same time on the loop end up in the profile too.
+"""
+import cProfile
+import io
+import os
+import pstats
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.text import slugify
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+SORT_KEYS = {
+    "cumulative": pstats.SortKey.CUMULATIVE,
+    "tottime": pstats.SortKey.TIME,
+    "calls": pstats.SortKey.CALLS,
+}
+
+
+def asks_for_profile(request):
+    """
+    Checks whether the request has the profiling parameter, whoever sent it.
+    """
+    parameter = getattr(settings, "API_PROFILE_PARAMETER", "profile")
+    return bool(parameter) and parameter in request.GET
+
+
+def is_staff(user):
+    return user is not None and user.is_active and user.is_staff
+
+
+def is_staff_request(request):
+    """
+    Checks whether the request comes from a staff user: the logged in user, or
+    the one DRF's authentication classes find, since DRF only authenticates
+    requests in its views, after the middleware. Loading the user can query the
+    database, so async requests check it in a thread.
+    """
+    if is_staff(getattr(request, "user", None)):
+        return True
+    drf_request = Request(request)
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        # The session was checked above, and checking its CSRF token would read the body.
+        if issubclass(authentication_class, SessionAuthentication):
+            continue
+        try:
+            result = authentication_class().authenticate(drf_request)
+        except APIException:
+            # Invalid credentials, which the view reports.
+            return False
+        if result is not None:
+            return is_staff(result[0])
+    return False
+
+
+def wants_profile(request):
+    """
+    Checks whether the request asks to be profiled by a staff user.
+    """
+    return asks_for_profile(request) and is_staff_request(request)
+
+
+def store_profile(stats, request):
+    """
+    Dumps the profile in `API_PROFILE_DIR` and returns its path, or None if it isn't set.
+    """
+    directory = getattr(settings, "API_PROFILE_DIR", None)
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{slugify(request.path) or 'root'}-{time.time_ns() % 10 ** 9}.prof"
+    path = os.path.join(directory, name)
+    stats.dump_stats(path)
+    return path
+
+
+def summarize_profile(stats, request, response, elapsed, sort, path=None):
+    """
+    Returns the text summary of the profile: the request, its duration and
+    `API_PROFILE_LIMIT` hotspots sorted by `sort`.
+    """
+    output = io.StringIO()
+    output.write(f"{request.method} {request.get_full_path()} -> {response.status_code} in {elapsed * 1000:.1f} ms\n")
+    if path:
+        output.write(f"Profile stored in {path}\n")
+    stats.stream = output
+    stats.sort_stats(SORT_KEYS[sort]).print_stats(getattr(settings, "API_PROFILE_LIMIT", 40))
+    return output.getvalue()
+
+
+def consume(response):
+    # Streamed content (e.g. the exports) is generated while it's read.
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests of staff users that ask for it (see the module docstring).
+    It must come after `AuthenticationMiddleware`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not wants_profile(request):
+            return self.get_response(request)
+        sort = self.get_sort(request)
+        if sort not in SORT_KEYS:
+            return self.unknown_sort_response(sort)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        response = profiler.runcall(self.get_response, request)
+        profiler.runcall(consume, response)
+        elapsed = time.perf_counter() - started
+        return self.profile_response(request, response, pstats.Stats(profiler), elapsed, sort)
+
+    async def __acall__(self, request):
+        if not asks_for_profile(request) or not await sync_to_async(is_staff_request)(request):
+            return await self.get_response(request)
+        sort = self.get_sort(request)
+        if sort not in SORT_KEYS:
+            return self.unknown_sort_response(sort)
+
+        profiler = cProfile.Profile()
+        # Sync code runs in a thread of its own for the whole request, with its own profiler.
+        thread_profiler = cProfile.Profile()
+        await sync_to_async(thread_profiler.enable)()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                response = await self.get_response(request)
+            finally:
+                profiler.disable()
+            await sync_to_async(consume)(response)
+        finally:
+            await sync_to_async(thread_profiler.disable)()
+        elapsed = time.perf_counter() - started
+        stats = pstats.Stats(profiler)
+        stats.add(thread_profiler)
+        return await sync_to_async(self.profile_response)(request, response, stats, elapsed, sort)
+
+    def get_sort(self, request):
+        parameter = getattr(settings, "API_PROFILE_PARAMETER", "profile")
+        return request.GET.get(parameter) or "cumulative"
+
+    def unknown_sort_response(self, sort):
+        return HttpResponse(
+            f"Unknown sort order: {sort}. Use one of: {', '.join(SORT_KEYS)}.\n",
+            content_type="text/plain; charset=utf-8",
+            status=400,
+        )
+
+    def profile_response(self, request, response, stats, elapsed, sort):
+        """
+        Returns the summary of the profile, in place of the response.
+        """
+        response.close()
+        path = store_profile(stats, request)
+        profile_response = HttpResponse(
+            summarize_profile(stats, request, response, elapsed, sort, path),
+            content_type="text/plain; charset=utf-8",
+        )
+        # The summary is specific to this request.
+        profile_response["Cache-Control"] = "no-store"
+        if path:
+            profile_response["X-Profile-File"] = os.path.basename(path)
+        return profile_response
@@ -0,0 +1,222 @@
+"""
+Query plan checks for the list views in `api.views`.
+
+Every case requests a list view the way a client would, captures the SQL it
+runs and asks SQLite for its `EXPLAIN QUERY PLAN`. A query is reported when it
+has to sort its results in a temporary B-tree (e.g. it's ordered by a column
+without an index), when it's filtered but still scans a whole table (or a whole
+index) instead of seeking into an index, or when it aggregates (e.g. `MAX()`) a
+whole table without an index covering the aggregated column.
+Cases with conditional headers check the queries computing the validators of
+`api.conditional`, which are otherwise remembered after the first request.
+Used by the `check_query_plans` management command and its tests.
+"""
+import random
+import re
+import time
+from contextlib import contextmanager
+from urllib.parse import urlencode
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+from api import views
+from api.models import Card, Expansion, PokemonType
+from api.signals import invalidate
+
+
+class PlanCase:
+    """
+    A list view request whose queries are checked.
+    `headers` are added to the request (as `META` keys), and
+    `allow_temp_sort` is only meant for known issues, with the reason documented.
+    """
+    def __init__(self, url_name, view_class, kwargs=None, params=None, headers=None, allow_temp_sort=False):
+        self.url_name = url_name
+        self.view_class = view_class
+        self.kwargs = kwargs or {}
+        self.params = params or {}
+        self.headers = headers or {}
+        self.allow_temp_sort = allow_temp_sort
+
+    def __str__(self):
+        path = reverse(self.url_name, kwargs=self.kwargs)
+        path = f"{path}?{urlencode(self.params)}" if self.params else path
+        return f"{path} ({', '.join(self.headers)})" if self.headers else path
+
+
+STALE_ETAG = {"HTTP_IF_NONE_MATCH": 'W/"stale"'}
+
+PLAN_CASES = [
+    PlanCase("card-list", views.CardList),
+    PlanCase("card-list-by-expansion", views.CardFilterByExpansion, {"pk": 1}),
+    PlanCase("card-list-by-type", views.CardFilterByType, {"pk": 1}),
+    PlanCase("card-list-by-types", views.CardFilterByTypes, params={"types": "1,2"}),
+    PlanCase("card-list-by-types", views.CardFilterByTypes, params={"types": "1,2", "match": "all"}),
+    PlanCase("card-list-by-rarity", views.CardFilterByRarity, {"rarity": "rare"}),
+    PlanCase("expansion-list", views.ExpansionList),
+    PlanCase("expansion-list-by-series", views.ExpansionFilterBySeries, {"series_name": "Series 1"}),
+    PlanCase("type-list", views.PokemonTypeList),
+    PlanCase("type-filter-by-name", views.PokemonTypeFilterByName, {"type_name": "Type 1"}),
+    # Revalidations with a stale ETag compute the list validators.
+    PlanCase("card-list", views.CardList, headers=STALE_ETAG),
+    PlanCase("card-list-by-rarity", views.CardFilterByRarity, {"rarity": "rare"}, headers=STALE_ETAG),
+    PlanCase("expansion-list", views.ExpansionList, headers=STALE_ETAG),
+    PlanCase("type-list", views.PokemonTypeList, headers=STALE_ETAG),
+]
+
+
+class PlanResult:
+    """
+    The plan of one query run by a `PlanCase`, and the problems found in it.
+    """
+    def __init__(self, case, sql, plan, problems):
+        self.case = case
+        self.sql = sql
+        self.plan = plan
+        self.problems = problems
+
+
+AGGREGATE_RE = re.compile(r"\b(MAX|MIN|SUM|AVG)\(", re.IGNORECASE)
+
+
+def explain(sql, params=()):
+    """
+    Returns the lines of the SQLite query plan of the given query.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[3] for row in cursor.fetchall()]
+
+
+def plan_problems(sql, plan, allow_temp_sort=False):
+    """
+    Returns a description of every problem found in the plan of the given query.
+    """
+    problems = []
+    filtered = " WHERE " in sql
+    aggregated = AGGREGATE_RE.search(sql) is not None
+    for line in plan:
+        if line.startswith("USE TEMP B-TREE") and not allow_temp_sort:
+            problems.append(f"Sorts in a temporary B-tree: {line}")
+        if "VIRTUAL TABLE" in line:
+            continue
+        if filtered and line.startswith("SCAN "):
+            problems.append(f"Scans a whole table or index: {line}")
+        elif aggregated and line.startswith(("SCAN ", "SEARCH ")) and " USING " not in line:
+            # e.g. "SEARCH api_card" for a MAX() without an index, which still reads every row.
+            problems.append(f"Aggregates a whole table without an index: {line}")
+    return problems
+
+
+def request_factory_settings():
+    """
+    Returns the settings override that lets views answer the requests of the
+    test clients and request factories outside tests: the pagination links are
+    built from the host of the request, "testserver".
+    """
+    return override_settings(ALLOWED_HOSTS=["testserver"])
+
+
+def check_case(case):
+    """
+    Requests the list view of the case and returns a `PlanResult` for each
+    query it runs. A first request warms up the caches, so only the queries a
+    request runs in the steady state are checked.
+    """
+    factory = APIRequestFactory()
+    view = case.view_class.as_view()
+    path = reverse(case.url_name, kwargs=case.kwargs)
+    # The validators of conditional cases are computed on every request.
+    validator_timeout = 0 if case.headers else getattr(settings, "API_VALIDATOR_CACHE_TIMEOUT", 300)
+    with request_factory_settings(), override_settings(API_VALIDATOR_CACHE_TIMEOUT=validator_timeout):
+        view(factory.get(path, case.params, **case.headers), **case.kwargs).render()
+        with CaptureQueriesContext(connection) as queries:
+            view(factory.get(path, case.params, **case.headers), **case.kwargs).render()
+    results = []
+    for query in queries:
+        sql = query["sql"]
+        if not sql.startswith("SELECT"):
+            continue
+        plan = explain(sql)
+        results.append(PlanResult(case, sql, plan, plan_problems(sql, plan, case.allow_temp_sort)))
+    return results
+
+
+def check_view_plans(cases=None):
+    """
+    Checks the queries of every case (`PLAN_CASES` by default) and returns their `PlanResult`s.
+    """
+    results = []
+    for case in cases or PLAN_CASES:
+        results.extend(check_case(case))
+    return results
+
+
+def seed_plan_dataset(cards=20000, seed=0):
+    """
+    Fills the database with a deterministic catalog, large enough for SQLite to
+    pick the plans it would pick in production, and gathers its statistics.
+    """
+    rng = random.Random(seed)
+    expansions = Expansion.objects.bulk_create(
+        Expansion(name=f"Expansion {i}", series=f"Series {i % 12}") for i in range(150)
+    )
+    types = PokemonType.objects.bulk_create(PokemonType(name=f"Type {i}") for i in range(18))
+    # Inserted in chunks, since bulk_create builds a list of every object it's given.
+    for start in range(0, cards, 10000):
+        Card.objects.bulk_create(
+            (
+                Card(
+                    name=f"Card {i}",
+                    rarity=rng.choice(Card.RarityEnum.values),
+                    expansion=rng.choice(expansions),
+                    type1=rng.choice(types),
+                    type2=rng.choice(types) if rng.random() < 0.3 else None,
+                    hp=rng.randrange(30, 250, 10),
+                    card_number=i % 200 + 1,
+                )
+                for i in range(start, min(start + 10000, cards))
+            ),
+            batch_size=2000,
+        )
+    finish_bulk_load(Card, Expansion, PokemonType)
+
+
+def finish_bulk_load(*models):
+    """
+    Invalidates the cached data of the models after rows are inserted with
+    `bulk_create`, which doesn't send signals, and gathers the statistics of
+    the query planner.
+    """
+    for model in models:
+        invalidate(model)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+@contextmanager
+def seeded_database(cards, name=None):
+    """
+    Creates a temporary test database (in the `name` file if it's given, e.g. to
+    get the same PRAGMAs as in production) seeded with `seed_plan_dataset`,
+    yields the seconds the seeding took, and destroys it afterwards, restoring
+    the configured database and test database name.
+    """
+    # `create_test_db` returns the name of the test database, not the configured one.
+    old_name = connection.settings_dict["NAME"]
+    test_settings = connection.settings_dict["TEST"]
+    old_test_name = test_settings.get("NAME")
+    if name is not None:
+        test_settings["NAME"] = name
+    try:
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            started = time.perf_counter()
+            seed_plan_dataset(cards=cards)
+            yield time.perf_counter() - started
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        test_settings["NAME"] = old_test_name
@@ -0,0 +1,211 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max
+from api.invalidation import get_versions, version_cache_is_shared
+from api.models import Expansion, PokemonType
+
+
+def get_database_version():
+    """
+    Returns the number of rows and the last modification of the expansions and
+    types, and the number of rows and highest id of each matchup relation,
+    which change whenever any process writes them.
+    """
+    version = [
+        tuple(model.objects.aggregate(count=Count("pk"), last_modified=Max("modified")).values())
+        for model in (Expansion, PokemonType)
+    ]
+    for field in PokemonType.MATCHUP_FIELDS:
+        through = getattr(PokemonType, field).through
+        version.append(tuple(through.objects.aggregate(count=Count("pk"), highest=Max("pk")).values()))
+    return tuple(version)
+
+
+def get_current_version():
+    """
+    Returns the version counters of the expansions and types or, when they
+    aren't shared by every process (see `version_cache_is_shared`), their
+    version in the database.
+    """
+    if version_cache_is_shared():
+        return get_versions(Expansion, PokemonType)
+    return get_database_version()
+
+
+class ReferenceData:
+    """
+    An immutable snapshot of the Expansion table and the PokemonType matchup graph.
+    """
+    def __init__(self, version, expansions, types, matchups):
+        self.version = version
+        self.expansions = expansions
+        self.types = types
+        self.matchups = matchups
+        # Time of the last modification of any expansion or type, or None if there are none.
+        self.last_modified = max(
+            (instance.modified for instance in [*expansions.values(), *types.values()]), default=None
+        )
+        # Serialized representations, filled lazily by `ReferenceDataCache.representation`.
+        self.representations = {}
+
+    def lookup(self, model, pk):
+        """
+        Returns the cached instance of `model` with the given pk, or None if
+        it's not in the snapshot.
+        """
+        if model is Expansion:
+            return self.expansions.get(pk)
+        if model is PokemonType:
+            return self.types.get(pk)
+        raise ValueError(f"{model.__name__} is not cached as reference data.")
+
+
+# Snapshot pinned by `ReferenceDataCache.pinned` in the current thread or task.
+_pinned = ContextVar("pinned_reference_data", default=None)
+
+
+class ReferenceDataCache:
+    """
+    Process-wide cache of the Expansion table and the PokemonType matchup graph.
+
+    The snapshot is built once per worker on first use. It is dropped locally by
+    the signal handlers in `api.signals` whenever one of the cached models (or
+    one of the matchup relations) changes, and it's rebuilt when the version
+    counters published through `api.invalidation` show that another worker
+    changed the data. Those counters are checked at most once every
+    `API_REFERENCE_CACHE_CHECK_INTERVAL` seconds. When they aren't shared by
+    every worker (e.g. with the local memory cache), the tables themselves are
+    checked instead (see `get_database_version`).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._generation = 0
+        self._checked_at = 0.0
+
+    def get(self):
+        """
+        Returns the current snapshot, building it if needed, or the pinned one.
+        """
+        pinned = _pinned.get()
+        if pinned is not None:
+            return pinned
+        data = self._data
+        if data is not None and self._is_fresh(data):
+            return data
+        return self._build()
+
+    async def aget(self, required=()):
+        """
+        Async version of `get`. The snapshot is built in a thread, if needed, or
+        if it's missing one of the `required` `(model, pk)` instances.
+        """
+        data = self._data
+        if _pinned.get() is not None or data is None or not await self._ais_fresh(data):
+            data = await sync_to_async(self.get)()
+        if any(pk is not None and data.lookup(model, pk) is None for model, pk in required):
+            data = await sync_to_async(self._build)(force=True)
+        return data
+
+    @contextmanager
+    def pinned(self, data):
+        """
+        Makes `get` return the given snapshot in the current thread or task, and
+        the lookups of missing instances return None instead of rebuilding it.
+        Async views pin the snapshot they fetched with `aget`, so serializing
+        their data never queries the database.
+        """
+        token = _pinned.set(data)
+        try:
+            yield data
+        finally:
+            _pinned.reset(token)
+
+    def invalidate(self):
+        """
+        Drops the current snapshot. The next call to `get` builds a new one.
+        """
+        with self._lock:
+            self._generation += 1
+            self._data = None
+
+    def matchup_names(self, pk):
+        """
+        Returns a dict with the names of the types the PokemonType with the given
+        pk is strong vs, weak vs, resistant to and vulnerable to.
+        """
+        empty = {field: [] for field in PokemonType.MATCHUP_FIELDS}
+        if pk is None:
+            return empty
+        data = self.get()
+        if pk not in data.matchups and _pinned.get() is None:
+            data = self._build(force=True)
+        return data.matchups.get(pk, empty)
+
+    def representation(self, serializer_class, pk):
+        """
+        Returns the data of `serializer_class` for the cached instance with the given
+        pk, or None if there is no such instance. Each representation is computed
+        once per snapshot and shared, so callers must not modify it.
+        """
+        if pk is None:
+            return None
+        data = self.get()
+        key = (serializer_class, pk)
+        if key not in data.representations:
+            instance = data.lookup(serializer_class.Meta.model, pk)
+            if instance is None and _pinned.get() is None:
+                # The instance may have been created by another worker after the
+                # snapshot was built.
+                data = self._build(force=True)
+                instance = data.lookup(serializer_class.Meta.model, pk)
+            data.representations[key] = serializer_class(instance).data if instance is not None else None
+        return data.representations[key]
+
+    def _is_fresh(self, data):
+        """
+        Checks the shared version counters (or the database), at most once per check interval.
+        """
+        interval = getattr(settings, "API_REFERENCE_CACHE_CHECK_INTERVAL", 1.0)
+        now = time.monotonic()
+        if now - self._checked_at < interval:
+            return True
+        self._checked_at = now
+        return data.version == get_current_version()
+
+    async def _ais_fresh(self, data):
+        if version_cache_is_shared():
+            return self._is_fresh(data)
+        # The database can only be queried from a thread.
+        return await sync_to_async(self._is_fresh)(data)
+
+    def _build(self, force=False):
+        version = get_current_version()
+        with self._lock:
+            data = self._data
+            if data is not None and not force and data.version == version:
+                return data
+            generation = self._generation
+        expansions = {expansion.pk: expansion for expansion in Expansion.objects.all()}
+        types = {pokemon_type.pk: pokemon_type for pokemon_type in PokemonType.objects.with_matchups()}
+        matchups = {
+            pk: {
+                field: [related.name for related in getattr(pokemon_type, field).all()]
+                for field in PokemonType.MATCHUP_FIELDS
+            }
+            for pk, pokemon_type in types.items()
+        }
+        data = ReferenceData(version, expansions, types, matchups)
+        with self._lock:
+            # Don't keep a snapshot that was invalidated while it was being built.
+            if generation == self._generation:
+                self._data = data
+                self._checked_at = time.monotonic()
+        return data
+
+
+reference_cache = ReferenceDataCache()
@@ -0,0 +1,144 @@
+"""
+JSON renderer and parser backed by orjson, selected in the `REST_FRAMEWORK`
+settings. orjson serializes the `ReturnDict`/`ReturnList` of the serializers
+natively, without intermediate copies, and its output is the same as DRF's
+compact output. When orjson isn't installed, or the output has to be indented
+(orjson only indents by 2 spaces), they fall back to DRF's `JSONRenderer` and
+`JSONParser`.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_drf_default = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Renders JSON with orjson. Types orjson doesn't know (e.g. Decimal, lazy
+    translations or querysets), and dates and times (which orjson would format
+    differently), are converted like DRF's `JSONEncoder` does. Serializers
+    already turn Decimal and date fields into strings, so that's rarely needed.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(
+            data, default=_drf_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+        # Like DRF, \u2028 and \u2029 are escaped so the output is a strict javascript subset.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """
+    Parses JSON with orjson, which reads the request body without decoding it first.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", "utf-8")
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read() if stream is not None else b"")
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    """
+    Renders paginated lists in a columnar layout: the values of each field are
+    sent once as a parallel array in `columns`, and the related objects in
+    `related_tables` are replaced by their id and sent once in `related`.
+    `length` is the number of results.
+    Nulls are omitted: a field that is null in every result has no column, a
+    column with nulls is sent as `{"index": [...], "values": [...]}` (the
+    positions of the non-null values, and the values), and null fields of the
+    related objects are left out.
+    Data other than a paginated list (e.g. errors) is rendered as usual.
+    """
+    media_type = "application/vnd.pokemon.columnar+json"
+    format = "columnar"
+    # The table each related field is sent in.
+    related_tables = {"expansion": "expansions", "type1": "types", "type2": "types"}
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict) and isinstance(data.get("results"), list):
+            data = self.to_columnar(data)
+        return super().render(data, accepted_media_type, renderer_context)
+
+    def to_columnar(self, data):
+        results = data["results"]
+        fields = tuple(results[0]) if results else ()
+        if all(map(fields.__eq__, map(tuple, results))):
+            # Serializers output the same fields in the same order for every
+            # result, so the columns are a plain transposition.
+            values_by_field = zip(fields, zip(*map(dict.values, results)))
+        else:
+            fields = tuple({field: None for result in results for field in result})
+            values_by_field = ((field, [result.get(field) for result in results]) for field in fields)
+
+        columns = {}
+        related = {}
+        for field, values in values_by_field:
+            table = self.related_tables.get(field)
+            if table:
+                related_objects = related.setdefault(table, {})
+                # Related objects are usually shared between results.
+                # Related objects that aren't expanded are already ids.
+                for related_object in {id(value): value for value in values if isinstance(value, dict)}.values():
+                    key = str(related_object["id"])
+                    if key not in related_objects:
+                        related_objects[key] = self.compact(related_object)
+                values = [value["id"] if isinstance(value, dict) else value for value in values]
+            if None not in values:
+                columns[field] = list(values)
+            else:
+                present = [index for index, value in enumerate(values) if value is not None]
+                if present:
+                    columns[field] = {"index": present, "values": [values[index] for index in present]}
+        columnar = {key: value for key, value in data.items() if key != "results" and value is not None}
+        columnar["length"] = len(results)
+        columnar["columns"] = columns
+        columnar["related"] = {table: objects for table, objects in related.items() if objects}
+        return columnar
+
+    def compact(self, related_object):
+        """
+        Returns the related object without its id and its null fields. Each
+        related object is compacted once per render, in `to_columnar`.
+        """
+        return {name: value for name, value in related_object.items() if name != "id" and value is not None}
+
+
+class ColumnarLayoutMixin:
+    """
+    Offers the `ColumnarJSONRenderer` layout in a list view, selected with
+    `?layout=columnar`, its media type in the `Accept` header, `?format=columnar`
+    or a `.columnar` suffix.
+    """
+    layout_query_param = "layout"
+
+    def get_renderers(self):
+        return super().get_renderers() + [ColumnarJSONRenderer()]
+
+    def perform_content_negotiation(self, request, force=False):
+        if request.query_params.get(self.layout_query_param) == ColumnarJSONRenderer.format:
+            renderer = ColumnarJSONRenderer()
+            return renderer, renderer.media_type
+        return super().perform_content_negotiation(request, force)
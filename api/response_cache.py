@@ -0,0 +1,181 @@
+"""
+Cache of the rendered responses of the read endpoints.
+
+Entries are keyed by the view, its URL arguments, the normalized query string,
+the host (pagination links are absolute) and the negotiated media type, and
+tagged by the models the response depends on: the view's model and the models
+nested in its representation. Tags are the version counters of `api.invalidation`,
+which the signal handlers in `api.signals` bump whenever a row (or a matchup) is
+saved or deleted, and they are part of the key, so a change only invalidates the
+entries tagged with the changed model.
+
+Lookups go through a small in-process LRU (L1) in front of the Django cache set
+in `API_RESPONSE_CACHE` (L2), which should be shared by every worker, like the
+version counters. The cache is disabled unless `API_RESPONSE_CACHE_ENABLED` is set.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from api import metrics
+from api.invalidation import get_versions
+
+
+class CachedResponse:
+    """
+    The rendered content and validators of a response.
+    """
+    def __init__(self, content, content_type, etag=None, last_modified=None):
+        self.content = content
+        self.content_type = content_type
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def to_response(self, request):
+        """
+        Returns a `304 Not Modified` if the request's validators match, or the
+        cached response otherwise.
+        """
+        timestamp = parse_http_date_safe(self.last_modified) if self.last_modified else None
+        response = get_conditional_response(request, etag=self.etag, last_modified=timestamp)
+        if response is None:
+            response = HttpResponse(self.content, content_type=self.content_type)
+        if self.etag:
+            response["ETag"] = self.etag
+        if self.last_modified:
+            response["Last-Modified"] = self.last_modified
+        return response
+
+
+class ResponseCache:
+    """
+    Two level cache of rendered responses, with hit and miss statistics.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = OrderedDict()
+        self._stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "stores": 0}
+
+    @property
+    def enabled(self):
+        return getattr(settings, "API_RESPONSE_CACHE_ENABLED", False)
+
+    def _shared(self):
+        return caches[getattr(settings, "API_RESPONSE_CACHE", "default")]
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+        if stat != "stores":
+            metrics.inc("api_response_cache_lookups_total", [("result", stat)])
+
+    def stats(self):
+        """
+        Returns the number of L1 hits, L2 hits, misses and stored entries of
+        this worker, and its hit ratio.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["l1_hits"] + stats["l2_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["l1_hits"] + stats["l2_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            for stat in self._stats:
+                self._stats[stat] = 0
+
+    def clear_local(self):
+        """
+        Drops every L1 entry of this worker.
+        """
+        with self._lock:
+            self._local.clear()
+
+    def make_key(self, view_name, kwargs, request, tags):
+        """
+        Builds the key of a response from the view, its URL arguments, the query
+        string (in a canonical order), the host, the media type and the current
+        versions of its tags.
+        """
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        url_args = urlencode(sorted((key, str(value)) for key, value in kwargs.items()))
+        versions = ",".join(
+            f"{tag._meta.label_lower}={version}" for tag, version in zip(tags, get_versions(*tags))
+        )
+        raw_key = f"{view_name}|{url_args}|{query}|{request.get_host()}|{request.accepted_media_type}|{versions}"
+        return "api:response:" + hashlib.sha1(raw_key.encode()).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the `CachedResponse` stored under the key, or None.
+        """
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                self._local.move_to_end(key)
+        if entry is not None:
+            self._count("l1_hits")
+            return entry
+        entry = self._shared().get(key)
+        if entry is None:
+            self._count("misses")
+            return None
+        self._count("l2_hits")
+        self._store_local(key, entry)
+        return entry
+
+    def set(self, key, entry):
+        self._shared().set(key, entry, getattr(settings, "API_RESPONSE_CACHE_TIMEOUT", 300))
+        self._store_local(key, entry)
+        self._count("stores")
+
+    def _store_local(self, key, entry):
+        max_entries = getattr(settings, "API_RESPONSE_CACHE_L1_SIZE", 256)
+        with self._lock:
+            self._local[key] = entry
+            self._local.move_to_end(key)
+            while len(self._local) > max_entries:
+                self._local.popitem(last=False)
+
+
+response_cache = ResponseCache()
+
+
+class CachedResponseMixin:
+    """
+    Serves GET requests of a view from `response_cache`. Entries are tagged with
+    the view's model and its `nested_models` (see `api.conditional`). Only the
+    successful responses of non-HTML renderers are cached, and the
+    `X-Cache` header tells whether a response was a hit or a miss.
+    """
+    def get_cache_tags(self):
+        return (self.get_queryset().model, *getattr(self, "nested_models", ()))
+
+    def get(self, request, *args, **kwargs):
+        if not response_cache.enabled or request.accepted_renderer.format == "api":
+            return super().get(request, *args, **kwargs)
+        key = response_cache.make_key(type(self).__name__, kwargs, request, self.get_cache_tags())
+        entry = response_cache.get(key)
+        if entry is not None:
+            response = entry.to_response(request)
+            response["X-Cache"] = "HIT"
+            return response
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200 and hasattr(response, "add_post_render_callback"):
+            def store(rendered_response):
+                response_cache.set(key, CachedResponse(
+                    rendered_response.content,
+                    rendered_response["Content-Type"],
+                    rendered_response.get("ETag"),
+                    rendered_response.get("Last-Modified"),
+                ))
+            response.add_post_render_callback(store)
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,162 @@
+"""
+Read/write splitting between the primary database and a read-only replica.
+
+The replica (the `API_REPLICA_DATABASE` alias) is a copy of the primary SQLite
+file made by the `refresh_replica` command, and opened with `mode=ro` and
+`immutable=1`, so its connections skip file locking and change detection.
+`ReplicaRoutingMiddleware` decides once per request which database it reads
+from, and `ReplicaRouter` applies that decision to every query:
+
+- The models of this app are read from the replica in GET, HEAD and OPTIONS
+  requests (the list, detail and filter views), but only if it's up to date:
+  every write records its time when it bumps the version counters (see
+  `api.invalidation`), `refresh_replica` records the time of each refresh in a
+  file next to the replica, and the replica is used while no write happened
+  more than `API_REPLICA_MAX_LAG` seconds after its last refresh. With the
+  default lag of 0, reads from the replica are never stale, so the response,
+  count and validator caches keep seeing the same data as with the primary.
+  Other apps (auth, sessions, the admin log) always use the primary.
+- Any other request, and the rest of a request once it writes, uses the primary,
+  so a request reads its own writes.
+- After a write, the client is kept on the primary for `API_REPLICA_STICKY_SECONDS`
+  with a cookie, so it also reads its own writes in later requests when a lag
+  is allowed.
+
+Outside requests (commands, the shell), everything uses the primary.
+
+Writes made by any worker or command must be seen by every worker, so the
+replica is off while `API_VERSION_CACHE` is a per-process cache (e.g. the local
+memory one), whatever `API_REPLICA_DATABASE` says.
+"""
+import os
+from contextvars import ContextVar
+from urllib.parse import unquote, urlparse
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deprecation import MiddlewareMixin
+from api.invalidation import get_last_write_time, version_cache_is_shared
+
+
+STICKY_COOKIE = "api_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Database the current request reads from, or None to read from the primary.
+_read_database = ContextVar("read_database", default=None)
+
+
+def get_replica_alias():
+    """
+    Returns the alias of the replica, or None if there isn't one or the version
+    cache isn't shared (see the module docstring).
+    """
+    alias = getattr(settings, "API_REPLICA_DATABASE", None)
+    if alias not in settings.DATABASES or not version_cache_is_shared():
+        return None
+    return alias
+
+
+def get_replica_path(alias):
+    """
+    Returns the path of the replica file, from the `file:` URI in its NAME.
+    """
+    name = str(settings.DATABASES[alias]["NAME"])
+    if not name.startswith("file:"):
+        return name
+    return unquote(urlparse(name).path)
+
+
+def record_refresh(path, started):
+    """
+    Records that the replica at `path` has every write committed before `started`,
+    in a file next to it that every worker reads.
+    """
+    temporary_path = f"{path}.refreshed.tmp"
+    with open(temporary_path, "w") as file:
+        file.write(repr(started))
+    # Workers never read a partly written time.
+    os.replace(temporary_path, f"{path}.refreshed")
+
+
+def get_refresh_time(path):
+    """
+    Returns the time recorded by the last refresh of the replica at `path`, or
+    None if it was never refreshed.
+    """
+    try:
+        with open(f"{path}.refreshed") as file:
+            return float(file.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def replica_is_fresh(refreshed_at):
+    """
+    Checks whether the replica refreshed at `refreshed_at` has every write except,
+    at most, those made in the `API_REPLICA_MAX_LAG` seconds after the refresh.
+    """
+    if refreshed_at is None:
+        return False
+    written_at = get_last_write_time()
+    return written_at is None or written_at - refreshed_at <= getattr(settings, "API_REPLICA_MAX_LAG", 0)
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of this app's models in the current request to the database
+    chosen by `ReplicaRoutingMiddleware`, and every write to the primary.
+    """
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != "api":
+            return None
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        # Once a request writes, it reads its own writes from the primary.
+        if _read_database.get() is not None:
+            _read_database.set(None)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so their rows can be related.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary when it's refreshed, even while it's off.
+        return db != getattr(settings, "API_REPLICA_DATABASE", None)
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    Chooses the database each request reads from (see the module docstring),
+    and keeps clients on the primary for a while after they write.
+    """
+    def process_request(self, request):
+        alias = get_replica_alias()
+        use_replica = False
+        if alias is not None and request.method in SAFE_METHODS and STICKY_COOKIE not in request.COOKIES:
+            refreshed_at = get_refresh_time(get_replica_path(alias))
+            use_replica = replica_is_fresh(refreshed_at)
+            if use_replica:
+                self.reopen_if_refreshed(connections[alias], refreshed_at)
+        _read_database.set(alias if use_replica else None)
+
+    def reopen_if_refreshed(self, connection, refreshed_at):
+        """
+        Closes a connection to the replica opened before its last refresh: it still
+        reads the replaced file (e.g. with persistent connections).
+        """
+        if getattr(connection, "replica_refreshed_at", None) != refreshed_at:
+            connection.close()
+            connection.replica_refreshed_at = refreshed_at
+
+    def process_response(self, request, response):
+        _read_database.set(None)
+        sticky_seconds = getattr(settings, "API_REPLICA_STICKY_SECONDS", 0)
+        if (
+            get_replica_alias() is not None
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and sticky_seconds
+        ):
+            response.set_cookie(STICKY_COOKIE, "1", max_age=sticky_seconds, httponly=True, samesite="Lax")
+        return response
@@ -2,10 +2,39 @@ from django.db import IntegrityError
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from django.utils import timezone
+from drf_spectacular.utils import extend_schema_field
 from api.models import Card, Expansion, PokemonType
+from api.fieldsets import SparseFieldsetSerializerMixin
+from api.reference_cache import reference_cache
+from api.timing import TimedSerializerMixin
 
 
-class ExpansionSerializer(serializers.ModelSerializer):
+# Schema of `CardSerializer.image_variants`: the variants by name (`CARD_IMAGE_VARIANTS`),
+# with the URL of each of the formats (`CARD_IMAGE_FORMATS`) they're stored in.
+IMAGE_VARIANTS_SCHEMA = {
+    "type": "object",
+    "additionalProperties": {
+        "type": "object",
+        "properties": {
+            "width": {"type": "integer"},
+            "height": {"type": "integer"},
+            "webp": {"type": "string", "format": "uri"},
+            "jpeg": {"type": "string", "format": "uri"},
+        },
+        "required": ["width", "height"],
+    },
+    "example": {
+        "thumbnail": {
+            "width": 64,
+            "height": 90,
+            "webp": "http://localhost:8000/media/img/variants/pikachu_thumbnail_0123abcd.webp",
+            "jpeg": "http://localhost:8000/media/img/variants/pikachu_thumbnail_0123abcd.jpeg",
+        },
+    },
+}
+
+
+class ExpansionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     A serializer for the Expansion model that includes all fields.
     """
@@ -66,7 +95,7 @@ class ExpansionSerializer(serializers.ModelSerializer):
             )
 
 
-class PokemonTypeSerializer(serializers.ModelSerializer):
+class PokemonTypeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     A serializer for the PokemonType model that includes all fields.
     This serializer uses the `SimplePokemonTypeSerializer` to serialize the
@@ -75,6 +104,9 @@ class PokemonTypeSerializer(serializers.ModelSerializer):
     class Meta:
         model = PokemonType
         fields = "__all__"
+        # The matchups are written as primary keys but read as names from the
+        # reference data cache (see `to_representation`).
+        extra_kwargs = {field: {"write_only": True} for field in PokemonType.MATCHUP_FIELDS}
 
     def validate_name(self, data):
         """
@@ -95,13 +127,11 @@ class PokemonTypeSerializer(serializers.ModelSerializer):
         Maps the field names to their serialized values or None if the related object
         does not exist, to avoid showing empty objects when any of these optional fields
         are not present in the PokemonType.
+        Names are read from the process-wide reference data cache, so no queries
+        are run per type.
         """
         representation = super().to_representation(instance)
-        related_fields = ["strong_vs", "weak_vs", "resistant_to", "vulnerable_to"]
-        related_data = {}
-        for field in related_fields:
-            related_data[field] = list(getattr(instance, field).values_list("name", flat=True))
-        representation.update(related_data)
+        representation.update(reference_cache.matchup_names(instance.pk))
         return representation
 
     def create(self, validated_data):
@@ -127,9 +157,10 @@ class PokemonTypeSerializer(serializers.ModelSerializer):
             )
 
 
-class CardSerializer(serializers.ModelSerializer):
+class CardSerializer(TimedSerializerMixin, SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """
-    A serializer for the Card model that includes all fields.
+    A serializer for the Card model that includes all fields, or the fields of
+    the `fieldset` in its context (see `api.fieldsets`).
     """
     expansion = serializers.PrimaryKeyRelatedField(
         queryset=Expansion.objects.all(), required=False, allow_null=True
@@ -141,11 +172,19 @@ class CardSerializer(serializers.ModelSerializer):
         queryset=PokemonType.objects.all(), required=False, allow_null=True
     )
     rarity = serializers.CharField(required=False, allow_null=True)
+    image_variants = serializers.SerializerMethodField()
+
+    expandable_fields = {
+        "expansion": ExpansionSerializer,
+        "type1": PokemonTypeSerializer,
+        "type2": PokemonTypeSerializer,
+    }
 
     class Meta:
         model = Card
         fields = ("id", "name", "rarity", "hp", "type1", "type2", "expansion", "card_number", "first_edition", "price",
-                  "image", "created")
+                  "image", "image_width", "image_height", "image_placeholder", "image_variants", "created", "modified",
+                  "version")
 
     def validate_name(self, data):
         """
@@ -171,6 +210,28 @@ class CardSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(f"{data} is not a valid rarity.")
         return data.lower()
 
+    @extend_schema_field(IMAGE_VARIANTS_SCHEMA)
+    def get_image_variants(self, instance):
+        """
+        Returns the width, height and the URL of each format of each variant of the
+        image (see `api.images`), with absolute URLs if there's a request in the
+        context, like the `image` field.
+        """
+        storage = Card._meta.get_field("image").storage
+        request = self.context.get("request")
+        variants = {}
+        for name, variant in instance.image_variants.items():
+            if name == "source":
+                continue
+            variants[name] = {}
+            for key, value in variant.items():
+                if key not in ("width", "height"):
+                    value = storage.url(value)
+                    if request is not None:
+                        value = request.build_absolute_uri(value)
+                variants[name][key] = value
+        return variants
+
     def to_representation(self, instance):
         """
         Overrides the `to_representation` method to display the whole object for the
@@ -178,18 +239,15 @@ class CardSerializer(serializers.ModelSerializer):
         Maps the field names to their serialized values or None if the related object
         does not exist, to avoid showing empty objects when any of these optional fields
         are not present in the Card.
+        Related objects are looked up by id in the process-wide reference data
+        cache, and each one is serialized only once per cache snapshot. With a
+        fieldset, only the expanded ones are, and the others are left as ids.
         """
         representation = super().to_representation(instance)
-        related_fields = {
-            "expansion": ExpansionSerializer,
-            "type1": PokemonTypeSerializer,
-            "type2": PokemonTypeSerializer,
-        }
         related_data = {
-            field: serializer(getattr(instance, field)).data
-            if getattr(instance, field)
-            else None
-            for field, serializer in related_fields.items()
+            field: reference_cache.representation(serializer, getattr(instance, f"{field}_id"))
+            for field, serializer in self.expanded_fields().items()
+            if field in representation
         }
         representation.update(related_data)
         return representation
@@ -213,3 +271,19 @@ class CardSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "Expansion with this name and series already exists."
             )
+
+
+class CardBulkItemSerializer(CardSerializer):
+    """
+    Validates the fields of one card of a bulk request (see `api.bulk`) without
+    running any query. Related objects are given by id, and their existence, like
+    the uniqueness of the names, is checked at once for the whole request.
+    """
+    expansion = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    type1 = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    type2 = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    image = serializers.CharField(required=False, allow_null=True, max_length=100)
+
+    class Meta(CardSerializer.Meta):
+        fields = ("name", "rarity", "hp", "type1", "type2", "expansion", "card_number", "first_edition", "price",
+                  "image")
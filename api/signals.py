@@ -0,0 +1,60 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from api.invalidation import bump_versions
+from api.models import Card, Expansion, PokemonType
+from api.reference_cache import reference_cache
+from api.sqlite import configure_connection
+from api.timing import record_query
+
+
+def invalidate(model):
+    """
+    Bumps the version of `model`, so every cached copy of its data (in this or
+    any other worker) is detected as stale, and drops this worker's reference
+    data snapshot if it includes `model`. It's done again once the transaction
+    is committed, so nothing cached from uncommitted data outlives it.
+    """
+    def bump():
+        bump_versions(model)
+        if model in (Expansion, PokemonType):
+            reference_cache.invalidate()
+
+    bump()
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Card)
+@receiver(post_delete, sender=Card)
+def card_changed(sender, **kwargs):
+    invalidate(Card)
+
+
+@receiver(post_save, sender=Expansion)
+@receiver(post_delete, sender=Expansion)
+def expansion_changed(sender, **kwargs):
+    invalidate(Expansion)
+
+
+@receiver(post_save, sender=PokemonType)
+@receiver(post_delete, sender=PokemonType)
+def pokemon_type_changed(sender, **kwargs):
+    invalidate(PokemonType)
+
+
+@receiver(m2m_changed, sender=PokemonType.strong_vs.through)
+@receiver(m2m_changed, sender=PokemonType.weak_vs.through)
+@receiver(m2m_changed, sender=PokemonType.resistant_to.through)
+@receiver(m2m_changed, sender=PokemonType.vulnerable_to.through)
+def pokemon_type_matchups_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate(PokemonType)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    configure_connection(connection)
+    # The wrappers outlive the connection, which is reopened by the same wrapper object.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
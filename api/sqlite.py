@@ -0,0 +1,192 @@
+"""
+Connection profile of SQLite databases: the PRAGMAs in `SQLITE_PRAGMAS` are run
+on every new connection (see `api.signals`), and checked by the system checks
+below and the `sqlite_pragmas` command.
+
+The defaults suit several workers sharing the database file: WAL lets readers
+run while a write is in progress, `synchronous=normal` is safe with WAL and only
+syncs at checkpoints, the page cache and memory map keep hot pages out of
+`read()` calls, and `busy_timeout` makes a writer wait for the lock instead of
+failing with "database is locked".
+
+The journal mode is stored in the database file, so it's only set on new (empty)
+databases: an existing file keeps its mode, and so its header, until
+`sqlite_pragmas --convert` sets it.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from django.db import connections
+
+
+DEFAULT_PRAGMAS = {
+    "busy_timeout": 5000,
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "cache_size": -64000,
+    "mmap_size": 268435456,
+    "temp_store": "memory",
+}
+
+# Named values, and the number SQLite reports for each of them.
+NAMED_VALUES = {
+    "journal_mode": {mode: mode for mode in ("delete", "truncate", "persist", "memory", "wal", "off")},
+    "synchronous": {"off": 0, "normal": 1, "full": 2, "extra": 3},
+    "temp_store": {"default": 0, "file": 1, "memory": 2},
+}
+
+# PRAGMAs that don't apply to in-memory databases (SQLite ignores them there).
+FILE_ONLY_PRAGMAS = ("journal_mode", "mmap_size")
+
+# PRAGMAs that write to the database file, which read-only connections can't change.
+WRITE_PRAGMAS = ("journal_mode",)
+
+
+def get_pragmas():
+    return getattr(settings, "SQLITE_PRAGMAS", DEFAULT_PRAGMAS)
+
+
+def normalize(name, value):
+    """
+    Returns the value in the form SQLite reports it when it's read back.
+    """
+    if name == "journal_mode":
+        return str(value).lower()
+    if name in NAMED_VALUES:
+        value = str(value).lower()
+        return NAMED_VALUES[name][value] if value in NAMED_VALUES[name] else int(value)
+    return int(value)
+
+
+def is_valid(name, value):
+    if isinstance(value, bool):
+        return False
+    if name in NAMED_VALUES:
+        value = str(value).lower()
+        return value in NAMED_VALUES[name] or (
+            name != "journal_mode" and value.isdigit() and int(value) in NAMED_VALUES[name].values()
+        )
+    return isinstance(value, int)
+
+
+def is_read_only(connection):
+    """
+    Checks whether the connection opens its database read-only, with a
+    `file:` URI that has `mode=ro` or `immutable=1` (like the replica, see `api.routing`).
+    """
+    _, _, query = str(connection.settings_dict["NAME"]).partition("?")
+    return "mode=ro" in query.split("&") or "immutable=1" in query.split("&")
+
+
+def applicable_pragmas(connection, pragmas):
+    """
+    Returns the PRAGMAs that apply to the database of the connection, in order:
+    `busy_timeout` is set first, so switching to WAL waits for other connections.
+    """
+    names = sorted(pragmas, key=lambda name: name != "busy_timeout")
+    if connection.is_in_memory_db():
+        names = [name for name in names if name not in FILE_ONLY_PRAGMAS]
+    if is_read_only(connection):
+        names = [name for name in names if name not in WRITE_PRAGMAS]
+    return {name: pragmas[name] for name in names}
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def read_pragmas(cursor, names):
+    values = {}
+    for name in names:
+        cursor.execute(f"PRAGMA {name}")
+        row = cursor.fetchone()
+        values[name] = normalize(name, row[0]) if row else None
+    return values
+
+
+def is_new_database(cursor):
+    """
+    Checks whether the database of the cursor is still empty (no page written yet).
+    """
+    cursor.execute("PRAGMA page_count")
+    return cursor.fetchone()[0] == 0
+
+
+def configure_connection(connection):
+    """
+    Runs the configured PRAGMAs on a new connection, if it's a SQLite one. The
+    journal mode is only set on new databases (see above).
+    """
+    if connection.vendor != "sqlite":
+        return
+    pragmas = applicable_pragmas(connection, get_pragmas())
+    with connection.cursor() as cursor:
+        if "journal_mode" in pragmas and not is_new_database(cursor):
+            del pragmas["journal_mode"]
+        apply_pragmas(cursor, pragmas)
+
+
+def convert_journal_mode(connection):
+    """
+    Sets the configured journal mode on the database of the connection, even if
+    it already exists. Returns the mode SQLite reports afterwards, or None if the
+    journal mode doesn't apply to the database.
+    """
+    pragmas = applicable_pragmas(connection, get_pragmas())
+    if "journal_mode" not in pragmas:
+        return None
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, {"journal_mode": pragmas["journal_mode"]})
+        return read_pragmas(cursor, ["journal_mode"])["journal_mode"]
+
+
+def compare_pragmas(connection):
+    """
+    Returns a list of `(name, configured, actual)` tuples for the PRAGMAs of the
+    connection, with their values normalized.
+    """
+    pragmas = applicable_pragmas(connection, get_pragmas())
+    with connection.cursor() as cursor:
+        actual = read_pragmas(cursor, pragmas)
+    return [(name, normalize(name, value), actual[name]) for name, value in pragmas.items()]
+
+
+@register(Tags.database)
+def check_sqlite_pragmas(app_configs, databases=None, **kwargs):
+    """
+    Checks the configured PRAGMAs are in effect on the SQLite databases (run by
+    `migrate` and `check --database`). The journal mode of an existing database
+    differs until it's converted, and can fail to apply, e.g. on network
+    filesystems that don't support WAL.
+    """
+    problems = []
+    for alias in databases or ():
+        connection = connections[alias]
+        if connection.vendor != "sqlite":
+            continue
+        for name, configured, actual in compare_pragmas(connection):
+            if configured != actual:
+                hint = "Check SQLITE_PRAGMAS and that the database file supports it."
+                if name == "journal_mode":
+                    hint = f"Set it with `python manage.py sqlite_pragmas --convert --database {alias}`. {hint}"
+                problems.append(Warning(
+                    f"PRAGMA {name} of the {alias!r} database is {actual!r} instead of {configured!r}.",
+                    hint=hint,
+                    id="api.W001",
+                ))
+    return problems
+
+
+@register()
+def check_sqlite_pragmas_setting(app_configs, **kwargs):
+    """
+    Checks `SQLITE_PRAGMAS` only has known PRAGMAs with valid values.
+    """
+    problems = []
+    for name, value in get_pragmas().items():
+        if name not in DEFAULT_PRAGMAS:
+            problems.append(Error(f"Unknown PRAGMA {name!r} in SQLITE_PRAGMAS.", id="api.E001"))
+            continue
+        if not is_valid(name, value):
+            problems.append(Error(f"Invalid value {value!r} for PRAGMA {name} in SQLITE_PRAGMAS.", id="api.E002"))
+    return problems
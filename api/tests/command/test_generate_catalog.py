@@ -0,0 +1,75 @@
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from api.models import Card, Expansion, PokemonType
+
+
+class GenerateCatalogCommandTests(TestCase):
+    def generate(self, *args):
+        call_command("generate_catalog", "--cards", "500", "--expansions", "6", *args, stdout=StringIO())
+
+    def test_generate_catalog(self):
+        """
+        Tests that the cards are spread over the new expansions, numbered from 1
+        in each of them, with unique names and HP multiple of 10.
+        """
+        self.generate("--seed", "1", "--batch-size", "120")
+        self.assertEqual(Card.objects.count(), 500)
+        self.assertEqual(PokemonType.objects.count(), 18)
+        expansions = list(Expansion.objects.all())
+        self.assertEqual(len(expansions), 6)
+        self.assertEqual(sum(expansion.cards for expansion in expansions), 500)
+        for expansion in expansions:
+            numbers = list(Card.objects.filter(expansion=expansion).values_list("card_number", flat=True))
+            self.assertEqual(sorted(numbers), list(range(1, expansion.cards + 1)))
+        cards = list(Card.objects.all())
+        self.assertEqual(len({card.name.lower() for card in cards}), 500)
+        self.assertTrue(all(card.hp % 10 == 0 and 30 <= card.hp <= 340 for card in cards))
+        self.assertTrue(all(card.type1_id != card.type2_id for card in cards))
+        self.assertEqual({card.rarity for card in cards}, {"common", "uncommon", "rare"})
+
+    def test_deterministic(self):
+        """
+        Tests that the same seed generates the same cards, and that generating
+        them again doesn't break the unique names.
+        """
+        def generated_cards():
+            return [
+                (card.name.split(" ")[0], card.rarity, card.type1_id, card.type2_id, card.hp, card.price,
+                 card.card_number, card.first_edition)
+                for card in Card.objects.order_by("-pk")[:500]
+            ]
+
+        self.generate("--seed", "7")
+        first = generated_cards()
+        self.generate("--seed", "7")
+        self.assertEqual(generated_cards(), first)
+        self.assertEqual(Expansion.objects.count(), 12)
+        self.generate("--seed", "8")
+        self.assertNotEqual(generated_cards(), first)
+
+    def test_distributions(self):
+        """
+        Tests that the distributions can be configured, and are validated.
+        """
+        self.generate("--rarity", "rare=1", "--dual-type-ratio", "0", "--type-skew", "0")
+        self.assertEqual(set(Card.objects.values_list("rarity", flat=True)), {"rare"})
+        self.assertFalse(Card.objects.exclude(type2=None).exists())
+        for args in (["--rarity", "mythic=1"], ["--rarity", "common"], ["--dual-type-ratio", "2"],
+                     ["--price-median", "common=0"], ["--cards", "0"]):
+            with self.subTest(args=args), self.assertRaises(CommandError):
+                self.generate(*args)
+
+    def test_placeholder_images(self):
+        """
+        Tests that the cards get the placeholder image of their first type, with
+        its derived fields.
+        """
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            self.generate("--images")
+        card = Card.objects.select_related("type1").first()
+        self.assertEqual(card.image.name, f"img/generated/{card.type1.name.lower()}.jpg")
+        self.assertEqual((card.image_width, card.image_height), (480, 670))
+        self.assertEqual(card.image_variants["source"], card.image.name)
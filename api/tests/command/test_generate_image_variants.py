@@ -0,0 +1,48 @@
+import io
+import tempfile
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from api.models import Card
+
+
+class GenerateImageVariantsCommandTests(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        media_root = override_settings(MEDIA_ROOT=temp_dir.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        buffer = io.BytesIO()
+        Image.new("RGB", (300, 420)).save(buffer, "JPEG")
+        self.image_name = default_storage.save("img/card.jpg", ContentFile(buffer.getvalue()))
+
+    def call_command(self, *args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command("generate_image_variants", *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_generate_image_variants(self):
+        """
+        Tests that the derivatives of cards written in bulk are generated once,
+        and that unreadable images are reported.
+        """
+        Card.objects.bulk_create([
+            Card(name="card 1", image=self.image_name),
+            Card(name="card 2", image="img/missing.jpg"),
+            Card(name="card 3"),
+        ])
+        stdout, stderr = self.call_command()
+        self.assertIn("Generated the image variants of 1 cards, 1 failed.", stdout)
+        self.assertIn("img/missing.jpg", stderr)
+        card = Card.objects.get(name="card 1")
+        self.assertEqual((card.image_width, card.image_height), (300, 420))
+        self.assertEqual(card.version, 2)
+        self.assertTrue(default_storage.exists(card.image_variants["small"]["webp"]))
+
+        stdout, _ = self.call_command()
+        self.assertIn("Generated the image variants of 0 cards, 1 failed.", stdout)
+        stdout, _ = self.call_command("--all")
+        self.assertIn("Generated the image variants of 1 cards, 1 failed.", stdout)
@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from api.models import Card, Expansion, PokemonType
+
+CSV_HEADER = "name,rarity,expansion,type1,type2,hp,card_number,price,first_edition\n"
+
+
+class ImportCardsCommandTests(TestCase):
+    def setUp(self):
+        self.expansion = Expansion.objects.create(name="Base Set", series="Original Series")
+        self.fire = PokemonType.objects.create(name="Fire")
+        self.water = PokemonType.objects.create(name="Water")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def write_file(self, filename, content):
+        """
+        Writes a file to import in the temporary directory and returns its path.
+        """
+        path = os.path.join(self.temp_dir.name, filename)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def import_cards(self, *args):
+        """
+        Runs the command and returns its output.
+        """
+        stdout, stderr = StringIO(), StringIO()
+        call_command("import_cards", *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_csv(self):
+        """
+        Tests that valid rows are imported, with expansions and types given by name.
+        """
+        path = self.write_file("cards.csv", CSV_HEADER + (
+            "Charmander,common,base set,fire,,50,46,69.94,false\n"
+            "Squirtle,Common,Base Set,Water,Fire,40,63,12.00,true\n"
+        ))
+        self.import_cards(path)
+        charmander = Card.objects.get(name="Charmander")
+        self.assertEqual(charmander.expansion, self.expansion)
+        self.assertEqual(charmander.type1, self.fire)
+        self.assertIsNone(charmander.type2)
+        self.assertEqual(charmander.price, Decimal("69.94"))
+        self.assertFalse(charmander.first_edition)
+        squirtle = Card.objects.get(name="Squirtle")
+        self.assertEqual((squirtle.rarity, squirtle.type2), ("common", self.fire))
+
+    def test_invalid_rows_are_rejected(self):
+        """
+        Tests that invalid rows are reported in the rejects file without stopping the import.
+        """
+        Card.objects.create(name="Existing")
+        path = self.write_file("cards.jsonl", "\n".join(json.dumps(row) for row in [
+            {"name": "Valid", "hp": 60},
+            {"name": "Bad HP", "hp": 55},
+            {"name": "Bad type", "type1": "Shadow"},
+            {"name": "existing"},
+            {"name": "123"},
+            {"name": "Valid 2", "rarity": "legendary", "price": "1.234"},
+        ]))
+        rejects = os.path.join(self.temp_dir.name, "rejects.jsonl")
+        self.import_cards(path, "--rejects", rejects)
+        self.assertTrue(Card.objects.filter(name="Valid").exists())
+        self.assertEqual(Card.objects.count(), 2)
+        with open(rejects, encoding="utf-8") as file:
+            rejected = [json.loads(line) for line in file]
+        rejected.sort(key=lambda row: row["line"])
+        self.assertEqual([row["line"] for row in rejected], [2, 3, 4, 5, 6])
+        self.assertEqual(len(rejected[-1]["errors"]), 2)
+
+    def test_upsert(self):
+        """
+        Tests that with --upsert, cards whose name exists are updated instead of rejected.
+        """
+        card = Card.objects.create(name="Charmander", hp=40)
+        path = self.write_file("cards.jsonl", json.dumps({"name": "CHARMANDER", "hp": 50, "type1": "fire"}))
+        stdout, stderr = self.import_cards(path, "--upsert")
+        card.refresh_from_db()
+        self.assertEqual((card.name, card.hp, card.type1), ("CHARMANDER", 50, self.fire))
+        self.assertIn("1 updated", stdout)
+
+    def test_queries_per_batch(self):
+        """
+        Tests that the number of queries depends on the number of batches, not of rows.
+        """
+        query_counts = []
+        for first, count in ((0, 10), (10, 50)):
+            path = self.write_file("cards.csv", CSV_HEADER + "".join(
+                f"Card {i},rare,Base Set,Fire,Water,100,{i},1.00,true\n" for i in range(first, first + count)
+            ))
+            with CaptureQueriesContext(connection) as queries:
+                self.import_cards(path, "--batch-size", "1000")
+            query_counts.append(len(queries))
+        self.assertEqual(Card.objects.count(), 60)
+        self.assertEqual(query_counts[0], query_counts[1])
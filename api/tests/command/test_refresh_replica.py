@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase, override_settings
+from api.models import Expansion
+from api.routing import get_refresh_time
+
+
+class RefreshReplicaCommandTests(TransactionTestCase):
+    # The database is copied with the backup API, which waits for the transaction of a TestCase to end.
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.path = os.path.join(self.directory, "replica.sqlite3")
+        # The replica is only used with a version cache shared by every process.
+        settings_override = override_settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.path.join(self.directory, "cache"),
+        }})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_refresh_replica(self):
+        """
+        Tests that the command copies the database to a file that can be opened
+        read-only, and records the time of the refresh.
+        """
+        Expansion.objects.create(name="Base Set")
+        started = time.time()
+        with mock.patch("api.management.commands.refresh_replica.get_replica_path", return_value=self.path):
+            call_command("refresh_replica", stdout=StringIO())
+        self.assertEqual(sorted(os.listdir(self.directory)), ["cache", "replica.sqlite3", "replica.sqlite3.refreshed"])
+        replica = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True)
+        try:
+            self.assertEqual(replica.execute("SELECT name FROM api_expansion").fetchall(), [("Base Set",)])
+            self.assertEqual(replica.execute("PRAGMA journal_mode").fetchone(), ("delete",))
+        finally:
+            replica.close()
+        self.assertGreaterEqual(get_refresh_time(self.path), started)
+
+    @override_settings(API_REPLICA_DATABASE=None)
+    def test_without_replica(self):
+        with self.assertRaisesMessage(CommandError, "There is no replica database"):
+            call_command("refresh_replica", stdout=StringIO())
+
+    def test_local_version_cache(self):
+        """
+        Tests that the replica isn't refreshed while it's off because of a version
+        cache local to each process.
+        """
+        local_cache = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        with override_settings(CACHES=local_cache), self.assertRaisesMessage(CommandError, "API_VERSION_CACHE"):
+            call_command("refresh_replica", stdout=StringIO())
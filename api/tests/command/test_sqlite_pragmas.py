@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+from api.sqlite import check_sqlite_pragmas_setting, compare_pragmas, convert_journal_mode
+
+
+class SQLitePragmasTests(TestCase):
+    databases = {"default", "replica"}
+
+    def test_file_database(self):
+        """
+        Tests that new connections to a database file get every configured PRAGMA.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = {**connection.settings_dict, "NAME": os.path.join(directory, "db.sqlite3")}
+            file_connection = type(connections["default"])(settings_dict, alias="pragmas")
+            try:
+                file_connection.ensure_connection()
+                pragmas = compare_pragmas(file_connection)
+            finally:
+                file_connection.close()
+        self.assertEqual([name for name, _, _ in pragmas][0], "busy_timeout")
+        self.assertIn(("journal_mode", "wal", "wal"), pragmas)
+        self.assertIn(("synchronous", 1, 1), pragmas)
+        self.assertTrue(all(configured == actual for _, configured, actual in pragmas))
+
+    def test_existing_database(self):
+        """
+        Tests that connections leave the journal mode of an existing database
+        unchanged until it's converted (`sqlite_pragmas --convert`).
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "db.sqlite3")
+            database = sqlite3.connect(path)
+            database.execute("CREATE TABLE example (id INTEGER)")
+            database.close()
+            settings_dict = {**connection.settings_dict, "NAME": path}
+            file_connection = type(connections["default"])(settings_dict, alias="pragmas")
+            try:
+                file_connection.ensure_connection()
+                pragmas = compare_pragmas(file_connection)
+                self.assertIn(("journal_mode", "wal", "delete"), pragmas)
+                self.assertIn(("synchronous", 1, 1), pragmas)
+                self.assertFalse(os.path.exists(f"{path}-wal"))
+
+                self.assertEqual(convert_journal_mode(file_connection), "wal")
+                self.assertIn(("journal_mode", "wal", "wal"), compare_pragmas(file_connection))
+            finally:
+                file_connection.close()
+
+    def test_read_only_database(self):
+        """
+        Tests that read-only connections (like the replica's) get every PRAGMA but
+        the journal mode, which they can't change.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "db.sqlite3")
+            sqlite3.connect(path).close()
+            settings_dict = {**connection.settings_dict, "NAME": f"file:{path}?mode=ro&immutable=1"}
+            read_only_connection = type(connections["default"])(settings_dict, alias="pragmas")
+            try:
+                read_only_connection.ensure_connection()
+                pragmas = compare_pragmas(read_only_connection)
+            finally:
+                read_only_connection.close()
+        self.assertNotIn("journal_mode", [name for name, _, _ in pragmas])
+        self.assertIn(("mmap_size", 268435456, 268435456), pragmas)
+        self.assertTrue(all(configured == actual for _, configured, actual in pragmas))
+
+    def test_command(self):
+        """
+        Tests that the command shows the PRAGMAs, and fails with --check when one
+        of them doesn't have its configured value.
+        """
+        stdout = StringIO()
+        call_command("sqlite_pragmas", "--check", "--database", "default", stdout=stdout)
+        self.assertIn("busy_timeout", stdout.getvalue())
+        self.assertIn("temp_store", stdout.getvalue())
+        # The test database is in memory, where the journal mode doesn't apply.
+        self.assertNotIn("journal_mode", stdout.getvalue())
+
+        with override_settings(SQLITE_PRAGMAS={"busy_timeout": 1234}):
+            with self.assertRaises(CommandError):
+                call_command("sqlite_pragmas", "--check", stdout=StringIO())
+
+    def test_setting_check(self):
+        """
+        Tests that unknown PRAGMAs and invalid values are reported.
+        """
+        self.assertEqual(check_sqlite_pragmas_setting(None), [])
+        invalid = {"journal_mode": "fast", "synchronous": "NORMAL", "cache_size": "big", "page_size": 4096}
+        with override_settings(SQLITE_PRAGMAS=invalid):
+            errors = check_sqlite_pragmas_setting(None)
+        self.assertEqual(sorted(error.id for error in errors), ["api.E001", "api.E002", "api.E002"])
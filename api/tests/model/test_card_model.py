@@ -1,7 +1,12 @@
+import io
+import tempfile
 from datetime import date
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.db import IntegrityError
-from django.test import TestCase
-from api.models import Card, PokemonType, Expansion
+from django.test import TestCase, override_settings
+from PIL import Image
+from api.models import Card, CardTypeMembership, PokemonType, Expansion
 
 
 class CardModelTests(TestCase):
@@ -69,3 +74,106 @@ class CardModelTests(TestCase):
         card.delete()
         with self.assertRaises(Card.DoesNotExist):
             Card.objects.get(id=card.id)
+
+    def test_type_memberships(self):
+        """
+        Tests that the type memberships of a Card follow its types when it's
+        created (including in bulk), updated and deleted.
+        """
+        type1 = PokemonType.objects.create(name="type 1")
+        type2 = PokemonType.objects.create(name="type 2")
+
+        def memberships(card):
+            return set(CardTypeMembership.objects.filter(card=card).values_list("pokemon_type", flat=True))
+
+        card = Card.objects.create(name="card 1", type1=type1, type2=type2)
+        self.assertEqual(memberships(card), {type1.pk, type2.pk})
+        Card.objects.bulk_create([Card(name="card 2", type1=type2, type2=type2)])
+        self.assertEqual(memberships(Card.objects.get(name="card 2")), {type2.pk})
+
+        Card.objects.filter(pk=card.pk).update(type2=None)
+        self.assertEqual(memberships(card), {type1.pk})
+
+        card.delete()
+        self.assertEqual(memberships(card), set())
+
+    def test_version_and_modified(self):
+        """
+        Tests that every save of a Card (including partial saves and bulk updates)
+        increases its version and updates its modification time.
+        """
+        card = Card.objects.create(name="card 1")
+        self.assertEqual(card.version, 1)
+        first_modified = card.modified
+
+        card.hp = 50
+        card.save(update_fields=["hp"])
+        card.refresh_from_db()
+        self.assertEqual(card.version, 2)
+        self.assertGreater(card.modified, first_modified)
+
+        Card.objects.bulk_update([Card(pk=card.pk, hp=60, **Card.modification_values())], ["hp", "modified", "version"])
+        card.refresh_from_db()
+        self.assertEqual((card.hp, card.version), (60, 3))
+
+
+class CardImageDerivativesTests(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        media_root = override_settings(MEDIA_ROOT=temp_dir.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+    def upload(self, name, size=(600, 840), image_format="JPEG"):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, (200, 40, 40)).save(buffer, image_format)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def test_derivatives_on_upload(self):
+        """
+        Tests that uploading an image stores its dimensions, a placeholder and
+        its variants in every format, never larger than the original.
+        """
+        card = Card.objects.create(name="card 1", image=self.upload("card.jpg"))
+        self.assertEqual((card.image_width, card.image_height), (600, 840))
+        self.assertTrue(card.image_placeholder.startswith("data:image/webp;base64,"))
+        self.assertEqual(card.image_variants["source"], card.image.name)
+        thumbnail = card.image_variants["thumbnail"]
+        self.assertEqual(thumbnail["width"], 64)
+        self.assertIn(thumbnail["height"], (89, 90))
+        with card.image.storage.open(thumbnail["webp"]) as file:
+            self.assertEqual(Image.open(file).format, "WEBP")
+        with card.image.storage.open(thumbnail["jpeg"]) as file:
+            self.assertEqual(Image.open(file).size, (64, thumbnail["height"]))
+        self.assertEqual(card.image_variants["medium"]["height"], 670)
+
+        small = Card.objects.create(name="card 2", image=self.upload("small.png", (100, 140), "PNG"))
+        self.assertEqual(small.image_variants["medium"]["width"], 100)
+        self.assertEqual(small.image_variants["thumbnail"]["width"], 64)
+
+    def test_derivatives_follow_image(self):
+        """
+        Tests that the derivatives are generated again only when the image
+        changes, and cleared when it's removed or can't be read.
+        """
+        card = Card.objects.create(name="card 1", image=self.upload("card.jpg"))
+        with mock.patch("api.images.generate_derivatives") as generate:
+            card.hp = 60
+            card.save()
+        generate.assert_not_called()
+
+        card.image = self.upload("other.jpg", (300, 420))
+        card.save()
+        self.assertEqual(card.image_width, 300)
+
+        card.image = "img/missing.jpg"
+        card.save()
+        self.assertEqual((card.image_width, card.image_variants), (None, {}))
+
+        card.image = self.upload("card.jpg")
+        card.save()
+        card.image = None
+        card.save()
+        card.refresh_from_db()
+        self.assertEqual((card.image_width, card.image_placeholder, card.image_variants), (None, "", {}))
@@ -152,3 +152,18 @@ class CardSerializerTestCase(APITestCase):
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Card.objects.count(), 0)
+
+    def test_card_serializer_image_variants(self):
+        """
+        Tests that the response of an upload has the dimensions, the placeholder
+        and the absolute URLs of the variants of the image.
+        """
+        response = self.client.post(reverse("card-list"), self.valid_card)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data["image_width"], response.data["image_height"]), (100, 100))
+        self.assertTrue(response.data["image_placeholder"].startswith("data:image/"))
+        thumbnail = response.data["image_variants"]["thumbnail"]
+        self.assertEqual((thumbnail["width"], thumbnail["height"]), (64, 64))
+        self.assertTrue(thumbnail["webp"].startswith("http://testserver/media/img/variants/"))
+        self.assertRegex(thumbnail["webp"], r"_thumbnail_[0-9a-f]{8}\.webp$")
+        self.assertEqual(set(response.data["image_variants"]), {"thumbnail", "small", "medium"})
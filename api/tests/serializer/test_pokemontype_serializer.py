@@ -1,3 +1,8 @@
+from datetime import timedelta
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -114,3 +119,44 @@ class PokemonTypeSerializerTests(APITestCase):
 		response = self.client.delete(url)
 		self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
 		self.assertEqual(PokemonType.objects.count(), 4)
+
+	def test_pokemontype_serializer_reads_reference_cache(self):
+		"""
+		Tests that once the reference data cache is built, serializing a type runs
+		no queries, and that changing the matchups is reflected right away.
+		"""
+		self.type1.strong_vs.set([self.type2, self.type3])
+		PokemonTypeSerializer(self.type1).data
+		with CaptureQueriesContext(connection) as queries:
+			data = PokemonTypeSerializer(self.type1).data
+		self.assertEqual(len(queries), 0)
+		self.assertEqual(data["strong_vs"], [self.type2.name, self.type3.name])
+
+		self.type1.strong_vs.remove(self.type3)
+		self.type4.name = "Renamed Pokemon Type 4"
+		self.type4.save()
+		self.type1.weak_vs.set([self.type4])
+		data = PokemonTypeSerializer(self.type1).data
+		self.assertEqual(data["strong_vs"], [self.type2.name])
+		self.assertEqual(data["weak_vs"], ["Renamed Pokemon Type 4"])
+
+	@override_settings(API_REFERENCE_CACHE_CHECK_INTERVAL=0)
+	def test_pokemontype_serializer_sees_changes_of_other_processes(self):
+		"""
+		Tests that, without a shared version cache, changes that didn't go through
+		the signals of this process (e.g. made by another worker) are read from the
+		database once the check interval is over.
+		"""
+		self.type1.weak_vs.set([self.type4])
+		self.assertEqual(PokemonTypeSerializer(self.type1).data["weak_vs"], ["Pokemon Type 4"])
+
+		# Neither bulk updates nor bulk inserts send signals.
+		PokemonType.objects.filter(pk=self.type4.pk).update(
+			name="Renamed Pokemon Type 4", modified=timezone.now() + timedelta(seconds=1)
+		)
+		PokemonType.strong_vs.through.objects.bulk_create([
+			PokemonType.strong_vs.through(from_pokemontype=self.type1, to_pokemontype=self.type2)
+		])
+		data = PokemonTypeSerializer(self.type1).data
+		self.assertEqual(data["weak_vs"], ["Renamed Pokemon Type 4"])
+		self.assertEqual(data["strong_vs"], [self.type2.name])
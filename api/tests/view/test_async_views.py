@@ -0,0 +1,89 @@
+from django.test import TestCase
+from django.urls import reverse
+from api.models import Card, Expansion, PokemonType
+from api.reference_cache import reference_cache
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        fire = PokemonType.objects.create(name="Fire")
+        water = PokemonType.objects.create(name="Water")
+        fire.weak_vs.add(water)
+        water.strong_vs.add(fire)
+        self.expansion = Expansion.objects.create(name="Base Set", series="Original Series")
+        for i in range(15):
+            Card.objects.create(
+                name=f"card {i}", rarity="common", hp=10 * (i + 1), type1=fire if i % 2 else water,
+                type2=water if i % 3 == 1 else None, expansion=self.expansion if i % 4 else None, price="1.50",
+            )
+        self.card = Card.objects.first()
+        self.fire = fire
+
+    async def assertSameResponse(self, url_name, kwargs=None, params=None):
+        """
+        Checks the async view returns the same as the DRF view.
+        """
+        async_response = await self.async_client.get(reverse(f"async-{url_name}", kwargs=kwargs), params or {})
+        response = await self.async_client.get(reverse(url_name, kwargs=kwargs), params or {})
+        self.assertEqual(async_response.status_code, response.status_code)
+        self.assertEqual(async_response["Content-Type"], "application/json")
+        expected = response.json()
+        if isinstance(expected, dict):
+            for link in ("next", "previous"):
+                if expected.get(link):
+                    expected[link] = expected[link].replace("/cards", "/async/cards").replace(
+                        "/expansions", "/async/expansions").replace("/types", "/async/types")
+        self.assertEqual(async_response.json(), expected)
+        return async_response
+
+    async def test_lists(self):
+        """
+        Tests that the async lists return the same pages as the DRF ones.
+        """
+        response = await self.assertSameResponse("card-list")
+        self.assertEqual(response.json()["count"], 15)
+        await self.assertSameResponse("card-list", params={"page": 2})
+        await self.assertSameResponse("card-list", params={"page": 3, "page_size": 5})
+        await self.assertSameResponse("card-list", params={"page_size": 500})
+        await self.assertSameResponse("card-list", params={"count": "false", "page": 2, "page_size": 4})
+        await self.assertSameResponse("expansion-list")
+        await self.assertSameResponse("type-list")
+
+    async def test_details(self):
+        """
+        Tests that the async details return the same as the DRF ones.
+        """
+        response = await self.assertSameResponse("card-by-id", {"pk": self.card.pk})
+        self.assertEqual(response.json()["expansion"], None)
+        card = await Card.objects.aget(name="card 1")
+        response = await self.assertSameResponse("card-by-id", {"pk": card.pk})
+        self.assertEqual(response.json()["expansion"]["name"], "Base Set")
+        await self.assertSameResponse("expansion-by-id", {"pk": self.expansion.pk})
+        response = await self.assertSameResponse("type-by-id", {"pk": self.fire.pk})
+        self.assertEqual(response.json()["weak_vs"], ["Water"])
+
+    async def test_not_found(self):
+        """
+        Tests that missing objects and pages get a 404 response.
+        """
+        response = await self.async_client.get(reverse("async-card-by-id", kwargs={"pk": 999}))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"detail": "Not found."})
+        for page in (3, 0, "abc"):
+            response = await self.async_client.get(reverse("async-card-list"), {"page": page})
+            self.assertEqual(response.status_code, 404)
+        response = await self.async_client.post(reverse("async-card-list"), {})
+        self.assertEqual(response.status_code, 405)
+
+    async def test_new_reference_data(self):
+        """
+        Tests that related objects missing from the reference data snapshot are
+        loaded before serializing.
+        """
+        expansion = await Expansion.objects.acreate(name="Jungle", series="Original Series")
+        await self.async_client.get(reverse("async-card-list"))
+        # As if the expansion had been created by another worker.
+        reference_cache._data.expansions.pop(expansion.pk, None)
+        await Card.objects.filter(pk=self.card.pk).aupdate(expansion=expansion)
+        response = await self.async_client.get(reverse("async-card-by-id", kwargs={"pk": self.card.pk}))
+        self.assertEqual(response.json()["expansion"]["name"], "Jungle")
@@ -0,0 +1,35 @@
+from django.test import TestCase
+from api.benchmarks import BENCHMARK_CASES, compare_results, run_benchmarks
+from api.query_plans import seed_plan_dataset
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_plan_dataset(cards=300)
+
+    def test_run_benchmarks(self):
+        """
+        Tests that every serializer and list view is measured, with the row
+        counts of the dataset.
+        """
+        results = run_benchmarks(repeat=1)
+        self.assertEqual(set(results["serializers"]), {"CardSerializer", "ExpansionSerializer", "PokemonTypeSerializer"})
+        self.assertEqual(results["serializers"]["CardSerializer"]["instances"], 100)
+        self.assertEqual(list(results["views"]), [str(case) for case in BENCHMARK_CASES])
+        cards = results["views"]["/cards"]
+        self.assertEqual(cards["count"], 300)
+        self.assertGreater(cards["queries"], 0)
+        self.assertEqual(set(cards["count_ms"]), {"exact", "cached", "estimated"})
+        self.assertEqual(results["rows"], {"Card": 300, "Expansion": 150, "PokemonType": 18})
+
+    def test_compare_results(self):
+        """
+        Tests that results are compared by the dotted path of their numeric values.
+        """
+        old = {"views": {"/cards": {"request_ms": 2.0, "count_ms": {"exact": 1.0}}}, "rows": {"Card": 10}}
+        new = {"views": {"/cards": {"request_ms": 3.0, "count_ms": {"exact": 1.0}}, "/types": {"request_ms": 1.0}}}
+        self.assertEqual(
+            compare_results(old, new),
+            [("views./cards.request_ms", 2.0, 3.0), ("views./cards.count_ms.exact", 1.0, 1.0)],
+        )
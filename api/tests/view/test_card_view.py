@@ -1,9 +1,24 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from asgiref.sync import async_to_sync
+from django.core.asgi import get_asgi_application
+from django.core.cache import caches
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 from api.models import Card, Expansion, PokemonType
+from api.response_cache import response_cache
 from api.serializers import CardSerializer
-from datetime import date
+from datetime import date, timedelta
 
 
 class CardListTests(APITestCase):
@@ -263,6 +278,47 @@ class CardFilterByTypeTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["results"], [])
 
+    def test_card_list_by_any_of_several_types(self):
+        """
+        Ensure cards having any of several types are retrieved, each one once.
+        """
+        url = reverse("card-list-by-types")
+        response = self.client.get(url, {"types": f"{self.type1.pk},{self.type2.pk}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([card["id"] for card in response.data["results"]], [self.card1.pk, self.card2.pk])
+
+    def test_card_list_by_all_of_several_types(self):
+        """
+        Ensure only cards having all the given types are retrieved with `match=all`.
+        """
+        url = reverse("card-list-by-types")
+        response = self.client.get(url, {"types": f"{self.type1.pk},{self.type2.pk}", "match": "all"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([card["id"] for card in response.data["results"]], [self.card1.pk])
+
+    def test_card_list_by_types_invalid_parameters(self):
+        """
+        Ensure invalid `types` or `match` values are rejected.
+        """
+        url = reverse("card-list-by-types")
+        response = self.client.get(url, {"types": "fire"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {"types": self.type1.pk, "match": "some"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_card_list_by_type_follows_type_changes(self):
+        """
+        Ensure a card is listed under its new type once its type changes.
+        """
+        self.card2.type1 = self.type2
+        self.card2.save()
+        url = reverse("card-list-by-type", kwargs={"pk": self.type1.pk})
+        response = self.client.get(url)
+        self.assertEqual([card["id"] for card in response.data["results"]], [self.card1.pk])
+        url = reverse("card-list-by-type", kwargs={"pk": self.type2.pk})
+        response = self.client.get(url)
+        self.assertEqual([card["id"] for card in response.data["results"]], [self.card1.pk, self.card2.pk])
+
 
 class CardFilterByRarityTestCase(APITestCase):
     def setUp(self):
@@ -321,4 +377,812 @@ class CardFilterByRarityTestCase(APITestCase):
 
     def test_get_cards_by_invalid_rarity(self):
         response = self.client.get(self.url + "invalid_rarity/")
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CardListQueryCountTests(APITestCase):
+    def setUp(self):
+        self.expansion = Expansion.objects.create(name="expansion 1", series="series 1")
+        self.type1 = PokemonType.objects.create(name="type 1")
+        self.type2 = PokemonType.objects.create(name="type 2")
+        self.type3 = PokemonType.objects.create(name="type 3")
+        self.type1.strong_vs.set([self.type2])
+        self.type1.weak_vs.set([self.type3])
+        self.type2.resistant_to.set([self.type1, self.type3])
+        self.type2.vulnerable_to.set([self.type3])
+        for i in range(30):
+            Card.objects.create(
+                name=f"card {i}",
+                rarity=Card.RarityEnum.COMMON,
+                expansion=self.expansion,
+                type1=self.type1,
+                type2=self.type2,
+            )
+
+    def assertConstantQueries(self, url):
+        """
+        Requests a small and a large page from the given url and checks both
+        run the same number of queries. A first request warms up the reference
+        data cache.
+        """
+        self.client.get(url)
+        query_counts = []
+        for page_size in (5, 25):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {"page_size": page_size})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data["results"]), page_size)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_card_list_query_count(self):
+        """
+        Tests that the number of queries of the card list doesn't grow with the page size.
+        """
+        self.assertConstantQueries(reverse("card-list"))
+
+    def test_card_list_by_expansion_query_count(self):
+        """
+        Tests that the number of queries of the cards by expansion list doesn't grow with the page size.
+        """
+        self.assertConstantQueries(reverse("card-list-by-expansion", kwargs={"pk": self.expansion.pk}))
+
+    def test_card_list_by_type_query_count(self):
+        """
+        Tests that the number of queries of the cards by type list doesn't grow with the page size.
+        """
+        self.assertConstantQueries(reverse("card-list-by-type", kwargs={"pk": self.type2.pk}))
+
+    def test_card_list_by_rarity_query_count(self):
+        """
+        Tests that the number of queries of the cards by rarity list doesn't grow with the page size.
+        """
+        self.assertConstantQueries(reverse("card-list-by-rarity", kwargs={"rarity": "common"}))
+
+
+class CardCursorPaginationTests(APITestCase):
+    def setUp(self):
+        self.type1 = PokemonType.objects.create(name="type 1")
+        self.cards = [
+            Card.objects.create(name=f"card {i}", rarity=Card.RarityEnum.COMMON, type1=self.type1)
+            for i in range(25)
+        ]
+
+    def walk(self, url):
+        """
+        Follows the `next` links from the first cursor page of the given url and
+        returns the ids of every card found.
+        """
+        ids = []
+        response = self.client.get(url, {"pagination": "cursor", "page_size": 10})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            ids.extend(card["id"] for card in response.data["results"])
+            if not response.data["next"]:
+                return ids
+            response = self.client.get(response.data["next"])
+
+    def test_cursor_pagination_walks_every_card(self):
+        """
+        Tests that following the cursor links returns every card once, in id order.
+        """
+        self.assertEqual(self.walk(reverse("card-list")), [card.id for card in self.cards])
+
+    def test_cursor_pagination_on_filtered_list(self):
+        """
+        Tests that cursor pagination works on the filter by views.
+        """
+        url = reverse("card-list-by-type", kwargs={"pk": self.type1.pk})
+        self.assertEqual(self.walk(url), [card.id for card in self.cards])
+
+    def test_cursor_pagination_runs_no_count_query(self):
+        """
+        Tests that a cursor page doesn't count the cards.
+        """
+        url = reverse("card-list")
+        first_page = self.client.get(url, {"pagination": "cursor"})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(first_page.data["next"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any("COUNT(" in query["sql"] for query in queries))
+
+
+class CardListCountTests(APITestCase):
+    def setUp(self):
+        for i in range(15):
+            Card.objects.create(name=f"card {i}", rarity=Card.RarityEnum.COMMON if i % 3 else Card.RarityEnum.RARE)
+        self.url = reverse("card-list")
+
+    def count_queries(self, params):
+        """
+        Returns the response to the card list with the given params, and the
+        number of COUNT queries it ran.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, sum("COUNT(" in query["sql"] for query in queries)
+
+    def test_skip_count(self):
+        """
+        Tests that `count=false` skips the count query but still links the next page.
+        """
+        response, count_queries = self.count_queries({"count": "false"})
+        self.assertEqual(count_queries, 0)
+        self.assertIsNone(response.data["count"])
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertIsNotNone(response.data["next"])
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 5)
+        self.assertIsNone(response.data["next"])
+        self.assertIsNotNone(response.data["previous"])
+
+    @override_settings(API_COUNT_MODE="cached")
+    def test_cached_count(self):
+        """
+        Tests that cached counts are reused for the same filters, and refreshed
+        once a card is created.
+        """
+        response, count_queries = self.count_queries({"search": "rare"})
+        self.assertEqual((response.data["count"], count_queries), (5, 1))
+        response, count_queries = self.count_queries({"search": "rare"})
+        self.assertEqual((response.data["count"], count_queries), (5, 0))
+
+        Card.objects.create(name="card 15", rarity=Card.RarityEnum.RARE)
+        response, count_queries = self.count_queries({"search": "rare"})
+        self.assertEqual((response.data["count"], count_queries), (6, 1))
+
+    @override_settings(API_COUNT_MODE="estimated", API_COUNT_ESTIMATE_THRESHOLD=10)
+    def test_estimated_count(self):
+        """
+        Tests that unfiltered counts over tables larger than the threshold are
+        estimated and flagged, while filtered counts stay exact.
+        """
+        Card.objects.filter(name="card 0").delete()
+        response, count_queries = self.count_queries({})
+        self.assertEqual(count_queries, 0)
+        self.assertTrue(response.data["count_is_estimate"])
+        self.assertGreaterEqual(response.data["count"], 14)
+
+        response, count_queries = self.count_queries({"search": "rare"})
+        self.assertNotIn("count_is_estimate", response.data)
+        self.assertEqual(response.data["count"], 4)
+
+
+class CardFullTextSearchTests(APITestCase):
+    def setUp(self):
+        self.pikachu = Card.objects.create(name="Pikachu Pokémon", rarity=Card.RarityEnum.RARE)
+        self.raichu = Card.objects.create(name="Raichu", rarity=Card.RarityEnum.UNCOMMON)
+        self.rare_candy = Card.objects.create(name="Rare Candy", rarity=Card.RarityEnum.COMMON)
+        self.url = reverse("card-list")
+
+    def search(self, term):
+        """
+        Searches the card list and returns the names of the cards found.
+        """
+        response = self.client.get(self.url, {"search": term})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [card["name"] for card in response.data["results"]]
+
+    def test_search_ignores_diacritics(self):
+        """
+        Tests that "pokemon" matches "Pokémon".
+        """
+        self.assertEqual(self.search("pokemon"), [self.pikachu.name])
+
+    def test_search_matches_prefixes(self):
+        """
+        Tests that search terms match the beginning of words.
+        """
+        self.assertEqual(self.search("pika"), [self.pikachu.name])
+        self.assertEqual(self.search("chu"), [])
+
+    def test_search_without_searchable_characters(self):
+        """
+        Tests that terms without letters or digits match nothing, instead of every card.
+        """
+        self.assertEqual(self.search("!!"), [])
+        self.assertEqual(self.search("-"), [])
+        self.assertEqual(self.search("pika !!"), [])
+
+    def test_search_matches_rarity_exactly(self):
+        """
+        Tests that the rarity is matched exactly, so "common" doesn't match uncommon cards.
+        """
+        self.assertEqual(self.search("common"), [self.rare_candy.name])
+        self.assertCountEqual(self.search("rare"), [self.pikachu.name, self.rare_candy.name])
+
+    def test_search_ranks_name_matches_first(self):
+        """
+        Tests that cards matching the search by name are listed before cards
+        matching it only by rarity.
+        """
+        self.assertEqual(self.search("rare")[0], self.rare_candy.name)
+
+    def test_search_ranks_by_relevance(self):
+        """
+        Tests that closer matches are listed first, and that short prefixes,
+        which aren't ranked, keep the cards in id order.
+        """
+        pikachu_v = Card.objects.create(name="Pikachu V Pikachu")
+        self.assertEqual(self.search("pikachu"), [pikachu_v.name, self.pikachu.name])
+        self.assertEqual(self.search("pi"), [self.pikachu.name, pikachu_v.name])
+
+    def test_search_index_follows_changes(self):
+        """
+        Tests that renamed and deleted cards are found under their new names only.
+        """
+        self.raichu.name = "Alolan Raichu"
+        self.raichu.save()
+        self.rare_candy.delete()
+        self.assertEqual(self.search("alolan"), [self.raichu.name])
+        self.assertEqual(self.search("candy"), [])
+
+
+class CardBulkTests(APITestCase):
+    def setUp(self):
+        self.expansion = Expansion.objects.create(name="Base Set", series="Original Series")
+        self.fire = PokemonType.objects.create(name="Fire")
+        self.card1 = Card.objects.create(name="Charmander", hp=50)
+        self.card2 = Card.objects.create(name="Squirtle", hp=40)
+        self.url = reverse("card-bulk")
+
+    def test_bulk_create_update_and_delete(self):
+        """
+        Tests that every operation is applied and has its result.
+        """
+        response = self.client.post(self.url, [
+            {"action": "create", "data": {"name": "Charmeleon", "hp": 80, "type1": self.fire.pk,
+                                          "expansion": self.expansion.pk}},
+            {"action": "update", "id": self.card1.pk, "data": {"hp": 60, "rarity": "Common"}},
+            {"action": "delete", "id": self.card2.pk},
+        ], format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual([result["status"] for result in results], ["created", "updated", "deleted"])
+        charmeleon = Card.objects.get(pk=results[0]["id"])
+        self.assertEqual((charmeleon.type1, charmeleon.expansion), (self.fire, self.expansion))
+        self.card1.refresh_from_db()
+        self.assertEqual((self.card1.name, self.card1.hp, self.card1.rarity), ("Charmander", 60, "common"))
+        self.assertEqual(self.card1.version, 2)
+        self.assertFalse(Card.objects.filter(pk=self.card2.pk).exists())
+
+    def test_bulk_is_transactional(self):
+        """
+        Tests that nothing is written when any operation is invalid, and that the
+        errors are returned for the invalid operations only.
+        """
+        response = self.client.post(self.url, [
+            {"action": "create", "data": {"name": "Bulbasaur"}},
+            {"action": "create", "data": {"name": "charmander"}},
+            {"action": "create", "data": {"name": "Pikachu", "hp": 60, "type1": 999}},
+            {"action": "update", "id": 999, "data": {"hp": 65}},
+            {"action": "delete", "id": self.card2.pk},
+            {"action": "delete", "id": self.card2.pk},
+            {"action": "rename"},
+        ], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        results = response.data["results"]
+        self.assertEqual(
+            [result["status"] for result in results],
+            ["valid", "invalid", "invalid", "invalid", "valid", "invalid", "invalid"],
+        )
+        self.assertIn("name", results[1]["errors"])
+        self.assertEqual(set(results[2]["errors"]), {"type1"})
+        self.assertEqual(set(results[3]["errors"]), {"id", "hp"})
+        self.assertEqual(Card.objects.count(), 2)
+
+    def test_bulk_reuses_released_names(self):
+        """
+        Tests that a name can be taken by a new card when its card is deleted or
+        renamed in the same request.
+        """
+        response = self.client.post(self.url, [
+            {"action": "update", "id": self.card1.pk, "data": {"name": "Charmander (old)"}},
+            {"action": "delete", "id": self.card2.pk},
+            {"action": "create", "data": {"name": "Charmander"}},
+            {"action": "create", "data": {"name": "Squirtle"}},
+        ], format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Card.objects.count(), 3)
+
+    def test_bulk_query_count(self):
+        """
+        Tests that the number of queries doesn't depend on the number of operations.
+        """
+        query_counts = []
+        for first in (0, 50):
+            operations = [
+                {"action": "create", "data": {"name": f"Card {i}", "type1": self.fire.pk, "expansion": self.expansion.pk}}
+                for i in range(first, first * 2 + 5)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, operations, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_bulk_requires_a_list(self):
+        """
+        Tests that a body other than a list of operations is rejected.
+        """
+        response = self.client.post(self.url, {"action": "delete", "id": self.card1.pk}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CardConditionalGetTests(APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # Validators are only remembered with a version cache shared by every process.
+        settings_override = override_settings(CACHES={
+            alias: {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": os.path.join(directory.name, alias),
+            }
+            for alias in ("default", "validators")
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.expansion = Expansion.objects.create(name="Base Set", series="Original Series")
+        self.card1 = Card.objects.create(name="Charmander", rarity="common", expansion=self.expansion)
+        self.card2 = Card.objects.create(name="Squirtle", rarity="common")
+        self.list_url = reverse("card-list-by-rarity", kwargs={"rarity": "common"})
+        self.detail_url = reverse("card-by-id", kwargs={"pk": self.card1.pk})
+
+    def assertNotModified(self, url, etag, max_queries):
+        """
+        Asserts that revalidating the url with the given ETag returns a 304, running
+        at most `max_queries` queries.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertLessEqual(len(queries), max_queries)
+
+    def test_list_revalidation(self):
+        """
+        Tests that an unchanged list is not sent again, without querying the database.
+        """
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotModified(self.list_url, response["ETag"], 0)
+
+    def test_list_validators_without_conditional_headers(self):
+        """
+        Tests that lists requested without conditional headers don't query the
+        last modification time, and that conditional requests get it.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.list_url)
+        self.assertIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+        self.assertFalse([query for query in queries if "MAX(" in query["sql"]])
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH='W/"other"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("Last-Modified", response)
+        response = self.client.get(self.list_url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(API_VALIDATOR_CACHE="validators")
+    def test_list_revalidation_with_unknown_validators(self):
+        """
+        Tests that a 304 is returned without serializing when the validators have
+        to be computed again.
+        """
+        etag = self.client.get(self.list_url)["ETag"]
+        caches["validators"].clear()
+        self.assertNotModified(self.list_url, etag, 2)
+
+    def test_list_changes(self):
+        """
+        Tests that the list ETag changes when a card is added to, changed in,
+        moved out of or deleted from the list, or when a nested expansion changes.
+        """
+        def change_card(**values):
+            for field, value in values.items():
+                setattr(self.card2, field, value)
+            self.card2.save()
+
+        changes = [
+            lambda: Card.objects.create(name="Bulbasaur", rarity="common"),
+            lambda: change_card(hp=10),
+            lambda: change_card(rarity="rare"),
+            lambda: Card.objects.get(name="Bulbasaur").delete(),
+            lambda: Expansion.objects.get(pk=self.expansion.pk).save(),
+        ]
+        etag = self.client.get(self.list_url)["ETag"]
+        for change in changes:
+            change()
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response["ETag"], etag)
+            etag = response["ETag"]
+
+    def test_detail_revalidation(self):
+        """
+        Tests that a card is not sent again until it changes, and that its version is increased.
+        """
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.data["version"], 1)
+        self.assertNotModified(self.detail_url, response["ETag"], 0)
+
+        self.client.patch(self.detail_url, {"hp": 60}, format="json")
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["version"], 2)
+
+    def test_changes_made_by_other_processes(self):
+        """
+        Tests that, without a shared version cache, changes made behind the back
+        of this process (e.g. by another worker) are detected from the database.
+        """
+        local_cache = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        with override_settings(CACHES=local_cache):
+            list_etag = self.client.get(self.list_url)["ETag"]
+            detail_etag = self.client.get(self.detail_url)["ETag"]
+            self.assertNotModified(self.list_url, list_etag, 2)
+            self.assertNotModified(self.detail_url, detail_etag, 1)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE api_card SET name = %s, version = version + 1, modified = %s WHERE id = %s",
+                    ["Charmeleon", timezone.now() + timedelta(seconds=1), self.card1.pk],
+                )
+            for url, etag in ((self.list_url, list_etag), (self.detail_url, detail_etag)):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertIn("Charmeleon", response.content.decode())
+            # Without an exact count, deleted rows couldn't be detected.
+            self.assertNotIn("ETag", self.client.get(self.list_url, {"count": "false"}))
+
+    def test_if_modified_since(self):
+        """
+        Tests that `If-Modified-Since` is supported too.
+        """
+        last_modified = self.client.get(self.detail_url)["Last-Modified"]
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+@override_settings(
+    API_RESPONSE_CACHE_ENABLED=True,
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "response-cache-tests"}},
+)
+class CardResponseCacheTests(APITestCase):
+    def setUp(self):
+        response_cache.clear_local()
+        response_cache.reset_stats()
+        self.fire = PokemonType.objects.create(name="Fire")
+        self.water = PokemonType.objects.create(name="Water")
+        self.expansion = Expansion.objects.create(name="Base Set", series="Original Series")
+        self.card = Card.objects.create(name="Charmander", type1=self.fire, expansion=self.expansion)
+        self.url = reverse("card-list")
+
+    def tearDown(self):
+        caches["default"].clear()
+
+    def test_cache_hit(self):
+        """
+        Tests that a repeated request is served from the in-process cache without
+        queries, and from the shared cache when it's not in the in-process one.
+        """
+        first = self.client.get(self.url, {"page_size": 5, "page": 1})
+        self.assertEqual(first["X-Cache"], "MISS")
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.url, {"page": 1, "page_size": 5})
+        self.assertEqual((second["X-Cache"], len(queries)), ("HIT", 0))
+        self.assertEqual(second.content, first.content)
+
+        response_cache.clear_local()
+        self.assertEqual(self.client.get(self.url, {"page_size": 5, "page": 1})["X-Cache"], "HIT")
+        stats = response_cache.stats()
+        self.assertEqual((stats["l1_hits"], stats["l2_hits"], stats["misses"]), (1, 1, 1))
+
+    def test_invalidation_by_tag(self):
+        """
+        Tests that changing a card only invalidates the responses tagged with
+        cards, and that changing the matchups of a type invalidates the cards.
+        """
+        expansions_url = reverse("expansion-list")
+        self.client.get(self.url)
+        self.client.get(expansions_url)
+
+        self.card.hp = 50
+        self.card.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"][0]["hp"], 50)
+        self.assertEqual(self.client.get(expansions_url)["X-Cache"], "HIT")
+
+        self.fire.strong_vs.add(self.water)
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"][0]["type1"]["strong_vs"], ["Water"])
+
+    def test_cached_revalidation(self):
+        """
+        Tests that cached responses keep their validators.
+        """
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response["X-Cache"]), (status.HTTP_304_NOT_MODIFIED, "HIT"))
+
+
+class CardExportTests(APITestCase):
+    def setUp(self):
+        self.fire = PokemonType.objects.create(name="Fire")
+        self.expansion = Expansion.objects.create(name="Base Set", series="Original Series")
+        for i in range(25):
+            Card.objects.create(
+                name=f"card {i}", rarity="rare" if i % 5 == 0 else "common", type1=self.fire,
+                expansion=self.expansion, price="1.50",
+            )
+        self.url = reverse("card-export")
+
+    def export(self, params=None, **headers):
+        """
+        Returns the response to the export and its whole content.
+        """
+        response = self.client.get(self.url, params or {}, **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    @override_settings(API_EXPORT_CHUNK_SIZE=10)
+    def test_export_ndjson(self):
+        """
+        Tests that every card is exported as a line of JSON, with its related
+        objects by name, in a single query.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response, content = self.export()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(
+            {key: rows[0][key] for key in ("name", "type1", "expansion", "expansion_series", "price")},
+            {"name": "card 0", "type1": "Fire", "expansion": "Base Set", "expansion_series": "Original Series",
+             "price": "1.50"},
+        )
+
+    def test_export_csv_with_filters(self):
+        """
+        Tests the CSV format, and that the filters of the card list are applied.
+        """
+        response, content = self.export({"format": "csv", "search": "rare"})
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual({row["rarity"] for row in rows}, {"rare"})
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="cards.csv"')
+
+    def test_export_gzip(self):
+        """
+        Tests that the export is compressed when the client accepts gzip.
+        """
+        response, content = self.export({"format": "csv"}, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(len(gzip.decompress(content).decode().splitlines()), 26)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_export_gzip_refused(self):
+        """
+        Tests that the export isn't compressed when the client refuses gzip with a zero quality.
+        """
+        for accept_encoding in ("gzip;q=0, deflate", "br, gzip; q=0.0", "*;q=0", "identity"):
+            with self.subTest(accept_encoding=accept_encoding):
+                response, content = self.export({"format": "csv"}, HTTP_ACCEPT_ENCODING=accept_encoding)
+                self.assertNotIn("Content-Encoding", response)
+                self.assertIn("Accept-Encoding", response["Vary"])
+                self.assertEqual(len(content.decode().splitlines()), 26)
+        response, content = self.export({"format": "csv"}, HTTP_ACCEPT_ENCODING="br, gzip;q=0.5")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    def test_export_error_varies_on_accept_encoding(self):
+        """
+        Tests that error responses of the export vary on Accept-Encoding too.
+        """
+        response = self.client.get(self.url, {"format": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_export_under_asgi(self):
+        """
+        Tests that the export is sent whole through the ASGI handler, which
+        iterates the response in the event loop.
+        """
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": self.url, "raw_path": self.url.encode(), "query_string": b"format=csv", "root_path": "",
+            "headers": [(b"host", b"testserver"), (b"accept-encoding", b"gzip")],
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+        }
+        # Like the test client, keeps the handler from closing the connection of the test's transaction.
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            async_to_sync(get_asgi_application())(scope, receive, send)
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+        self.assertEqual(messages[0]["status"], status.HTTP_200_OK)
+        self.assertIn((b"Content-Encoding", b"gzip"), messages[0]["headers"])
+        content = gzip.decompress(b"".join(message.get("body", b"") for message in messages[1:]))
+        self.assertEqual(len(content.decode().splitlines()), 26)
+
+
+class CardColumnarLayoutTests(APITestCase):
+    def setUp(self):
+        fire = PokemonType.objects.create(name="Fire")
+        water = PokemonType.objects.create(name="Water")
+        fire.weak_vs.add(water)
+        expansion = Expansion.objects.create(name="Base Set", series="Original Series")
+        for i in range(20):
+            Card.objects.create(
+                name=f"card {i}", rarity="common", hp=10 * (i + 1), type1=fire if i % 2 else water,
+                type2=water if i % 4 == 1 else None, expansion=expansion, price="1.50",
+            )
+        self.url = reverse("card-list")
+
+    def decode(self, content):
+        """
+        Rebuilds the results of a columnar response, without their null fields.
+        """
+        data = json.loads(content)
+        results = [{} for _ in range(data["length"])]
+        for field, column in data["columns"].items():
+            if isinstance(column, dict):
+                column = dict(zip(column["index"], column["values"]))
+            else:
+                column = dict(enumerate(column))
+            for index, value in column.items():
+                if field in ("expansion", "type1", "type2"):
+                    table = data["related"]["expansions" if field == "expansion" else "types"]
+                    value = {"id": value, **table[str(value)]}
+                results[index][field] = value
+        return data, results
+
+    def test_columnar_layout(self):
+        """
+        Tests that the columnar layout has the same results, without nulls, and
+        is much smaller.
+        """
+        params = {"page_size": 20}
+        response = self.client.get(self.url, params)
+        columnar = self.client.get(self.url, {**params, "layout": "columnar"})
+        self.assertEqual(columnar.status_code, status.HTTP_200_OK)
+        self.assertEqual(columnar["Content-Type"], "application/vnd.pokemon.columnar+json")
+        data, results = self.decode(columnar.content)
+        self.assertNotIn("next", data)
+        self.assertEqual(data["count"], 20)
+        self.assertNotIn("image", data["columns"])
+
+        def without_nulls(value):
+            if isinstance(value, dict):
+                return {key: without_nulls(item) for key, item in value.items() if item is not None}
+            return value
+
+        expected = json.loads(response.content)["results"]
+        self.assertEqual(results, [without_nulls(result) for result in expected])
+        self.assertLess(len(columnar.content) * 3, len(response.content))
+
+    def test_columnar_layout_selection(self):
+        """
+        Tests that the columnar layout can also be selected with its media type
+        and with a format suffix, on every card list view.
+        """
+        def columns(response):
+            return json.loads(response.content)["columns"]
+
+        expected = columns(self.client.get(self.url, {"layout": "columnar"}))
+        self.assertEqual(columns(self.client.get(self.url, HTTP_ACCEPT="application/vnd.pokemon.columnar+json")), expected)
+        self.assertEqual(columns(self.client.get("/cards.columnar")), expected)
+        response = self.client.get(reverse("card-list-by-rarity", kwargs={"rarity": "common"}), {"layout": "columnar"})
+        self.assertEqual(json.loads(response.content)["length"], 10)
+
+
+class CardSparseFieldsetTests(APITestCase):
+    def setUp(self):
+        fire = PokemonType.objects.create(name="Fire")
+        water = PokemonType.objects.create(name="Water")
+        fire.weak_vs.add(water)
+        self.expansion = Expansion.objects.create(name="Base Set", series="Original Series")
+        self.card = Card.objects.create(
+            name="Charmander", rarity="common", hp=50, type1=fire, type2=water, expansion=self.expansion, price="1.50",
+        )
+        self.url = reverse("card-list")
+
+    def test_fields(self):
+        """
+        Tests that only the selected fields are sent, in the serializer's order.
+        """
+        response = self.client.get(self.url, {"fields": "price,id,name"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data["results"][0]), ["id", "name", "price"])
+        self.assertEqual(response.data["results"][0]["price"], "1.50")
+
+    def test_related_fields_are_ids_unless_expanded(self):
+        """
+        Tests that related objects are sent as ids unless they are expanded, and
+        that expanding a field selects it.
+        """
+        response = self.client.get(self.url, {"fields": "id,type1,type2"})
+        result = response.data["results"][0]
+        self.assertEqual(result, {"id": self.card.id, "type1": self.card.type1_id, "type2": self.card.type2_id})
+
+        response = self.client.get(self.url, {"fields": "id,type2", "expand": "type1"})
+        result = response.data["results"][0]
+        self.assertEqual(list(result), ["id", "type1", "type2"])
+        self.assertEqual(result["type1"]["weak_vs"], ["Water"])
+        self.assertEqual(result["type2"], self.card.type2_id)
+
+        response = self.client.get(reverse("card-by-id", args=[self.card.pk]), {"expand": "expansion"})
+        self.assertEqual(response.data["expansion"]["name"], "Base Set")
+        self.assertEqual(response.data["type1"], self.card.type1_id)
+        self.assertEqual(response.data["hp"], 50)
+
+    def test_without_parameters(self):
+        """
+        Tests that related objects are nested when no fieldset is requested.
+        """
+        response = self.client.get(reverse("card-by-id", args=[self.card.pk]))
+        self.assertEqual(response.data, CardSerializer(self.card).data)
+        self.assertEqual(response.data["expansion"]["series"], "Original Series")
+
+    def test_unknown_fields(self):
+        """
+        Tests that unknown fields, and fields that can't be expanded, are rejected.
+        """
+        for params in ({"fields": "id,color"}, {"expand": "name"}, {"expand": "rarity,type1"}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_only_selected_columns_are_loaded(self):
+        """
+        Tests that a fieldset without expansions loads only the selected columns,
+        and doesn't touch the expansion and type tables.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {"fields": "id,name,price,expansion"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sql = " ".join(query["sql"] for query in queries)
+        self.assertNotIn("api_expansion", sql)
+        self.assertNotIn("api_pokemontype", sql)
+        self.assertIn('"api_card"."expansion_id"', sql)
+        self.assertNotIn('"api_card"."hp"', sql)
+        self.assertEqual(response.data["results"][0]["expansion"], self.expansion.id)
+
+    def test_writes_ignore_fieldset(self):
+        """
+        Tests that updates use every field, whatever the query parameters.
+        """
+        url = reverse("card-by-id", args=[self.card.pk])
+        data = {**CardSerializer(self.card).data, "hp": 60, "expansion": self.expansion.id}
+        data["type1"], data["type2"] = self.card.type1_id, self.card.type2_id
+        response = self.client.put(f"{url}?fields=id", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["hp"], 60)
+        self.assertEqual(response.data["expansion"]["name"], "Base Set")
+
+    def test_columnar_layout_with_ids(self):
+        """
+        Tests that related fields that aren't expanded are sent as plain columns
+        in the columnar layout.
+        """
+        response = self.client.get(self.url, {"fields": "id,type1", "expand": "expansion", "layout": "columnar"})
+        data = json.loads(response.content)
+        self.assertEqual(data["columns"]["type1"], [self.card.type1_id])
+        self.assertEqual(data["columns"]["expansion"], [self.expansion.id])
+        self.assertEqual(list(data["related"]), ["expansions"])
@@ -42,6 +42,18 @@ class ExpansionListTests(APITestCase):
 		self.assertEqual(Expansion.objects.count(), 3)
 		self.assertEqual(Expansion.objects.last().name, "expansion 3")
 
+	def test_search_expansion_list(self):
+		"""
+		Tests that the search parameter matches word prefixes in the name and
+		series fields, ignoring diacritics.
+		"""
+		Expansion.objects.create(name="Pokémon Go", series="Sword & Shield")
+		url = reverse("expansion-list")
+		response = self.client.get(url, {"search": "pokemon"})
+		self.assertEqual([expansion["name"] for expansion in response.data["results"]], ["Pokémon Go"])
+		response = self.client.get(url, {"search": "seri 2"})
+		self.assertEqual([expansion["name"] for expansion in response.data["results"]], ["expansion 2"])
+
 
 
 class ExpansionDetailTests(APITestCase):
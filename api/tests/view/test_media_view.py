@@ -0,0 +1,98 @@
+import os
+import tempfile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+class MediaViewTests(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        media_root = override_settings(MEDIA_ROOT=temp_dir.name, MEDIA_OFFLOAD=None)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        os.makedirs(os.path.join(temp_dir.name, "img", "variants"))
+        self.content = bytes(range(256)) * 40
+        with open(os.path.join(temp_dir.name, "img", "variants", "card.jpg"), "wb") as file:
+            file.write(self.content)
+        with open(os.path.join(temp_dir.name, "secret.txt"), "w") as file:
+            file.write("secret")
+        self.url = reverse("media-image", kwargs={"path": "variants/card.jpg"})
+
+    def test_get(self):
+        """
+        Tests that a file is sent whole, with a strong ETag and long-lived cache headers.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertEqual(response["Content-Length"], str(len(self.content)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertRegex(response["ETag"], r'^"[0-9a-f]{64}"$')
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+
+    def test_conditional_get(self):
+        """
+        Tests that requests with matching validators get a 304 response.
+        """
+        response = self.client.get(self.url)
+        revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated["ETag"], response["ETag"])
+        revalidated = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_range(self):
+        """
+        Tests that single ranges get a 206 response with the requested bytes,
+        unless `If-Range` doesn't match, and that unsatisfiable ones get a 416.
+        """
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), self.content[100:200])
+        self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(self.content)}")
+        self.assertEqual(response["Content-Length"], "100")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-10")
+        self.assertEqual(b"".join(response.streaming_content), self.content[-10:])
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10000-")
+        self.assertEqual(b"".join(response.streaming_content), self.content[10000:])
+
+        etag = response["ETag"]
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"other"')
+        self.assertEqual(response.status_code, 200)
+        # Several ranges, or invalid ones, are ignored.
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE="bytes=0-9,20-29").status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE="bytes=9-0").status_code, 200)
+
+        response = self.client.get(self.url, HTTP_RANGE=f"bytes={len(self.content)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.content)}")
+
+    def test_not_found(self):
+        """
+        Tests that missing files, directories and files outside of the images
+        directory aren't served.
+        """
+        for path in ("variants/missing.jpg", "variants", "../secret.txt"):
+            self.assertEqual(self.client.get(f"/media/img/{path}").status_code, 404)
+
+    def test_offload(self):
+        """
+        Tests that the file is left to the front proxy when offloading is set.
+        """
+        with override_settings(MEDIA_OFFLOAD="x-accel-redirect", MEDIA_ACCEL_REDIRECT_PREFIX="/internal/"):
+            response = self.client.get(self.url)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["X-Accel-Redirect"], "/internal/img/variants/card.jpg")
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertIn("immutable", response["Cache-Control"])
+
+        with override_settings(MEDIA_OFFLOAD="x-sendfile"):
+            response = self.client.get(self.url)
+        self.assertTrue(response["X-Sendfile"].endswith(os.path.join("img", "variants", "card.jpg")))
@@ -0,0 +1,103 @@
+import os
+import subprocess
+import sys
+import tempfile
+from django.core.cache import caches
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from api.metrics import CONTENT_TYPE, MetricsFile, make_key
+from api.models import Card, Expansion, PokemonType
+from api.response_cache import response_cache
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(API_METRICS_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        fire = PokemonType.objects.create(name="Fire")
+        expansion = Expansion.objects.create(name="Pokémon Go", series="Sword & Shield", release_date="2022-07-01")
+        for i in range(5):
+            Card.objects.create(name=f"card {i}", type1=fire, expansion=expansion, price="12.30", hp=10 * i)
+
+    def get_metrics(self):
+        """
+        Returns the samples served at /metrics, keyed by name and labels.
+        """
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], CONTENT_TYPE)
+        samples = {}
+        for line in response.content.decode().splitlines():
+            if not line.startswith("#"):
+                sample, value = line.rsplit(" ", 1)
+                samples[sample] = float(value)
+        return samples
+
+    def test_request_metrics(self):
+        """
+        Tests that requests are counted and their durations, sizes and queries
+        recorded by URL name.
+        """
+        self.client.get(reverse("card-list"))
+        response = self.client.get(reverse("card-list"))
+        self.client.get(reverse("card-list-by-type", kwargs={"pk": 1}))
+        samples = self.get_metrics()
+        self.assertEqual(samples['api_requests_total{view="card-list",method="GET",status="200"}'], 2)
+        self.assertEqual(samples['api_requests_total{view="card-list-by-type",method="GET",status="200"}'], 1)
+        self.assertEqual(samples['api_request_duration_seconds_count{view="card-list"}'], 2)
+        self.assertEqual(samples['api_request_duration_seconds_bucket{view="card-list",le="+Inf"}'], 2)
+        self.assertEqual(samples['api_response_size_bytes_sum{view="card-list"}'], 2 * len(response.content))
+        self.assertGreater(samples['api_db_queries_total{view="card-list"}'], 0)
+        # The request to /metrics is in flight while it's answered.
+        self.assertEqual(samples["api_requests_in_flight"], 1)
+        prefix = 'api_request_duration_seconds_bucket{view="card-list"'
+        buckets = [value for sample, value in samples.items() if sample.startswith(prefix)]
+        self.assertEqual(buckets, sorted(buckets))
+
+    def test_workers_aggregated(self):
+        """
+        Tests that the files of other workers are added up, except for the
+        gauges of workers that exited.
+        """
+        self.client.get(reverse("card-list"))
+        worker = subprocess.Popen([sys.executable, "-c", "pass"])
+        worker.wait()
+        other = MetricsFile(os.path.join(self.directory, f"{worker.pid}.metrics"))
+        other.inc(make_key("api_requests_total", [("view", "card-list"), ("method", "GET"), ("status", "200")]), 3)
+        other.inc(make_key("api_requests_in_flight", []), 5)
+        other.close()
+        samples = self.get_metrics()
+        self.assertEqual(samples['api_requests_total{view="card-list",method="GET",status="200"}'], 4)
+        self.assertEqual(samples["api_requests_in_flight"], 1)
+
+    @override_settings(
+        API_RESPONSE_CACHE_ENABLED=True,
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "metrics-tests"}},
+    )
+    def test_response_cache_hit_ratio(self):
+        """
+        Tests that the response cache lookups are counted, and their hit ratio computed.
+        """
+        response_cache.clear_local()
+        self.addCleanup(caches["default"].clear)
+        self.client.get(reverse("card-list"))
+        self.client.get(reverse("card-list"))
+        samples = self.get_metrics()
+        self.assertEqual(samples['api_response_cache_lookups_total{result="misses"}'], 1)
+        self.assertEqual(samples['api_response_cache_lookups_total{result="l1_hits"}'], 1)
+        self.assertEqual(samples["api_response_cache_hit_ratio"], 0.5)
+
+    @override_settings(API_METRICS_ENABLED=False)
+    def test_disabled(self):
+        """
+        Tests that nothing is recorded when API_METRICS_ENABLED is off.
+        """
+        self.client.get(reverse("card-list"))
+        self.assertFalse(os.listdir(self.directory))
+        self.assertNotIn("api_requests_in_flight", self.get_metrics())
@@ -1,3 +1,5 @@
+import csv
+import io
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
@@ -103,3 +105,18 @@ class PokemonTypeFilterByNameTests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 0)
+
+
+class PokemonTypeExportTests(APITestCase):
+    def test_export_types(self):
+        """
+        Tests that types are exported with the names of their matchups.
+        """
+        fire = PokemonType.objects.create(name="Fire")
+        grass = PokemonType.objects.create(name="Grass")
+        fire.strong_vs.add(grass)
+        response = self.client.get(reverse("type-export"), {"format": "csv"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([row["name"] for row in rows], ["Fire", "Grass"])
+        self.assertEqual((rows[0]["strong_vs"], rows[1]["weak_vs"]), ("Grass", ""))
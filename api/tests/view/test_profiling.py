@@ -0,0 +1,112 @@
+import base64
+import os
+import pstats
+import tempfile
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from api.models import Card, Expansion, PokemonType
+from api.profiling import ProfilingMiddleware
+
+
+class ProfilingTests(APITestCase):
+    def setUp(self):
+        fire = PokemonType.objects.create(name="Fire")
+        expansion = Expansion.objects.create(name="Pokémon Go", series="Sword & Shield", release_date="2022-07-01")
+        for i in range(5):
+            Card.objects.create(name=f"card {i}", type1=fire, expansion=expansion, price="12.30", hp=10 * i)
+        self.staff = User.objects.create_user("staff", password="password", is_staff=True)
+        self.user = User.objects.create_user("user", password="password")
+
+    def test_staff_profile(self):
+        """
+        Tests that staff users get the hotspots of the request, sorted as they ask.
+        """
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("card-list"), {"profile": ""})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/plain; charset=utf-8")
+        content = response.content.decode()
+        self.assertTrue(content.startswith(f"GET {reverse('card-list')}?profile= -> 200 in "))
+        self.assertIn("Ordered by: cumulative time", content)
+        self.assertIn("filename:lineno(function)", content)
+
+        response = self.client.get(reverse("card-list"), {"profile": "tottime"})
+        self.assertIn("Ordered by: internal time", response.content.decode())
+        response = self.client.get(reverse("card-list"), {"profile": "nope"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_inert_for_other_users(self):
+        """
+        Tests that the parameter is ignored for anonymous and non-staff users.
+        """
+        response = self.client.get(reverse("card-list"), {"profile": ""})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["count"], 5)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("card-list"), {"profile": "nope"})
+        self.assertEqual(response.json()["count"], 5)
+
+    def test_basic_authentication(self):
+        """
+        Tests that staff users authenticated by DRF (here with HTTP Basic) can
+        profile requests too, unlike other users and invalid credentials.
+        """
+        def get(username, password):
+            credentials = base64.b64encode(f"{username}:{password}".encode()).decode()
+            self.client.credentials(HTTP_AUTHORIZATION=f"Basic {credentials}")
+            return self.client.get(reverse("card-list"), {"profile": ""})
+
+        response = get("staff", "password")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/plain; charset=utf-8")
+        self.assertEqual(get("user", "password").json()["count"], 5)
+        self.assertEqual(get("staff", "wrong").status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stored_profile(self):
+        """
+        Tests that profiles are stored in API_PROFILE_DIR, when it's set.
+        """
+        self.client.force_login(self.staff)
+        with tempfile.TemporaryDirectory() as directory, override_settings(API_PROFILE_DIR=directory):
+            response = self.client.get(reverse("card-list"), {"profile": ""})
+            name = response["X-Profile-File"]
+            self.assertEqual(os.listdir(directory), [name])
+            stats = pstats.Stats(os.path.join(directory, name))
+            self.assertGreater(stats.total_calls, 0)
+
+    def test_async(self):
+        """
+        Tests that the middleware runs natively in async stacks, where it profiles
+        both the event loop and the thread of the sync code.
+        """
+        async def get_response(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(ProfilingMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(ProfilingMiddleware(lambda request: HttpResponse())))
+
+        @async_to_sync
+        async def get(url_name, params):
+            return await self.async_client.get(reverse(url_name), params)
+
+        self.client.force_login(self.staff)
+        self.async_client.cookies = self.client.cookies
+        for url_name, module in (("async-card-list", "async_views.py"), ("card-list", "serializers.py")):
+            with tempfile.TemporaryDirectory() as directory, override_settings(API_PROFILE_DIR=directory):
+                response = get(url_name, {"profile": ""})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertTrue(response.content.decode().startswith(f"GET {reverse(url_name)}?profile= -> 200 in "))
+                stats = pstats.Stats(os.path.join(directory, response["X-Profile-File"]))
+            self.assertTrue(any(filename.endswith(f"api/{module}") for filename, _, _ in stats.stats))
+        response = get("card-list", {"profile": "nope"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_login(self.user)
+        self.async_client.cookies = self.client.cookies
+        response = get("card-list", {"profile": ""})
+        self.assertEqual(response.json()["count"], 5)
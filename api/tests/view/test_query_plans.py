@@ -0,0 +1,43 @@
+from django.test import TestCase
+from api.query_plans import PLAN_CASES, check_case, explain, plan_problems, seed_plan_dataset
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_plan_dataset(cards=5000)
+
+    def test_list_views_use_indexes(self):
+        """
+        Tests that no query run by a list view sorts in a temporary B-tree, or
+        scans a whole table despite being filtered.
+        """
+        for case in PLAN_CASES:
+            with self.subTest(view=case.url_name):
+                results = check_case(case)
+                self.assertTrue(results)
+                for result in results:
+                    self.assertEqual(result.problems, [], f"{result.sql}\n{result.plan}")
+
+    def test_problems_are_reported(self):
+        """
+        Tests that filtering on a column without an index, and sorting by it, are reported.
+        """
+        sql = 'SELECT "id" FROM "api_card" WHERE "hp" = 100 ORDER BY "name"'
+        problems = plan_problems(sql, explain(sql))
+        self.assertEqual(len(problems), 2)
+
+    def test_unindexed_aggregates_are_reported(self):
+        """
+        Tests that aggregating a whole table by a column without an index is
+        reported, and that the validators of revalidated lists aggregate an index.
+        """
+        sql = 'SELECT MAX("hp") FROM "api_card"'
+        self.assertEqual(len(plan_problems(sql, explain(sql))), 1)
+        sql = 'SELECT MAX("modified") FROM "api_card"'
+        self.assertEqual(plan_problems(sql, explain(sql)), [])
+
+        case = next(case for case in PLAN_CASES if case.url_name == "card-list" and case.headers)
+        validator_queries = [result for result in check_case(case) if "MAX(" in result.sql]
+        self.assertEqual(len(validator_queries), 1)
+        self.assertEqual(validator_queries[0].problems, [])
@@ -0,0 +1,56 @@
+import io
+from unittest import mock
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from api import renderers
+from api.models import Card, Expansion, PokemonType
+from api.renderers import FastJSONParser, FastJSONRenderer
+
+
+class FastJSONTests(APITestCase):
+    def setUp(self):
+        fire = PokemonType.objects.create(name="Fire")
+        expansion = Expansion.objects.create(name="Pokémon Go", series="Sword & Shield", release_date="2022-07-01")
+        for i in range(5):
+            Card.objects.create(name=f"card {i} ", type1=fire, expansion=expansion, price="12.30", hp=10 * i)
+
+    def test_same_output_as_drf(self):
+        """
+        Tests that a page of cards is rendered exactly like DRF's JSONRenderer does.
+        """
+        response = self.client.get(reverse("card-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        self.assertEqual(FastJSONRenderer().render(response.data), JSONRenderer().render(response.data))
+
+    def test_fallback_without_orjson(self):
+        """
+        Tests that the renderer and the parser work without orjson.
+        """
+        data = {"name": "card", "price": "1.00"}
+        with mock.patch.object(renderers, "orjson", None):
+            content = FastJSONRenderer().render(data)
+            self.assertEqual(content, JSONRenderer().render(data))
+            self.assertEqual(FastJSONParser().parse(io.BytesIO(content)), data)
+
+    def test_parser(self):
+        """
+        Tests that the parser reads what DRF's parser reads, and rejects invalid JSON.
+        """
+        content = '{"name": "Pokémon", "hp": 50, "price": 1.5, "types": [1, 2]}'.encode()
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(content)), JSONParser().parse(io.BytesIO(content)))
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"name": NaN}'))
+
+    def test_post_with_fast_parser(self):
+        """
+        Tests that requests are parsed with the fast parser.
+        """
+        response = self.client.post(reverse("card-list"), '{"name": "Charmander", "hp": 50}',
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["hp"], 50)
@@ -0,0 +1,125 @@
+import os
+import tempfile
+import time
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from api.invalidation import bump_versions
+from api.models import Card
+from api.routing import STICKY_COOKIE, ReplicaRoutingMiddleware, get_replica_alias, record_refresh
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # The replica is only used with a version cache shared by every process.
+        settings_override = override_settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.path.join(directory.name, "cache"),
+        }})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.path = os.path.join(directory.name, "replica.sqlite3")
+        patcher = mock.patch("api.routing.get_replica_path", return_value=self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def route(self, request, write=False, status=200, model=Card):
+        """
+        Runs the request through the middleware, and returns the database the
+        reads of the model go to (after a write, if `write`) and the response.
+        """
+        databases = []
+
+        def get_response(request):
+            if write:
+                router.db_for_write(model)
+            databases.append(model.objects.all().db)
+            return HttpResponse(status=status)
+
+        response = ReplicaRoutingMiddleware(get_response)(request)
+        return databases[0], response
+
+    def test_reads_from_replica_when_fresh(self):
+        """
+        Tests that GET requests read from the replica once it's refreshed, and
+        from the primary again after a later write.
+        """
+        self.assertEqual(self.route(self.factory.get("/cards/"))[0], "default")
+        record_refresh(self.path, time.time())
+        self.assertEqual(self.route(self.factory.get("/cards/"))[0], "replica")
+        self.assertEqual(self.route(self.factory.head("/cards/1/"))[0], "replica")
+        bump_versions(Card)
+        self.assertEqual(self.route(self.factory.get("/cards/"))[0], "default")
+        record_refresh(self.path, time.time())
+        self.assertEqual(self.route(self.factory.get("/cards/"))[0], "replica")
+        # Queries outside requests use the primary.
+        self.assertEqual(Card.objects.all().db, "default")
+
+    @override_settings(API_REPLICA_MAX_LAG=60)
+    def test_max_lag(self):
+        """
+        Tests that writes made within the allowed lag keep reads on the replica.
+        """
+        record_refresh(self.path, time.time() - 10)
+        bump_versions(Card)
+        self.assertEqual(self.route(self.factory.get("/cards/"))[0], "replica")
+
+    def test_writes_use_primary(self):
+        """
+        Tests that other methods read from the primary, and that a GET request
+        reads its own writes from the primary.
+        """
+        record_refresh(self.path, time.time())
+        self.assertEqual(self.route(self.factory.post("/cards/"))[0], "default")
+        self.assertEqual(self.route(self.factory.get("/cards/"), write=True)[0], "default")
+
+    @override_settings(API_REPLICA_STICKY_SECONDS=10)
+    def test_sticky_primary(self):
+        """
+        Tests that successful writes keep the client on the primary with a cookie.
+        """
+        record_refresh(self.path, time.time())
+        _, response = self.route(self.factory.patch("/cards/1/"))
+        self.assertEqual(response.cookies[STICKY_COOKIE]["max-age"], 10)
+        _, response = self.route(self.factory.patch("/cards/1/"), status=400)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+        _, response = self.route(self.factory.get("/cards/"))
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+        request = self.factory.get("/cards/")
+        request.COOKIES[STICKY_COOKIE] = "1"
+        self.assertEqual(self.route(request)[0], "default")
+
+    @override_settings(API_REPLICA_DATABASE=None, API_REPLICA_STICKY_SECONDS=10)
+    def test_without_replica(self):
+        """
+        Tests that everything uses the primary when no replica is configured.
+        """
+        record_refresh(self.path, time.time())
+        self.assertEqual(self.route(self.factory.get("/cards/"))[0], "default")
+        _, response = self.route(self.factory.post("/cards/"))
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_other_apps_use_primary(self):
+        """
+        Tests that only the models of the API are read from the replica.
+        """
+        record_refresh(self.path, time.time())
+        self.assertEqual(self.route(self.factory.get("/admin/"), model=User)[0], "default")
+
+    def test_local_version_cache(self):
+        """
+        Tests that the replica is off while the version cache is local to each process.
+        """
+        record_refresh(self.path, time.time())
+        self.assertEqual(get_replica_alias(), "replica")
+        local_cache = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        with override_settings(CACHES=local_cache):
+            self.assertIsNone(get_replica_alias())
+            self.assertEqual(self.route(self.factory.get("/cards/"))[0], "default")
@@ -0,0 +1,70 @@
+import json
+import re
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from api.models import Card, Expansion, PokemonType
+
+
+class ServerTimingTests(APITestCase):
+    def setUp(self):
+        fire = PokemonType.objects.create(name="Fire")
+        expansion = Expansion.objects.create(name="Pokémon Go", series="Sword & Shield", release_date="2022-07-01")
+        for i in range(5):
+            Card.objects.create(name=f"card {i}", type1=fire, expansion=expansion, price="12.30", hp=10 * i)
+
+    def parse_header(self, response):
+        """
+        Returns the durations of the `Server-Timing` header, and the number of queries it reports.
+        """
+        header = response["Server-Timing"]
+        durations = {name: float(value) for name, value in re.findall(r"(\w+);dur=([\d.]+)", header)}
+        queries = int(re.search(r'desc="(\d+) queries"', header).group(1))
+        return durations, queries
+
+    def test_header(self):
+        """
+        Tests that responses have a Server-Timing header with the number of
+        queries they ran and the time of each phase.
+        """
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse("card-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        durations, queries = self.parse_header(response)
+        self.assertEqual(set(durations), {"db", "serialize", "render", "total"})
+        self.assertEqual(queries, len(captured))
+        self.assertGreater(durations["serialize"], 0)
+        self.assertGreater(durations["render"], 0)
+        self.assertGreaterEqual(durations["total"], durations["db"] + durations["serialize"])
+
+    def test_log_line(self):
+        """
+        Tests that every request is logged as JSON, and that requests over the
+        thresholds are logged as warnings with their slowest queries.
+        """
+        with self.assertLogs("api.timing", "INFO") as logs:
+            self.client.get(reverse("card-list"))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, "INFO")
+        self.assertEqual(record["view"], "card-list")
+        self.assertEqual(record["status"], 200)
+        self.assertNotIn("slow", record)
+
+        with override_settings(API_TIMING_MAX_QUERIES=0, API_TIMING_SLOWEST_QUERIES=1):
+            with self.assertLogs("api.timing", "WARNING") as logs:
+                self.client.get(reverse("card-list"))
+        record = logs.records[0].timings
+        self.assertEqual(record["slow"], ["queries"])
+        self.assertEqual(len(record["slowest_queries"]), 1)
+        self.assertIn("SELECT", record["slowest_queries"][0]["sql"])
+
+    @override_settings(API_TIMING_ENABLED=False)
+    def test_disabled(self):
+        """
+        Tests that nothing is timed when API_TIMING_ENABLED is off.
+        """
+        response = self.client.get(reverse("card-list"))
+        self.assertNotIn("Server-Timing", response)
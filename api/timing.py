@@ -0,0 +1,177 @@
+"""
+Always-on timing of every request, reported in a `Server-Timing` header and a
+log line, without the cost of the `DEBUG` query log.
+
+`ServerTimingMiddleware` starts a `RequestTimings` for each request, which the
+hooks below fill in while it's handled:
+
+- `record_query`, an execute wrapper installed on every database connection
+  (see `api.signals`), counts the queries and their time, and keeps the SQL of
+  the slowest ones (without their parameters).
+- `TimedSerializerMixin` times the serialization of the DRF serializers.
+- The middleware itself times the rendering of DRF and template responses.
+
+The header and the log line (on the `api.timing` logger, as JSON) have the
+number of queries and the SQL, serialization, rendering and total times.
+Requests slower than `API_TIMING_SLOW_REQUEST_MS`, or that run more than
+`API_TIMING_MAX_QUERIES` queries or a query slower than `API_TIMING_SLOW_QUERY_MS`,
+are logged as warnings with their slowest queries.
+
+The queries of streaming responses run after the middleware returns, so they
+aren't counted.
+"""
+import json
+import logging
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+
+logger = logging.getLogger("api.timing")
+
+# The timings of the current request, or None outside requests.
+_current = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """
+    The queries and times (in seconds) of a request.
+    """
+    __slots__ = ("started", "queries", "sql", "serialize", "render", "slowest", "serializing", "render_started")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        # (duration, sql) of the slowest queries, at most API_TIMING_SLOWEST_QUERIES of them.
+        self.slowest = []
+        self.serializing = False
+        self.render_started = None
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.sql += duration
+        limit = getattr(settings, "API_TIMING_SLOWEST_QUERIES", 5)
+        if len(self.slowest) < limit:
+            self.slowest.append((duration, sql))
+        elif limit and duration > min(self.slowest)[0]:
+            self.slowest.remove(min(self.slowest))
+            self.slowest.append((duration, sql))
+
+
+def get_current_timings():
+    """
+    Returns the timings of the current request, or None outside requests.
+    """
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper that adds each query to the timings of the current request.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, time.perf_counter() - started)
+
+
+class TimedSerializerMixin:
+    """
+    Adds the time spent in `to_representation` to the serialization time of the
+    current request. Nested serializers are timed once, as part of their parent.
+    """
+    def to_representation(self, instance):
+        timings = _current.get()
+        if timings is None or timings.serializing:
+            return super().to_representation(instance)
+        timings.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            timings.serializing = False
+            timings.serialize += time.perf_counter() - started
+
+
+def server_timing_header(timings, total):
+    """
+    Returns the value of the `Server-Timing` header, with times in milliseconds.
+    """
+    return (
+        f'db;dur={timings.sql * 1000:.3f};desc="{timings.queries} queries", '
+        f"serialize;dur={timings.serialize * 1000:.3f}, "
+        f"render;dur={timings.render * 1000:.3f}, "
+        f"total;dur={total * 1000:.3f}"
+    )
+
+
+def slow_reasons(timings, total):
+    """
+    Returns the thresholds the request went over.
+    """
+    reasons = []
+    if total * 1000 > getattr(settings, "API_TIMING_SLOW_REQUEST_MS", 500):
+        reasons.append("duration")
+    if timings.queries > getattr(settings, "API_TIMING_MAX_QUERIES", 50):
+        reasons.append("queries")
+    if timings.slowest and max(timings.slowest)[0] * 1000 > getattr(settings, "API_TIMING_SLOW_QUERY_MS", 100):
+        reasons.append("slow_query")
+    return reasons
+
+
+class ServerTimingMiddleware(MiddlewareMixin):
+    """
+    Times every request (see the module docstring), when `API_TIMING_ENABLED` is set.
+    """
+    def process_request(self, request):
+        _current.set(RequestTimings() if getattr(settings, "API_TIMING_ENABLED", True) else None)
+
+    def process_template_response(self, request, response):
+        # Called right before the response is rendered, and the callback right after.
+        timings = _current.get()
+        if timings is not None:
+            timings.render_started = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: self.rendered(timings))
+        return response
+
+    def rendered(self, timings):
+        timings.render += time.perf_counter() - timings.render_started
+
+    def process_response(self, request, response):
+        timings = _current.get()
+        _current.set(None)
+        if timings is None:
+            return response
+        total = time.perf_counter() - timings.started
+        response["Server-Timing"] = server_timing_header(timings, total)
+
+        match = getattr(request, "resolver_match", None)
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 3),
+            "queries": timings.queries,
+            "sql_ms": round(timings.sql * 1000, 3),
+            "serialize_ms": round(timings.serialize * 1000, 3),
+            "render_ms": round(timings.render * 1000, 3),
+        }
+        reasons = slow_reasons(timings, total)
+        if reasons:
+            record["slow"] = reasons
+            record["slowest_queries"] = [
+                {"ms": round(duration * 1000, 3), "sql": sql} for duration, sql in sorted(timings.slowest, reverse=True)
+            ]
+            logger.warning(json.dumps(record), extra={"timings": record})
+        else:
+            logger.info(json.dumps(record), extra={"timings": record})
+        return response
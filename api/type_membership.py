@@ -0,0 +1,53 @@
+"""
+Triggers keeping `CardTypeMembership` (the api_cardtypemembership table) in sync
+with the type1 and type2 columns of api_card. Migrations that rebuild the
+api_card table (which drops its triggers) must call `install_type_membership_triggers`
+again.
+"""
+
+MEMBERSHIP_TABLE = "api_cardtypemembership"
+
+_INSERT_NEW_TYPES = (
+    f"INSERT OR IGNORE INTO {MEMBERSHIP_TABLE}(card_id, pokemon_type_id) "
+    f"SELECT new.id, new.type1_id WHERE new.type1_id IS NOT NULL; "
+    f"INSERT OR IGNORE INTO {MEMBERSHIP_TABLE}(card_id, pokemon_type_id) "
+    f"SELECT new.id, new.type2_id WHERE new.type2_id IS NOT NULL;"
+)
+
+_STATEMENTS = [
+    f"DROP TRIGGER IF EXISTS {MEMBERSHIP_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {MEMBERSHIP_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {MEMBERSHIP_TABLE}_ad",
+    f"CREATE TRIGGER {MEMBERSHIP_TABLE}_ai AFTER INSERT ON api_card BEGIN {_INSERT_NEW_TYPES} END",
+    f"CREATE TRIGGER {MEMBERSHIP_TABLE}_au AFTER UPDATE OF type1_id, type2_id ON api_card BEGIN "
+    f"DELETE FROM {MEMBERSHIP_TABLE} WHERE card_id = old.id; {_INSERT_NEW_TYPES} END",
+    f"CREATE TRIGGER {MEMBERSHIP_TABLE}_ad AFTER DELETE ON api_card BEGIN "
+    f"DELETE FROM {MEMBERSHIP_TABLE} WHERE card_id = old.id; END",
+    # Rebuilds the memberships of the existing cards.
+    f"DELETE FROM {MEMBERSHIP_TABLE}",
+    f"INSERT OR IGNORE INTO {MEMBERSHIP_TABLE}(card_id, pokemon_type_id) "
+    f"SELECT id, type1_id FROM api_card WHERE type1_id IS NOT NULL",
+    f"INSERT OR IGNORE INTO {MEMBERSHIP_TABLE}(card_id, pokemon_type_id) "
+    f"SELECT id, type2_id FROM api_card WHERE type2_id IS NOT NULL",
+]
+
+
+def install_type_membership_triggers(apps, schema_editor):
+    """
+    Creates (or repairs) the triggers and rebuilds the memberships of the existing
+    cards. Does nothing on databases other than SQLite.
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for statement in _STATEMENTS:
+        schema_editor.execute(statement)
+
+
+def uninstall_type_membership_triggers(apps, schema_editor):
+    """
+    Drops the triggers.
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for suffix in ("ai", "au", "ad"):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {MEMBERSHIP_TABLE}_{suffix}")
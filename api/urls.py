@@ -1,17 +1,26 @@
 from django.urls import re_path
 from rest_framework.urlpatterns import format_suffix_patterns
-from api import views
+from api import async_views, views
 
 urlpatterns = [
     # cards/
     re_path(r"^cards/?$", views.CardList.as_view(), name="card-list"),
 
+    # cards/export/
+    re_path(r"^cards/export/?$", views.CardExport.as_view(), name="card-export"),
+
+    # cards/bulk/
+    re_path(r"^cards/bulk/?$", views.CardBulk.as_view(), name="card-bulk"),
+
     # cards/<int:pk>/
     re_path(r"^cards/(?P<pk>\d+)/?$", views.CardDetail.as_view(), name="card-by-id"),
 
     # cards/expansion/<int:pk>/
     re_path(r"^cards/expansion/(?P<pk>\d+)/?$", views.CardFilterByExpansion.as_view(), name="card-list-by-expansion"),
 
+    # cards/type/?types=<int:pk>,<int:pk>&match=<any|all>
+    re_path(r"^cards/type/?$", views.CardFilterByTypes.as_view(), name="card-list-by-types"),
+
     # cards/type/<int:pk>/
     re_path(r"^cards/type/(?P<pk>\d+)/?$", views.CardFilterByType.as_view(), name="card-list-by-type"),
 
@@ -21,12 +30,18 @@ urlpatterns = [
     # expansions/series/<str:series_name>/
     re_path(r"^expansions/series/(?P<series_name>.+)/?$", views.ExpansionFilterBySeries.as_view(), name="expansion-list-by-series"),
 
+    # expansions/export/
+    re_path(r"^expansions/export/?$", views.ExpansionExport.as_view(), name="expansion-export"),
+
     # expansions/
     re_path(r"^expansions/?$", views.ExpansionList.as_view(), name="expansion-list"),
 
     # expansions/<int:pk>/
     re_path(r"^expansions/(?P<pk>\d+)/?$", views.ExpansionDetail.as_view(), name="expansion-by-id"),
 
+    # types/export/
+    re_path(r"^types/export/?$", views.PokemonTypeExport.as_view(), name="type-export"),
+
     # types/
     re_path(r"^types/?$", views.PokemonTypeList.as_view(), name="type-list"),
 
@@ -37,4 +52,15 @@ urlpatterns = [
     re_path(r"^types/name/(?P<type_name>.+)/?$", views.PokemonTypeFilterByName.as_view(), name="type-filter-by-name")
 ]
 
-urlpatterns = format_suffix_patterns(urlpatterns)
+# e.g. cards.columnar, cards/export.csv
+urlpatterns = format_suffix_patterns(urlpatterns, allowed=["json", "api", "columnar", "ndjson", "csv"])
+
+# Native async versions of the read endpoints (see api.async_views).
+urlpatterns += [
+    re_path(r"^async/cards/?$", async_views.CardList.as_view(), name="async-card-list"),
+    re_path(r"^async/cards/(?P<pk>\d+)/?$", async_views.CardDetail.as_view(), name="async-card-by-id"),
+    re_path(r"^async/expansions/?$", async_views.ExpansionList.as_view(), name="async-expansion-list"),
+    re_path(r"^async/expansions/(?P<pk>\d+)/?$", async_views.ExpansionDetail.as_view(), name="async-expansion-by-id"),
+    re_path(r"^async/types/?$", async_views.PokemonTypeList.as_view(), name="async-type-list"),
+    re_path(r"^async/types/(?P<pk>\d+)/?$", async_views.PokemonTypeDetail.as_view(), name="async-type-by-id"),
+]
@@ -1,44 +1,41 @@
-from rest_framework import generics
+from django.conf import settings
+from django.db.models import Value
+from django.db.models.functions import Lower
+from rest_framework import generics, status
 from rest_framework.exceptions import ValidationError
-from api.models import Expansion, PokemonType, Card
-from api.serializers import ExpansionSerializer, PokemonTypeSerializer, CardSerializer
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from api.bulk import CardBulkOperations
+from api.conditional import ConditionalListMixin, ConditionalRetrieveMixin
+from api.export import ExportView
+from api.fieldsets import SparseFieldsetViewMixin
+from api.models import Expansion, PokemonType, Card
+from api.pagination import CustomPagination
+from api.reference_cache import reference_cache
+from api.response_cache import CachedResponseMixin
+from api.serializers import ExpansionSerializer, PokemonTypeSerializer, CardSerializer, CardBulkItemSerializer
 from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework.filters import SearchFilter
+from api.filters import FullTextSearchFilter
+from api.renderers import ColumnarLayoutMixin
 
 
-class CustomPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = "page_size"
-    max_page_size = 100
-
-    def get_paginated_response(self, data):
-        return Response(
-            {
-                "next": self.get_next_link(),
-                "previous": self.get_previous_link(),
-                "count": self.page.paginator.count,
-                "results": data,
-            }
-        )
-
-
-class ExpansionList(generics.ListCreateAPIView):
+class ExpansionList(CachedResponseMixin, ConditionalListMixin, generics.ListCreateAPIView):
     queryset = Expansion.objects.all()
     serializer_class = ExpansionSerializer
     pagination_class = CustomPagination
-    filter_backends = [SearchFilter, DjangoFilterBackend]
+    filter_backends = [FullTextSearchFilter, DjangoFilterBackend]
     search_fields = ["name", "series"]
     filterset_fields = {"release_date": ["year", "month", "day"]}
 
 
-class ExpansionDetail(generics.RetrieveUpdateDestroyAPIView):
+class ExpansionDetail(CachedResponseMixin, ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Expansion.objects.all()
     serializer_class = ExpansionSerializer
 
 
-class ExpansionFilterBySeries(generics.ListAPIView):
+class ExpansionFilterBySeries(CachedResponseMixin, ConditionalListMixin, generics.ListAPIView):
     serializer_class = ExpansionSerializer
     pagination_class = CustomPagination
 
@@ -50,26 +47,43 @@ class ExpansionFilterBySeries(generics.ListAPIView):
         queryset = Expansion.objects.all()
         given_series = self.kwargs.get("series_name", "None")
         if given_series:
-            queryset = queryset.filter(series__iexact=given_series)
+            # Compared with LOWER() instead of `iexact` (LIKE) so the
+            # `expansion_series_lower_idx` index is used.
+            queryset = queryset.alias(series_lower=Lower("series")).filter(series_lower=Lower(Value(given_series)))
         return queryset
 
 
-class PokemonTypeList(generics.ListCreateAPIView):
+class ExpansionExport(ExportView):
+    queryset = Expansion.objects.all()
+    filter_backends = [FullTextSearchFilter, DjangoFilterBackend]
+    search_fields = ["name", "series"]
+    filterset_fields = {"release_date": ["year", "month", "day"]}
+    export_name = "expansions"
+    export_columns = {
+        column: column
+        for column in ("id", "name", "series", "cards", "release_date", "promotional_set", "modified", "version")
+    }
+
+
+class PokemonTypeList(CachedResponseMixin, ConditionalListMixin, generics.ListCreateAPIView):
     queryset = PokemonType.objects.all()
     serializer_class = PokemonTypeSerializer
     pagination_class = CustomPagination
+    nested_models = (PokemonType,)
     filter_backends = [SearchFilter]
     search_fields = ["name"]
 
 
-class PokemonTypeDetail(generics.RetrieveUpdateDestroyAPIView):
+class PokemonTypeDetail(CachedResponseMixin, ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = PokemonType.objects.all()
     serializer_class = PokemonTypeSerializer
+    nested_models = (PokemonType,)
 
 
-class PokemonTypeFilterByName(generics.ListAPIView):
+class PokemonTypeFilterByName(CachedResponseMixin, ConditionalListMixin, generics.ListAPIView):
     serializer_class = PokemonTypeSerializer
     pagination_class = CustomPagination
+    nested_models = (PokemonType,)
 
     def get_queryset(self):
         """
@@ -79,27 +93,104 @@ class PokemonTypeFilterByName(generics.ListAPIView):
         queryset = PokemonType.objects.all()
         given_name = self.kwargs.get("type_name", "None")
         if given_name:
-            queryset = queryset.filter(name__iexact=given_name)
+            # Compared with LOWER() instead of `iexact` (LIKE) so the
+            # `unique_type_name` index is used.
+            queryset = queryset.alias(name_lower=Lower("name")).filter(name_lower=Lower(Value(given_name)))
         return queryset
 
 
-class CardList(generics.ListCreateAPIView):
+class PokemonTypeExport(ExportView):
+    queryset = PokemonType.objects.all()
+    filter_backends = [SearchFilter]
+    search_fields = ["name"]
+    export_name = "types"
+    export_columns = {column: column for column in ("id", "name", "modified", "version")}
+
+    def get_export_columns(self):
+        return super().get_export_columns() + list(PokemonType.MATCHUP_FIELDS)
+
+    def get_export_rows(self, queryset):
+        """
+        Adds the names of the matchups of each type, from the reference data cache.
+        """
+        for row in super().get_export_rows(queryset):
+            matchups = reference_cache.matchup_names(row[0])
+            yield (*row, *(matchups[field] for field in PokemonType.MATCHUP_FIELDS))
+
+
+class CardList(SparseFieldsetViewMixin, ColumnarLayoutMixin, CachedResponseMixin, ConditionalListMixin,
+                generics.ListCreateAPIView):
     queryset = Card.objects.all()
     serializer_class = CardSerializer
     pagination_class = CustomPagination
-    filter_backends = [SearchFilter, DjangoFilterBackend]
+    nested_models = (Expansion, PokemonType)
+    filter_backends = [FullTextSearchFilter, DjangoFilterBackend]
     search_fields = ["name", "rarity"]
     filterset_fields = {"created": ["year", "month", "day"]}
 
 
-class CardDetail(generics.RetrieveUpdateDestroyAPIView):
+class CardDetail(SparseFieldsetViewMixin, CachedResponseMixin, ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Card.objects.all()
     serializer_class = CardSerializer
+    nested_models = (Expansion, PokemonType)
 
 
-class CardFilterByExpansion(generics.ListAPIView):
+class CardExport(ExportView):
+    queryset = Card.objects.all()
+    filter_backends = [FullTextSearchFilter, DjangoFilterBackend]
+    search_fields = ["name", "rarity"]
+    filterset_fields = {"created": ["year", "month", "day"]}
+    export_name = "cards"
+    # Compatible with the import_cards command, which reads related objects by name.
+    export_columns = {
+        "id": "id",
+        "name": "name",
+        "rarity": "rarity",
+        "hp": "hp",
+        "type1": "type1__name",
+        "type2": "type2__name",
+        "expansion": "expansion__name",
+        "expansion_series": "expansion__series",
+        "card_number": "card_number",
+        "first_edition": "first_edition",
+        "price": "price",
+        "image": "image",
+        "created": "created",
+        "modified": "modified",
+        "version": "version",
+    }
+
+
+class CardBulk(generics.GenericAPIView):
+    serializer_class = CardBulkItemSerializer
+
+    def post(self, request, *args, **kwargs):
+        """
+        Creates, updates and deletes several cards in a single transaction. The
+        body is a list of operations, each one being
+        `{"action": "create", "data": {...}}`, `{"action": "update", "id": <id>, "data": {...}}`
+        (a partial update) or `{"action": "delete", "id": <id>}`.
+        The response has a result for each operation. If any of them is invalid,
+        nothing is written and the errors of the invalid ones are returned.
+        """
+        if not isinstance(request.data, list):
+            raise ValidationError("Expected a list of operations")
+        max_operations = getattr(settings, "API_BULK_MAX_OPERATIONS", 10000)
+        if len(request.data) > max_operations:
+            raise ValidationError(f"At most {max_operations} operations are allowed per request")
+        operations = CardBulkOperations(request.data)
+        if not operations.is_valid():
+            return Response({"results": operations.results}, status=status.HTTP_400_BAD_REQUEST)
+        if not operations.save():
+            return Response({"detail": operations.integrity_error}, status=status.HTTP_409_CONFLICT)
+        return Response({"results": operations.results})
+
+
+class CardFilterByExpansion(SparseFieldsetViewMixin, ColumnarLayoutMixin, CachedResponseMixin, ConditionalListMixin,
+                             generics.ListAPIView):
     serializer_class = CardSerializer
     pagination_class = CustomPagination
+    nested_models = (Expansion, PokemonType)
 
     def get_queryset(self):
         """
@@ -113,27 +204,60 @@ class CardFilterByExpansion(generics.ListAPIView):
         return queryset
 
 
-class CardFilterByType(generics.ListAPIView):
+class CardFilterByType(SparseFieldsetViewMixin, ColumnarLayoutMixin, CachedResponseMixin, ConditionalListMixin,
+                        generics.ListAPIView):
     serializer_class = CardSerializer
     pagination_class = CustomPagination
+    nested_models = (Expansion, PokemonType)
 
     def get_queryset(self):
         """
-        Optionally restricts the returned cards to a given type1 or type2,
-        by filtering against a `type` (id) query parameter in the URL.
-        Only one type is given in the URL and any card matching it either as
-        type1 or type2, will be retrieved.
+        Optionally restricts the returned cards to the given types, matching them
+        either as type1 or type2. A single type can be given in the URL
+        (`cards/type/<id>/`), or several in a comma separated `types` query parameter
+        (`cards/type/?types=<id>,<id>`). With several types, `match=any` (the default)
+        retrieves the cards having any of them, and `match=all` the cards having all of them.
+        Types are looked up through the `CardTypeMembership` index.
         """
-        queryset = Card.objects.all()
         type_pk = self.kwargs.get("pk")
         if type_pk:
-            queryset = queryset.filter(type1=type_pk) | queryset.filter(type2=type_pk)
-        return queryset
+            return Card.objects.of_types([type_pk])
+        try:
+            type_pks = {int(pk) for pk in self.request.query_params.get("types", "").split(",") if pk.strip()}
+        except ValueError:
+            raise ValidationError("Invalid types value")
+        match = self.request.query_params.get("match", "any").lower()
+        if match not in ("any", "all"):
+            raise ValidationError("Invalid match value")
+        if type_pks:
+            return Card.objects.of_types(sorted(type_pks), match)
+        return Card.objects.all()
+
+
+class CardFilterByTypes(CardFilterByType):
+    """
+    `CardFilterByType` with the types in the `types` query parameter, documented
+    as its own operation.
+    """
+    @extend_schema(
+        operation_id="cards_types_list",
+        parameters=[
+            OpenApiParameter("types", OpenApiTypes.STR, description="Comma separated ids of the types, e.g. `1,2`."),
+            OpenApiParameter(
+                "match", OpenApiTypes.STR, enum=["any", "all"], default="any",
+                description="Whether the cards must have any or all of the types.",
+            ),
+        ],
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
 
-class CardFilterByRarity(generics.ListAPIView):
+class CardFilterByRarity(SparseFieldsetViewMixin, ColumnarLayoutMixin, CachedResponseMixin, ConditionalListMixin,
+                          generics.ListAPIView):
     serializer_class = CardSerializer
     pagination_class = CustomPagination
+    nested_models = (Expansion, PokemonType)
 
     def get_queryset(self):
         """
@@ -31,6 +31,11 @@ ALLOWED_HOSTS = []
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
+# How the images under MEDIA_URL/img/ are sent (see api.media): None to send them from Django, "x-accel-redirect"
+# to leave them to nginx (from the internal location in MEDIA_ACCEL_REDIRECT_PREFIX) or "x-sendfile" for Apache.
+MEDIA_OFFLOAD = None
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 60 * 60
 
 
 # Application definition
@@ -49,11 +54,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.timing.ServerTimingMiddleware",
+    "api.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "api.routing.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "api.profiling.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -86,9 +95,129 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+    },
+    # Read-only copy of the default database, made by `python manage.py refresh_replica` (see api.routing).
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": (BASE_DIR / "db.replica.sqlite3").as_uri() + "?mode=ro&immutable=1",
+        "TEST": {"MIRROR": "default"},
+    },
+}
+
+DATABASE_ROUTERS = ["api.routing.ReplicaRouter"]
+
+# Alias of the replica that GET requests read from while it's up to date. Set it to None to
+# read from the default database only. It's only used with a shared API_VERSION_CACHE.
+API_REPLICA_DATABASE = "replica"
+
+# How many seconds of writes (after its last refresh) the replica can miss and still be read from.
+API_REPLICA_MAX_LAG = 0
+
+# How many seconds a client reads from the default database after it writes, when a lag is allowed.
+API_REPLICA_STICKY_SECONDS = 10
+
+# PRAGMAs run on every new SQLite connection (see api.sqlite). Check them with `python manage.py sqlite_pragmas`.
+# The journal mode is only set on new databases; convert existing ones with `sqlite_pragmas --convert`.
+SQLITE_PRAGMAS = {
+    "busy_timeout": 5000,
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "cache_size": -64000,
+    "mmap_size": 268435456,
+    "temp_store": "memory",
+}
+
+
+# Caches
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# Multi-worker deployments should use a shared backend (e.g. Redis or Memcached),
+# so that every worker sees the version counters published by the others.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
     }
 }
 
+# Cache alias where the version counters of cached models are published.
+API_VERSION_CACHE = "default"
+
+# How often (in seconds) each worker checks whether its in-process copy of the
+# expansions and types is stale (from the version counters when API_VERSION_CACHE
+# is shared, and from the database otherwise).
+API_REFERENCE_CACHE_CHECK_INTERVAL = 1.0
+
+# How paginated lists count their results: "exact" runs a COUNT(*) per request,
+# "cached" caches each count until a row of the model changes, and "estimated"
+# also estimates unfiltered counts of tables larger than the threshold.
+API_COUNT_MODE = "exact"
+API_COUNT_CACHE = "default"
+API_COUNT_CACHE_TIMEOUT = 300
+API_COUNT_ESTIMATE_THRESHOLD = 100000
+
+# Maximum number of operations in a request to /cards/bulk/.
+API_BULK_MAX_OPERATIONS = 10000
+
+# Cache alias and timeout (in seconds) of the ETag/Last-Modified validators
+# remembered to answer conditional requests without querying the database.
+API_VALIDATOR_CACHE = "default"
+API_VALIDATOR_CACHE_TIMEOUT = 300
+
+# Cache of the rendered responses of the read endpoints: an in-process LRU of
+# API_RESPONSE_CACHE_L1_SIZE entries in front of the API_RESPONSE_CACHE cache.
+# It must only be enabled when the version cache is shared by every worker.
+API_RESPONSE_CACHE_ENABLED = False
+API_RESPONSE_CACHE = "default"
+API_RESPONSE_CACHE_TIMEOUT = 300
+API_RESPONSE_CACHE_L1_SIZE = 256
+
+# Number of rows read from the database and written to the response at a time by the export views.
+API_EXPORT_CHUNK_SIZE = 2000
+
+# Per-request timings, sent in a Server-Timing header and logged by the "api.timing" logger
+# (see api.timing). Requests slower than API_TIMING_SLOW_REQUEST_MS, that run more than
+# API_TIMING_MAX_QUERIES queries, or a query slower than API_TIMING_SLOW_QUERY_MS, are
+# logged as warnings with their API_TIMING_SLOWEST_QUERIES slowest queries.
+API_TIMING_ENABLED = True
+API_TIMING_SLOW_REQUEST_MS = 500
+API_TIMING_MAX_QUERIES = 50
+API_TIMING_SLOW_QUERY_MS = 100
+API_TIMING_SLOWEST_QUERIES = 5
+
+# Slow requests are logged to the console. Set the level of "api.timing" to "INFO" to log every request.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api.timing": {"handlers": ["console"], "level": "WARNING", "propagate": False},
+    },
+}
+
+# Prometheus metrics served at /metrics (see api.metrics). Each worker process writes its metrics
+# to a file in API_METRICS_DIR, which should be cleared when deploying.
+API_METRICS_ENABLED = True
+API_METRICS_DIR = BASE_DIR / "metrics"
+
+# Writes the metrics of the tests to a temporary directory instead.
+TEST_RUNNER = "pokemon.test_runner.TestRunner"
+
+# Staff users can profile any request by adding API_PROFILE_PARAMETER to its URL (see api.profiling).
+# The summary lists API_PROFILE_LIMIT functions, and the whole profile is stored in API_PROFILE_DIR if it's set.
+API_PROFILE_PARAMETER = "profile"
+API_PROFILE_LIMIT = 40
+API_PROFILE_DIR = None
+
+# Variants generated from each card image (name: maximum width and height), in each of the formats (see api.images).
+CARD_IMAGE_VARIANTS = {
+    "thumbnail": (64, 90),
+    "small": (245, 342),
+    "medium": (480, 670),
+}
+CARD_IMAGE_FORMATS = ("webp", "jpeg")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -137,6 +266,17 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Use 'rest_framework.renderers.JSONRenderer' and 'rest_framework.parsers.JSONParser' for DRF's own JSON
+    # handling. The api.renderers classes fall back to them when orjson isn't installed.
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 
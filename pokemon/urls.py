@@ -18,6 +18,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from api.media import MediaView
+from api.metrics import MetricsView
 
 
 urlpatterns = [
@@ -25,6 +27,8 @@ urlpatterns = [
     path("", include("api.urls")),
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
+    path("metrics", MetricsView.as_view(), name="metrics"),
+    path(f"{settings.MEDIA_URL.strip('/')}/img/<path:path>", MediaView.as_view(), name="media-image"),
 ]
 
 
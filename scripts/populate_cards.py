@@ -1,7 +1,6 @@
 import os
 import django
-from django.db.utils import IntegrityError
-from api.models import Card, Expansion, PokemonType
+from api.importer import CardImporter
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pokemon.settings")
 django.setup()
@@ -86,29 +85,15 @@ def run():
     """
     Populate Pokémon cards test data into the database
     """
-    try:
-        for dictionary in card_data:
-            card = Card(
-                name=dictionary["name"],
-                first_edition=dictionary["first_edition"],
-                rarity=dictionary["rarity"],
-                hp=dictionary["hp"],
-                card_number=dictionary["card_number"],
-                price=dictionary["price"],
-                image=os.path.join("img", dictionary["image"]),
-            )
-
-            # Find the expansion and type references in the database (for foreign key fields)
-            card.expansion = Expansion.objects.get(name=dictionary["expansion"])
-            if dictionary["type1"]:
-                card.type1 = PokemonType.objects.get(name=dictionary["type1"])
-            if dictionary["type2"]:
-                card.type2 = PokemonType.objects.get(name=dictionary["type2"])
-            card.save()
+    rows = [
+        dict(dictionary, image=os.path.join("img", dictionary["image"]))
+        for dictionary in card_data
+    ]
+    importer = CardImporter(
+        on_reject=lambda rejected: print(f"{rejected.row['name']}: {' '.join(rejected.errors)}")
+    )
+    stats = importer.run(enumerate(rows, start=1))
+    if stats.rejected:
+        print("Some or all of the instances could not be populated (see the errors above).")
+    else:
         print("Cards populated successfully!")
-    except IntegrityError:
-        print("Some or all of the instances already exist in the database.")
-    except Expansion.DoesNotExist:
-        print("Expansion does not exist. Maybe you forgot to populate the Expansion table first?")
-    except PokemonType.DoesNotExist:
-        print("PokemonType does not exist. Maybe you forgot to populate the PokemonType table first?")